@@ -25,17 +25,34 @@ from . properties import GearProps
 from . properties import GearSet
 from . properties import MotorProps
 from . properties import DriverProps
+from . properties import GearSceneSettings
 
 from . operators import GE_OT_AddGearToSet
 from . operators import GE_OT_RemoveGear
 from . operators import GE_OT_AddMotor
+from . operators import GE_OT_OrientationToDelta
 from . operators import GE_OT_InitDrivers
 from . operators import GE_OT_InitConstraint
+from . operators import GE_OT_BakeGears
+from . operators import GE_OT_BuildFrameCache
+from . operators import GE_OT_AddGearMesh
+from . operators import GE_OT_DedupMeshes
+from . operators import GE_OT_AutoMesh
+from . operators import GE_OT_ToggleProfiler
+from . operators import GE_OT_ExportProfile
+from . operators import GE_OT_ExportTrain
+from . operators import GE_OT_ImportTrain
 from . operators import GE_OT_ToolTip
 
+from . interface import GE_UL_GearRings
 from . interface import GE_PT_MainPanel
 from . interface import GE_PT_MotorPanel
 from . interface import GE_PT_HelpPanel
+from . interface import GE_PT_FrameCachePanel
+from . interface import GE_PT_ProfilerPanel
+from . interface import draw_add_menu, draw_import_menu, draw_export_menu
+
+from . import handlers
 
 bl_info = {
     "name" : "GearEngine",
@@ -54,17 +71,31 @@ classes = [
     MotorProps,
     GearSet,
     DriverProps,
+    GearSceneSettings,
     # Ops
     GE_OT_AddGearToSet,
     GE_OT_RemoveGear,
     GE_OT_InitDrivers,
     GE_OT_InitConstraint,
     GE_OT_AddMotor,
+    GE_OT_OrientationToDelta,
+    GE_OT_BakeGears,
+    GE_OT_BuildFrameCache,
+    GE_OT_AddGearMesh,
+    GE_OT_DedupMeshes,
+    GE_OT_AutoMesh,
+    GE_OT_ToggleProfiler,
+    GE_OT_ExportProfile,
+    GE_OT_ExportTrain,
+    GE_OT_ImportTrain,
     GE_OT_ToolTip,
     # UI
+    GE_UL_GearRings,
     GE_PT_MainPanel,
     GE_PT_MotorPanel,
     GE_PT_HelpPanel,
+    GE_PT_FrameCachePanel,
+    GE_PT_ProfilerPanel,
     ]
 
 def register():
@@ -72,10 +103,22 @@ def register():
         bpy.utils.register_class(cls)
 
     bpy.types.Object.gear_data = PointerProperty(type=GearSet)
+    bpy.types.Scene.gear_settings = PointerProperty(type=GearSceneSettings)
+    bpy.types.VIEW3D_MT_mesh_add.append(draw_add_menu)
+    bpy.types.TOPBAR_MT_file_import.append(draw_import_menu)
+    bpy.types.TOPBAR_MT_file_export.append(draw_export_menu)
+
+    handlers.register()
 
 
 def unregister():
+    handlers.unregister()
+
+    bpy.types.VIEW3D_MT_mesh_add.remove(draw_add_menu)
+    bpy.types.TOPBAR_MT_file_import.remove(draw_import_menu)
+    bpy.types.TOPBAR_MT_file_export.remove(draw_export_menu)
     del bpy.types.Object.gear_data
+    del bpy.types.Scene.gear_settings
 
     for cls in classes:
         bpy.utils.unregister_class(cls)
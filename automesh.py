@@ -0,0 +1,376 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Works out which gears are in mesh from where they sit, and wires the
+# drive links to match. Two rings mesh when their axes are parallel, they
+# overlap along the axis, and their pitch circles touch: centers one
+# pitch radius sum apart, or the difference for an internal gear.
+#
+# Object centers go in KD-trees, one per size class, so each gear only
+# gets compared against the handful of gears close enough to touch it.
+
+import math
+from collections import deque
+
+import numpy as np
+from mathutils.kdtree import KDTree
+
+from . graph import axis_map
+from . meshes import MESH_KEY, parse_key
+from . properties import suspend_updates, rebuild_gear_state
+
+# Axes within about a degree of each other count as parallel
+PARALLEL = 0.9998
+
+
+class RingFootprint:
+    """Where one ring sits in world space"""
+    __slots__ = ("index", "axis", "radius", "internal")
+
+    def __init__(self, index, axis, radius, internal):
+        self.index = index
+        self.axis = axis          # Unit vector, world space
+        self.radius = radius      # Pitch radius, world units
+        self.internal = internal
+
+
+class GearFootprint:
+    __slots__ = ("obj", "center", "rings", "module", "half_width")
+
+    def __init__(self, obj, center, rings, module, half_width):
+        self.obj = obj
+        self.center = center
+        self.rings = rings
+        self.module = module
+        self.half_width = half_width
+
+    @property
+    def reach(self):
+        return max(ring.radius for ring in self.rings)
+
+
+class Contact:
+    __slots__ = ("a", "ring_a", "b", "ring_b", "flip")
+
+    def __init__(self, a, ring_a, b, ring_b, flip):
+        self.a = a
+        self.ring_a = ring_a
+        self.b = b
+        self.ring_b = ring_b
+        self.flip = flip  # Whether b turns the same way as a
+
+
+def meshes_like_spur(ring):
+    # Suns, rings and carriers follow the planetary modes, which aren't
+    # pairwise contacts; planets mesh like spur gears everywhere
+    if ring.gear_type == 'SPUR':
+        return True
+    return ring.gear_type == 'PLANETARY' and ring.planetary_subtype == 'PLANET'
+
+
+def generated_key(obj):
+    if obj.type != 'MESH' or obj.data is None:
+        return None
+    text = obj.data.get(MESH_KEY)
+    return parse_key(text) if text else None
+
+
+def mesh_extent(mesh, axis):
+    """Largest radius around, and half length along, a local axis"""
+    count = len(mesh.vertices)
+    if count == 0:
+        return 0.0, 0.0
+
+    co = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3)
+
+    plane = [i for i in range(3) if i != axis]
+    radius = float(np.sqrt((co[:, plane] ** 2).sum(axis=1)).max())
+    return radius, float(np.abs(co[:, axis]).max())
+
+
+class FootprintReader:
+    """Reads footprints, measuring each shared mesh only once"""
+
+    def __init__(self, default_module):
+        self.default_module = default_module
+        self.extents = {}
+
+    def extent(self, mesh, axis):
+        key = (mesh.as_pointer(), axis)
+        extent = self.extents.get(key)
+        if extent is None:
+            extent = self.extents[key] = mesh_extent(mesh, axis)
+        return extent
+
+    def read(self, obj):
+        data = obj.gear_data
+        if not any(meshes_like_spur(ring) for ring in data.gears):
+            return None
+
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        basis = matrix[:3, :3]
+        center = matrix[:3, 3].copy()
+
+        # Generated meshes know their module and width; anything else
+        # gets measured, assuming the first ring is the one modelled
+        key = generated_key(obj)
+        first = data.gears[0]
+        local_axis = axis_map[first.axis]
+
+        internal_mesh = False
+        if key is not None:
+            kind, teeth, module, pressure_angle, width = key
+            half_width = width / 2.0
+            internal_mesh = kind == 'RING'
+        elif obj.type == 'MESH' and obj.data is not None and first.teeth > 0:
+            tip, half_width = self.extent(obj.data, local_axis)
+            module = 2.0 * tip / (first.teeth + 2.0) if tip > 0.0 else self.default_module
+        else:
+            module = self.default_module
+            half_width = 0.0
+
+        rings = []
+        for index, ring in enumerate(data.gears):
+            if not meshes_like_spur(ring) or ring.teeth <= 0:
+                continue
+
+            axis = basis[:, axis_map[ring.axis]]
+            scale = np.linalg.norm(basis[:, (axis_map[ring.axis] + 1) % 3])
+            length = np.linalg.norm(axis)
+            if length == 0.0:
+                continue
+
+            rings.append(RingFootprint(
+                index,
+                axis / length,
+                module * ring.teeth / 2.0 * scale,
+                internal_mesh and index == 0,
+            ))
+
+        if not rings:
+            return None
+
+        scale = np.linalg.norm(basis[:, local_axis])
+        return GearFootprint(obj, center, rings, module * scale, half_width * scale)
+
+
+def read_footprints(objects, default_module=0.1):
+    reader = FootprintReader(default_module)
+    footprints = []
+    for obj in objects:
+        data = getattr(obj, "gear_data", None)
+        if data is None or len(data.gears) == 0:
+            continue
+        footprint = reader.read(obj)
+        if footprint is not None:
+            footprints.append(footprint)
+    return footprints
+
+
+def ring_contact(a, ring_a, b, ring_b, tolerance):
+    """Returns the flip for b if the two rings mesh, otherwise None"""
+    alignment = float(np.dot(ring_a.axis, ring_b.axis))
+    if abs(alignment) < PARALLEL:
+        return None
+
+    offset = b.center - a.center
+    along = float(np.dot(offset, ring_a.axis))
+    if abs(along) > a.half_width + b.half_width + tolerance:
+        return None
+
+    distance = float(np.linalg.norm(offset - along * ring_a.axis))
+
+    # Two internal gears can't mesh with each other
+    if ring_a.internal and ring_b.internal:
+        return None
+    internal = ring_a.internal or ring_b.internal
+
+    if internal:
+        expected = abs(ring_a.radius - ring_b.radius)
+    else:
+        expected = ring_a.radius + ring_b.radius
+
+    if abs(distance - expected) > tolerance:
+        return None
+
+    # External gears counter-rotate, internal ones don't, and an axis
+    # pointing the other way turns that around again
+    same_way = internal
+    if alignment < 0.0:
+        same_way = not same_way
+    return same_way
+
+
+class SizeClass:
+    """Footprints whose reach is within a factor of two, in one KD-tree"""
+    __slots__ = ("tree", "reach")
+
+    def __init__(self, footprints, members):
+        self.tree = KDTree(len(members))
+        for i in members:
+            self.tree.insert(footprints[i].center, i)
+        self.tree.balance()
+        self.reach = max(footprints[i].reach for i in members)
+
+
+def size_classes(footprints):
+    """One search radius for every gear would be set by the biggest one,
+    and turn each query into a scan of the scene. Binning by reach keeps
+    each radius tight to the gears it can actually find."""
+    members = {}
+    for i, footprint in enumerate(footprints):
+        size = math.floor(math.log2(footprint.reach)) if footprint.reach > 0.0 else None
+        members.setdefault(size, []).append(i)
+    return [SizeClass(footprints, group) for group in members.values()]
+
+
+def find_contacts(footprints, tolerance=0.25):
+    """Every meshing ring pair, with tolerance in modules"""
+    if not footprints:
+        return []
+
+    classes = size_classes(footprints)
+
+    contacts = []
+    for i, a in enumerate(footprints):
+        # Nothing further out than both reaches plus slack can touch a;
+        # the slack is the smaller module's, so a's is as loose as it gets
+        slack_a = a.module * tolerance
+        neighbours = []
+        for size in classes:
+            neighbours.extend(size.tree.find_range(a.center, a.reach + size.reach + slack_a))
+
+        for co, j, dist in neighbours:
+            if j <= i:
+                continue
+            b = footprints[j]
+            slack = min(a.module, b.module) * tolerance
+
+            for ring_a in a.rings:
+                for ring_b in b.rings:
+                    flip = ring_contact(a, ring_a, b, ring_b, slack)
+                    if flip is not None:
+                        contacts.append(Contact(i, ring_a.index, j, ring_b.index, flip))
+
+    return contacts
+
+
+class AutoMeshResult:
+    __slots__ = ("contacts", "wired", "unpowered")
+
+    def __init__(self):
+        self.contacts = 0
+        self.wired = 0
+        self.unpowered = 0  # Trains with no motor in them
+
+
+def chain_root(obj):
+    """Pointer of the top of obj's existing drive chain, or None if the
+    chain runs in a loop"""
+    seen = set()
+    while obj.gear_data.drive_object is not None:
+        if obj.as_pointer() in seen:
+            return None
+        seen.add(obj.as_pointer())
+        obj = obj.gear_data.drive_object
+    return obj.as_pointer()
+
+
+def wire_contacts(footprints, contacts, keep_existing=True):
+    """Points every gear at the neighbour closest to a motor, breadth first"""
+    result = AutoMeshResult()
+    result.contacts = len(contacts)
+
+    neighbours = [[] for _ in footprints]
+    for c in contacts:
+        neighbours[c.a].append((c.b, c.ring_b, c.ring_a, c.flip))
+        neighbours[c.b].append((c.a, c.ring_a, c.ring_b, c.flip))
+
+    # The search spreads out from motors and from gears that are already
+    # driven, so a new gear touching an old train gets driven by it.
+    # Only gears with no drive get new links, which leaves each one the
+    # root of whatever old links hang off it; the one way to close a loop
+    # is to link that root to a gear in its own train, so roots are
+    # tracked and checked.
+    motors = [footprint.obj.gear_data.driver_type == 'MOTOR' for footprint in footprints]
+    kept = [
+        keep_existing and not motor and footprint.obj.gear_data.drive_object is not None
+        for footprint, motor in zip(footprints, motors)
+    ]
+
+    seen = [motor or keep for motor, keep in zip(motors, kept)]
+    roots = [None] * len(footprints)
+    for i, footprint in enumerate(footprints):
+        if motors[i]:
+            roots[i] = footprint.obj.as_pointer()
+        elif kept[i]:
+            roots[i] = chain_root(footprint.obj)
+
+    queue = deque(i for i in range(len(footprints)) if motors[i])
+    queue.extend(i for i in range(len(footprints)) if kept[i] and roots[i] is not None)
+    links = []
+
+    def spread():
+        while queue:
+            i = queue.popleft()
+            for j, ring_j, ring_i, flip in neighbours[i]:
+                if seen[j] or footprints[j].obj.as_pointer() == roots[i]:
+                    continue
+                seen[j] = True
+                roots[j] = roots[i]
+                links.append((j, i, ring_i, ring_j, flip))
+                queue.append(j)
+
+    spread()
+
+    # Whatever is left has no motor; its first gear becomes the root,
+    # so adding a motor there later drives the whole train
+    for i in range(len(footprints)):
+        if not seen[i] and neighbours[i]:
+            seen[i] = True
+            roots[i] = footprints[i].obj.as_pointer()
+            result.unpowered += 1
+            queue.append(i)
+            spread()
+
+    objects = []
+    with suspend_updates():
+        for j, i, ring_i, ring_j, flip in links:
+            obj = footprints[j].obj
+            data = obj.gear_data
+            data.drive_object = footprints[i].obj
+            data.drive_gear = ring_i
+            data.driven_gear = ring_j
+            data.gears[ring_j].flip = flip
+            objects.append(obj)
+
+    if objects:
+        rebuild_gear_state(objects)
+
+    result.wired = len(objects)
+    return result
+
+
+def auto_mesh(objects, tolerance=0.25, keep_existing=True, default_module=0.1):
+    footprints = read_footprints(objects, default_module)
+    contacts = find_contacts(footprints, tolerance)
+    return wire_contacts(footprints, contacts, keep_existing)
@@ -0,0 +1,108 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Keeps drivers and constraints in step with gear_data while it's being
+# edited. Update callbacks only queue the objects an edit touched; a timer
+# waits for the edits to stop, then syncs the whole batch once. Dragging a
+# slider fires hundreds of updates and costs one sync at the end.
+
+import time
+
+import bpy
+
+from . properties import refresh_fps
+from . diagnostics import get_diagnostics
+from . drivers import has_rotation_drivers
+from . constraints import find_constraints
+from . sync import sync_objects
+
+# Seconds without an edit before the queue gets synced
+SYNC_DELAY = 0.3
+
+# Queued objects by pointer. Objects can be deleted before the timer
+# fires, so they're only ever looked up again through a scene.
+pending = {}
+
+# When the timer should fire, pushed back by every edit
+deadline = 0.0
+
+
+def is_initialised(obj):
+    """Whether obj has been given a drive already. Gears nobody has
+    initialised are left for Initialize Gear Drivers to pick up."""
+    if obj.library:
+        return False
+    return has_rotation_drivers(obj) or bool(find_constraints(obj, adopt_legacy=True))
+
+
+def on_gears_edited(objects):
+    global deadline
+
+    for obj in objects:
+        pending[obj.as_pointer()] = obj
+
+    deadline = time.monotonic() + SYNC_DELAY
+    if not bpy.app.timers.is_registered(sync_pending):
+        bpy.app.timers.register(sync_pending, first_interval=SYNC_DELAY)
+
+
+def sync_pending():
+    """Timer callback; returns how much longer to wait, or None once done"""
+    wait = deadline - time.monotonic()
+    if wait > 0.0:
+        return wait
+
+    sync_queued()
+    return None
+
+
+def sync_queued():
+    keys = set(pending)
+    pending.clear()
+
+    for scene in bpy.data.scenes:
+        if not scene.gear_settings.use_auto_sync:
+            continue
+
+        objects = [obj for obj in scene.objects if obj.as_pointer() in keys and is_initialised(obj)]
+        if not objects:
+            continue
+
+        # Solved drivers have every coefficient baked in, and an edit
+        # anywhere in a planetary set or loop can change them
+        solved = get_diagnostics(scene).solved
+        if solved:
+            seen = {obj.as_pointer() for obj in objects}
+            objects += [
+                obj for obj in scene.objects
+                if obj.name in solved and obj.as_pointer() not in seen and is_initialised(obj)
+            ]
+
+        # Motor drivers read the stored framerate
+        refresh_fps(scene)
+
+        # Anything skipped shows up in the diagnostics panel already
+        sync_objects(objects, scene)
+
+
+def clear_pending_sync():
+    pending.clear()
+    if bpy.app.timers.is_registered(sync_pending):
+        bpy.app.timers.unregister(sync_pending)
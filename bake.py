@@ -0,0 +1,138 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+import bpy
+import numpy as np
+
+from . graph import GearGraph
+from . kinematics import Mechanism
+from . profiler import timed
+from . drivers import remove_rotation_drivers
+from . constraints import remove_gear_constraints
+from . evaluate import (
+    iter_angle_blocks,
+    rotation_channel,
+)
+from . rotations import rotation_kind, rotation_paths, spin_values, EULER
+
+# RNA enum values for Keyframe.interpolation, as foreach_set wants them
+INTERP_LINEAR = 1
+
+
+def ensure_action(obj):
+    if not obj.animation_data:
+        obj.animation_data_create()
+
+    if not obj.animation_data.action:
+        obj.animation_data.action = bpy.data.actions.new(obj.name + "Action")
+
+    return obj.animation_data.action
+
+
+def write_fcurve(action, data_path, index, frames, values, group=None):
+    """Replaces an F-Curve's keys with frames/values in one foreach_set"""
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve:
+        action.fcurves.remove(fcurve)
+
+    if group:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    else:
+        fcurve = action.fcurves.new(data_path, index=index)
+
+    count = len(frames)
+    co = np.empty((count, 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+
+    points = fcurve.keyframe_points
+    points.add(count)
+    points.foreach_set("co", co.ravel())
+    points.foreach_set("interpolation", np.full(count, INTERP_LINEAR, dtype=np.int32))
+
+    fcurve.update()
+    return fcurve
+
+
+def bake_angles(graph, objects, frames, block, angles):
+    """Keys precomputed angles, one row per gear index in block"""
+    objs = [objects[graph.records[i].name] for i in block]
+    axes = np.array([rotation_channel(graph.records[i]) for i in block], dtype=np.int64)
+    kinds = np.array([rotation_kind(obj.rotation_mode) for obj in objs])
+
+    # Quaternion and axis-angle gears key every channel; Euler gears
+    # only the one they spin on
+    channels = {}
+    for kind in set(kinds.tolist()):
+        if kind == EULER:
+            continue
+        rows = np.flatnonzero(kinds == kind)
+        channels[kind] = (rows, spin_values(kind, axes[rows], angles[rows]))
+
+    for row, obj in enumerate(objs):
+        # Keys replace whatever drove the gear before; left in place, a
+        # driver or constraint would turn it a second time
+        remove_rotation_drivers(obj)
+        remove_gear_constraints(obj)
+        action = ensure_action(obj)
+        kind = str(kinds[row])
+        data_path = rotation_paths[kind][0]
+
+        if kind == EULER:
+            write_fcurve(action, data_path, int(axes[row]), frames, angles[row], group="Object Transforms")
+            continue
+
+        rows, values = channels[kind]
+        values = values[np.searchsorted(rows, row)]
+        for index in range(values.shape[1]):
+            write_fcurve(action, data_path, index, frames, values[:, index], group="Object Transforms")
+
+
+def bake_indices(mechanism, only=None):
+    indices = mechanism.moving()
+    if only is not None:
+        records = mechanism.graph.records
+        indices = np.asarray([i for i in indices if records[i].name in only], dtype=np.int64)
+    return indices
+
+
+def bake_graph(graph, objects, frames, only=None):
+    """Bakes every motor-driven gear in graph to keyframes on its rotation.
+
+    objects maps record names to Blender objects. When only is given, gears
+    whose names aren't in it are left alone. Returns the number of gears
+    baked.
+    """
+    frames = np.asarray(frames, dtype=np.float64)
+    mechanism = Mechanism(graph)
+    indices = bake_indices(mechanism, only)
+
+    for block, angles in iter_angle_blocks(mechanism, frames, indices):
+        bake_angles(graph, objects, frames, block, angles)
+
+    return len(indices)
+
+
+@timed("bake")
+def bake_scene(scene, frame_start, frame_end, frame_step=1, only=None):
+    graph = GearGraph.from_scene(scene)
+    objects = {rec.name: scene.objects[rec.name] for rec in graph.records}
+    frames = np.arange(frame_start, frame_end + 1, frame_step)
+    return bake_graph(graph, objects, frames, only)
@@ -0,0 +1,228 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Builds synthetic trains in the current scene and times setup, panel
+# drawing and per-frame evaluation under each drive mode. Run it through
+# benchmarks/run.py; nothing here needs a window or a GPU.
+
+import time
+
+import bpy
+
+from .. interface import GE_PT_MainPanel
+from .. graph import GearGraph
+from .. properties import suspend_updates, rebuild_gear_state
+from . trains import trains
+
+# name: (drive_mode, use_flat_chain, use_baked_ratios)
+drive_modes = {
+    "driver": ('DRIVER', False, True),
+    "driver_python": ('DRIVER', False, False),
+    "driver_flat": ('DRIVER', True, True),
+    "constraint": ('CONSTRAINT', False, True),
+    "handler": ('HANDLER', False, True),
+}
+
+
+class RecordingLayout:
+    """Stands in for UILayout so a panel can draw without a window.
+
+    Every call is counted, which doubles as a rough measure of how much
+    work a draw does.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def _add(self, *args, **kwargs):
+        self.calls += 1
+        return self
+
+    row = column = box = split = _add
+
+    def prop(self, *args, **kwargs):
+        self.calls += 1
+
+    def label(self, *args, **kwargs):
+        self.calls += 1
+
+    def separator(self, *args, **kwargs):
+        self.calls += 1
+
+    def template_list(self, *args, **kwargs):
+        self.calls += 1
+
+    def operator(self, *args, **kwargs):
+        self.calls += 1
+        return OperatorProperties()
+
+
+class OperatorProperties:
+    pass
+
+
+class PanelProxy:
+    def __init__(self):
+        self.layout = RecordingLayout()
+
+
+def clear_scene(scene):
+    bpy.data.batch_remove([obj for obj in scene.objects])
+    bpy.data.batch_remove([action for action in bpy.data.actions])
+
+
+def build_scene(scene, records, mode):
+    """Creates one empty per record and fills in its gear_data"""
+    drive_mode, flat, baked = drive_modes[mode]
+    objects = {}
+
+    # Update callbacks are off while gear_data is filled in, and the whole
+    # batch is brought up to date once at the end, as an import does
+    with suspend_updates():
+        fill_scene(records, objects, drive_mode, flat, baked)
+
+    for obj in objects.values():
+        scene.collection.objects.link(obj)
+
+    rebuild_gear_state(objects.values())
+    return objects
+
+
+def fill_scene(records, objects, drive_mode, flat, baked):
+    for rec in records:
+        obj = bpy.data.objects.new(rec.name, None)
+        objects[rec.name] = obj
+        data = obj.gear_data
+
+        for src in rec.rings:
+            ring = data.gears.add()
+            ring.name = src.name
+            ring.teeth = src.teeth
+            ring.axis = src.axis
+            ring.flip = src.flip
+            ring.gear_type = src.gear_type
+            ring.gear_mode = src.gear_mode
+            ring.planetary_subtype = src.planetary_subtype
+            ring.parent_obj = obj
+
+        data.driver_type = rec.driver_type
+        data.drive_mode = drive_mode
+        data.use_flat_chain = flat
+        data.use_baked_ratios = baked
+        data.motor.speed = rec.speed
+
+        if rec.drive_object:
+            data.drive_object = objects[rec.drive_object]
+            data.drive_gear = rec.drive_gear
+        data.driven_gear = 0
+
+
+def select_only(context, objects):
+    for obj in context.view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def init_rig(context, objects, mode):
+    """Runs the setup operators the way a user would for this drive mode"""
+    motors = [obj for obj in objects.values() if obj.gear_data.driver_type == 'MOTOR']
+    gears = [obj for obj in objects.values() if obj.gear_data.driver_type != 'MOTOR']
+
+    if mode == "constraint":
+        select_only(context, motors)
+        seconds = timed(bpy.ops.ge.init_drivers)
+        select_only(context, gears)
+        seconds += timed(bpy.ops.ge.init_constraint)
+        return "init_constraint", seconds
+
+    select_only(context, motors + gears)
+    return "init_drivers", timed(bpy.ops.ge.init_drivers)
+
+
+def time_draw(context, obj, repeat):
+    context.view_layer.objects.active = obj
+    proxy = PanelProxy()
+
+    start = time.perf_counter()
+    for i in range(repeat):
+        GE_PT_MainPanel.draw(proxy, context)
+    return (time.perf_counter() - start) / repeat
+
+
+def time_frames(scene, frames):
+    start = time.perf_counter()
+    for frame in range(1, frames + 1):
+        scene.frame_set(frame)
+    return (time.perf_counter() - start) / frames
+
+
+def run_case(context, train, size, mode, frames=24, draw_repeat=20):
+    scene = context.scene
+    clear_scene(scene)
+
+    records = trains[train](size)
+    results = []
+
+    def record(case, seconds, **extra):
+        row = {
+            "train": train,
+            "size": size,
+            "mode": mode,
+            "case": case,
+            "seconds": seconds,
+        }
+        row.update(extra)
+        results.append(row)
+
+    start = time.perf_counter()
+    objects = build_scene(scene, records, mode)
+    record("build", time.perf_counter() - start)
+
+    record("compile_graph", timed(GearGraph.from_scene, scene))
+
+    case, seconds = init_rig(context, objects, mode)
+    record(case, seconds)
+
+    # The deepest gear has the longest getter chain, which is the worst case
+    record(
+        "draw_main_panel",
+        time_draw(context, objects[records[-1].name], draw_repeat),
+        repeat=draw_repeat
+    )
+
+    record("frame", time_frames(scene, frames), frames=frames)
+
+    return results
+
+
+def run(context, train_names, sizes, modes, frames=24):
+    results = []
+    for train in train_names:
+        for size in sizes:
+            for mode in modes:
+                results.extend(run_case(context, train, size, mode, frames))
+    return results
@@ -0,0 +1,106 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Command line entry point for the benchmarks:
+#
+#   blender -b --factory-startup --python benchmarks/run.py -- \
+#       --trains linear fanout --sizes 10 100 1000 --out results.json
+#
+# or, against the stand-in in headless/, under plain Python:
+#
+#   python benchmarks/run.py --sizes 10 100
+#
+# Results are written as a JSON list, one row per timed case.
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+
+ADDON_NAME = "GearEngine"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def use_headless():
+    """Falls back to the bpy stand-in when there's no Blender around"""
+    if importlib.util.find_spec("bpy") is None:
+        sys.path.insert(0, os.path.join(ROOT, "headless"))
+        return True
+    return False
+
+
+def load_addon():
+    """Imports the repo as a package and registers it"""
+    if ADDON_NAME in sys.modules:
+        return sys.modules[ADDON_NAME]
+
+    spec = importlib.util.spec_from_file_location(
+        ADDON_NAME,
+        os.path.join(ROOT, "__init__.py"),
+        submodule_search_locations=[ROOT]
+    )
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_NAME] = addon
+    spec.loader.exec_module(addon)
+    addon.register()
+    return addon
+
+
+def parse_args(argv, in_blender):
+    # Blender keeps its own arguments in front of a lone "--"
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    elif in_blender:
+        argv = []
+    else:
+        argv = argv[1:]
+
+    parser = argparse.ArgumentParser(description="GearEngine benchmarks")
+    parser.add_argument("--trains", nargs="+", default=["linear", "fanout", "planetary", "worm"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument(
+        "--modes", nargs="+",
+        default=["driver", "driver_python", "driver_flat", "constraint", "handler"]
+    )
+    parser.add_argument("--frames", type=int, default=24)
+    parser.add_argument("--out", default="", help="Write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    headless = use_headless()
+    args = parse_args(argv, not headless)
+    load_addon()
+
+    import bpy
+    bench = importlib.import_module(ADDON_NAME + ".benchmarks.bench_gears")
+    results = bench.run(bpy.context, args.trains, args.sizes, args.modes, args.frames)
+
+    text = json.dumps(results, indent=1)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,129 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Synthetic gear trains for the benchmarks. Each generator returns a list
+# of GearRecords (motor first), so the same trains can feed GearGraph
+# directly or be turned into Blender objects by bench_gears.py.
+
+from .. graph import GearRecord, RingRecord
+
+
+def linear_train(size):
+    """One long reduction chain: motor -> gear -> gear -> ..."""
+    records = [GearRecord(
+        "Motor", [RingRecord(teeth=12)], driver_type='MOTOR', speed=1.0
+    )]
+
+    for i in range(1, size):
+        teeth = 12 if i % 2 else 36
+        records.append(GearRecord(
+            "Gear.%05d" % i,
+            [RingRecord(teeth=teeth, flip=bool(i % 2))],
+            drive_object=records[-1].name,
+            drive_gear=0,
+        ))
+
+    return records
+
+
+def fanout_train(size):
+    """One motor driving every other gear directly"""
+    records = [GearRecord(
+        "Motor", [RingRecord(teeth=60)], driver_type='MOTOR', speed=1.0
+    )]
+
+    for i in range(1, size):
+        records.append(GearRecord(
+            "Gear.%05d" % i,
+            [RingRecord(teeth=10 + (i % 40))],
+            drive_object="Motor",
+            drive_gear=0,
+        ))
+
+    return records
+
+
+def planetary_train(size):
+    """Stacked planetary stages: sun, three planets and a ring each.
+
+    Each stage's sun is driven by the previous stage's ring.
+    """
+    records = [GearRecord(
+        "Motor", [RingRecord(teeth=16)], driver_type='MOTOR', speed=1.0
+    )]
+    previous = "Motor"
+    stage = 0
+
+    while len(records) < size:
+        sun = "Sun.%05d" % stage
+        records.append(GearRecord(
+            sun, [RingRecord(teeth=16)], drive_object=previous, drive_gear=0
+        ))
+
+        for p in range(3):
+            records.append(GearRecord(
+                "Planet.%05d.%d" % (stage, p),
+                [RingRecord(teeth=24, gear_type='PLANETARY', planetary_subtype='PLANET')],
+                drive_object=sun,
+                drive_gear=0,
+            ))
+
+        ring = "Ring.%05d" % stage
+        records.append(GearRecord(
+            ring,
+            [RingRecord(teeth=64, gear_type='PLANETARY', planetary_subtype='RING', gear_mode='A')],
+            drive_object=sun,
+            drive_gear=0,
+        ))
+
+        previous = ring
+        stage += 1
+
+    return records[:size]
+
+
+def worm_train(size):
+    """Alternating worms and wheels, each wheel turning the next worm"""
+    records = [GearRecord(
+        "Motor", [RingRecord(teeth=30)], driver_type='MOTOR', speed=1.0
+    )]
+
+    for i in range(1, size):
+        if i % 2:
+            ring = RingRecord(teeth=2, gear_type='WORM')
+        else:
+            ring = RingRecord(teeth=30)
+
+        records.append(GearRecord(
+            "Gear.%05d" % i,
+            [ring],
+            drive_object=records[-1].name,
+            drive_gear=0,
+        ))
+
+    return records
+
+
+trains = {
+    "linear": linear_train,
+    "fanout": fanout_train,
+    "planetary": planetary_train,
+    "worm": worm_train,
+}
@@ -0,0 +1,141 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Same plan/apply split as drivers.py, for the constraint drive mode.
+# The constraint we own is found by name, so running this again updates
+# it in place instead of stacking another one on top.
+
+import math
+
+from . drivers import set_if_changed
+from . properties import shaft_axis
+
+CONSTRAINT_NAME = "GearEngine"
+
+axes = ('x', 'y', 'z')
+
+
+class ConstraintPlan:
+    """Every setting the gear's Transformation constraint should have"""
+    __slots__ = ("obj", "settings")
+
+    def __init__(self, obj, settings):
+        self.obj = obj
+        self.settings = settings
+
+
+def plan_constraint(obj):
+    """Returns a (plan, error) pair; plan is None when obj can't be driven"""
+    data = obj.gear_data
+    drive_obj = data.drive_object
+
+    if data.driver_type == 'MOTOR':
+        return None, "Motors are driven by drivers"
+
+    if not drive_obj:
+        return None, "No drive object"
+
+    if data.driven_gear < 0 or data.driven_gear >= len(data.gears):
+        return None, "Invalid index. Output Ring doesn't exist"
+
+    if data.drive_gear < 0 or data.drive_gear >= len(drive_obj.gear_data.gears):
+        return None, "Invalid index. Input Ring doesn't exist"
+
+    main_gear = data.gears[data.driven_gear]
+    drive_axis = shaft_axis(drive_obj).lower()
+
+    settings = {
+        "target": drive_obj,
+        "use_motion_extrapolate": True,
+        "map_from": 'ROTATION',
+        "map_to": 'ROTATION',
+    }
+
+    # Every axis gets a value, so switching axes clears the old one
+    for axis in axes:
+        # The input ring turns with its whole shaft, whichever ring it is
+        if axis == drive_axis:
+            settings["from_max_%s_rot" % axis] = math.radians(360)
+        else:
+            settings["from_max_%s_rot" % axis] = 0.0
+
+        if axis == main_gear.axis.lower():
+            settings["to_max_%s_rot" % axis] = -math.radians(360) * main_gear.drive_ratio
+        else:
+            settings["to_max_%s_rot" % axis] = 0.0
+
+    return ConstraintPlan(obj, settings), None
+
+
+def is_legacy(constraint, obj):
+    """Constraints made before they were named, by the old init operator"""
+    return (
+        constraint.type == 'TRANSFORM'
+        and constraint.target == obj.gear_data.drive_object
+        and getattr(constraint, "map_from", None) == 'ROTATION'
+        and getattr(constraint, "map_to", None) == 'ROTATION'
+    )
+
+
+def find_constraints(obj, adopt_legacy=False):
+    found = [c for c in obj.constraints if c.name.startswith(CONSTRAINT_NAME)]
+    if not found and adopt_legacy:
+        found = [c for c in obj.constraints if is_legacy(c, obj)]
+    return found
+
+
+def apply_constraint_plan(plan):
+    """Brings obj's gear constraint in line with plan. Returns True if
+    anything had to change."""
+    obj = plan.obj
+    changed = False
+
+    found = find_constraints(obj, adopt_legacy=True)
+
+    # Earlier versions added one per run, so only the first survives
+    for constraint in found[1:]:
+        obj.constraints.remove(constraint)
+        changed = True
+
+    if found:
+        constraint = found[0]
+    else:
+        constraint = obj.constraints.new('TRANSFORM')
+        changed = True
+
+    changed |= set_if_changed(constraint, "name", CONSTRAINT_NAME)
+
+    for attr, value in plan.settings.items():
+        if isinstance(value, float):
+            if not math.isclose(getattr(constraint, attr, 0.0), value, rel_tol=1e-6, abs_tol=1e-9):
+                setattr(constraint, attr, value)
+                changed = True
+        else:
+            changed |= set_if_changed(constraint, attr, value)
+
+    return changed
+
+
+def remove_gear_constraints(obj):
+    # Unnamed ones from the old init operator drive the gear just the same
+    found = find_constraints(obj, adopt_legacy=True)
+    for constraint in found:
+        obj.constraints.remove(constraint)
+    return bool(found)
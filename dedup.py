@@ -0,0 +1,181 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Finds gear meshes that are identical in everything but name and points
+# their objects at one copy. Meshes are bucketed by element counts first,
+# so only meshes that could match get read and hashed at all.
+
+import hashlib
+from collections import defaultdict
+
+import bpy
+import numpy as np
+
+from . meshes import MESH_KEY
+
+
+def mesh_counts(mesh):
+    return (len(mesh.vertices), len(mesh.edges), len(mesh.loops), len(mesh.polygons))
+
+
+def read_array(collection, attr, count, dtype):
+    values = np.empty(count, dtype=dtype)
+    collection.foreach_get(attr, values)
+    return values
+
+
+def mesh_arrays(mesh):
+    verts, edges, loops, polys = mesh_counts(mesh)
+
+    arrays = [
+        read_array(mesh.vertices, "co", verts * 3, np.float32),
+        read_array(mesh.edges, "vertices", edges * 2, np.int32),
+        read_array(mesh.loops, "vertex_index", loops, np.int32),
+        read_array(mesh.polygons, "loop_start", polys, np.int32),
+        read_array(mesh.polygons, "loop_total", polys, np.int32),
+        read_array(mesh.polygons, "material_index", polys, np.int32),
+        read_array(mesh.polygons, "use_smooth", polys, bool),
+    ]
+
+    # Merging meshes that only differ in UVs would quietly lose the UVs
+    for layer in mesh.uv_layers:
+        arrays.append(read_array(layer.data, "uv", loops * 2, np.float32))
+
+    # Same goes for vertex colors. Before 3.2 they're per-loop only.
+    for layer in color_layers(mesh):
+        arrays.append(np.frombuffer(repr(color_layer_key(layer)).encode(), dtype=np.uint8))
+        arrays.append(read_array(layer.data, "color", len(layer.data) * 4, np.float32))
+
+    return arrays
+
+
+def color_layers(mesh):
+    layers = getattr(mesh, "color_attributes", None)
+    if layers is None:
+        layers = mesh.vertex_colors
+    return layers
+
+
+def color_layer_key(layer):
+    return (layer.name, getattr(layer, "domain", 'CORNER'), getattr(layer, "data_type", 'BYTE_COLOR'))
+
+
+def fingerprint(mesh):
+    """Hash of the geometry plus whatever else would make two meshes
+    render differently (materials, smoothing, UVs, colors)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(mesh_counts(mesh)).encode())
+    digest.update(repr([mat.name if mat else "" for mat in mesh.materials]).encode())
+
+    for array in mesh_arrays(mesh):
+        digest.update(array.tobytes())
+
+    return digest.digest()
+
+
+def mesh_bytes(mesh):
+    """Rough size of the core arrays, for reporting"""
+    verts, edges, loops, polys = mesh_counts(mesh)
+    return verts * 12 + edges * 8 + loops * 8 + polys * 12
+
+
+def pick_keeper(meshes):
+    # A generated mesh keeps its cache key; otherwise keep the oldest name
+    for mesh in meshes:
+        if mesh.get(MESH_KEY):
+            return mesh
+    return min(meshes, key=lambda mesh: mesh.name)
+
+
+class DedupResult:
+    __slots__ = ("groups", "relinked", "removed", "bytes_saved")
+
+    def __init__(self):
+        self.groups = 0
+        self.relinked = 0
+        self.removed = 0
+        self.bytes_saved = 0
+
+
+def gear_mesh_users(objects):
+    """Editable mesh objects with gear rings, grouped by mesh"""
+    users = defaultdict(list)
+    for obj in objects:
+        if obj.type != 'MESH' or obj.library or obj.data is None:
+            continue
+        if obj.data.library or obj.mode == 'EDIT':
+            continue
+        # Shape keys and custom normals live on the mesh, and aren't
+        # worth comparing
+        if obj.data.shape_keys or obj.data.has_custom_normals:
+            continue
+        if len(obj.gear_data.gears) == 0:
+            continue
+        users[obj.data].append(obj)
+    return users
+
+
+def dedup_meshes(objects, remove_orphans=True):
+    result = DedupResult()
+    users = gear_mesh_users(objects)
+
+    buckets = defaultdict(list)
+    for mesh in users:
+        buckets[mesh_counts(mesh)].append(mesh)
+
+    replaced = []
+    for candidates in buckets.values():
+        if len(candidates) < 2:
+            continue
+
+        groups = defaultdict(list)
+        for mesh in candidates:
+            groups[fingerprint(mesh)].append(mesh)
+
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+
+            keeper = pick_keeper(group)
+            result.groups += 1
+
+            for mesh in group:
+                if mesh == keeper:
+                    continue
+                for obj in users[mesh]:
+                    obj.data = keeper
+                    result.relinked += 1
+                replaced.append(mesh)
+
+    if replaced:
+        # Anything else still pointing at a mesh keeps it alive
+        still_used = {obj.data for obj in bpy.data.objects if obj.type == 'MESH'}
+        orphans = [
+            mesh for mesh in replaced
+            if mesh not in still_used and not mesh.use_fake_user
+        ]
+        result.bytes_saved = sum(mesh_bytes(mesh) for mesh in orphans)
+
+        # Left alone, orphans still go away on the next save and reload
+        if remove_orphans:
+            result.removed = len(orphans)
+            bpy.data.batch_remove(orphans)
+
+    return result
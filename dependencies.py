@@ -0,0 +1,108 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# GearSet only points upstream, at its drive object. This keeps the other
+# direction, so an edit can find what it affects without scanning the scene.
+
+from collections import deque
+
+
+class DependencyIndex:
+    """Drive object -> driven objects, keyed by as_pointer()"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.built = False
+        self.object_count = -1
+        self.drive_of = {}    # driven pointer -> drive pointer
+        self.dependents = {}  # drive pointer -> {driven pointer: driven object}
+
+    def build(self, objects):
+        self.clear()
+        objects = list(objects)
+
+        for obj in objects:
+            data = getattr(obj, "gear_data", None)
+            if data is not None:
+                self.set_drive(obj, data.drive_object)
+
+        self.object_count = len(objects)
+        self.built = True
+
+    def ensure(self, objects):
+        """Builds the index on first use, or when objects were removed
+        behind our back, since it would hand out dead references.
+
+        New objects don't need a rebuild. Their links arrive one at a time
+        through the drive_object callback, or through add() for duplicates
+        and appends, which don't run callbacks.
+        """
+        count = len(objects)
+        if not self.built or count < self.object_count:
+            self.build(objects)
+        else:
+            self.object_count = count
+
+    def add(self, obj):
+        """Picks up obj's drive link if the index hasn't seen it"""
+        if not self.built or obj.as_pointer() in self.drive_of:
+            return
+        data = getattr(obj, "gear_data", None)
+        if data is not None and data.drive_object:
+            self.set_drive(obj, data.drive_object)
+
+    def set_drive(self, obj, drive_obj):
+        key = obj.as_pointer()
+
+        old = self.drive_of.pop(key, None)
+        if old is not None:
+            driven = self.dependents.get(old)
+            if driven is not None:
+                driven.pop(key, None)
+                if not driven:
+                    del self.dependents[old]
+
+        if drive_obj is not None:
+            drive_key = drive_obj.as_pointer()
+            self.drive_of[key] = drive_key
+            self.dependents.setdefault(drive_key, {})[key] = obj
+
+    def direct(self, obj):
+        return list(self.dependents.get(obj.as_pointer(), {}).values())
+
+    def downstream(self, obj):
+        """Every object driven by obj, directly or not, parents first"""
+        found = []
+        seen = {obj.as_pointer()}
+        queue = deque([obj.as_pointer()])
+
+        while queue:
+            key = queue.popleft()
+            for child_key, child in self.dependents.get(key, {}).items():
+                # Drive loops would otherwise go round forever
+                if child_key in seen:
+                    continue
+                seen.add(child_key)
+                found.append(child)
+                queue.append(child_key)
+
+        return found
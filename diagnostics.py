@@ -0,0 +1,135 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Everything wrong with a scene's gear setup, worked out in one pass over
+# the compiled graph and kept until the next structural edit. Ratio edits
+# only patch the objects they touched. The UI only reads this; nothing
+# here writes to a property.
+
+from . import properties
+from . graph import GearGraph, DRIVE_LOOP, DRIVEN_BY_LOOP, link_state, snapshot_object
+from . kinematics import Mechanism
+
+
+class Diagnostics:
+
+    def __init__(self, scene):
+        self.key = diagnostics_key(scene)
+        self.stale = False
+
+        graph = GearGraph.from_scene(scene)
+        mechanism = Mechanism(graph)
+        objects = scene.objects
+        self.members = {objects[rec.name].as_pointer() for rec in graph.records}
+
+        # Loops the solver can turn aren't errors; the ones it can't say so
+        errors = dict(graph.errors)
+        for i, err in graph.errors.items():
+            if err in (DRIVE_LOOP, DRIVEN_BY_LOOP) and mechanism.rows[i]:
+                del errors[i]
+        errors.update(mechanism.errors)
+
+        # Keyed by pointer, so renaming an object doesn't lose its entry
+        self.errors = {}
+        for i, err in errors.items():
+            self.errors[objects[graph.records[i].name].as_pointer()] = err
+
+        self.zero_rings = {}
+        for rec in graph.records:
+            empty = [i for i, ring in enumerate(rec.rings) if ring.teeth == 0]
+            if empty:
+                self.zero_rings[objects[rec.name].as_pointer()] = empty
+
+        self.loops = [graph.records[i].name for i in graph.loops() if errors.get(i) == DRIVE_LOOP]
+
+        # Constraints copy one drive object's rotation, which these can't use
+        self.solved = {graph.records[i].name for i in mechanism.coupled}
+
+    def patch(self, objects):
+        """Works errors out again for objects after a ratio edit.
+
+        Link errors only depend on an object and its drive object, so
+        that's all this reads. Gears the solver couples are another matter,
+        since a new ratio can lock a loop, so those mark the whole thing for
+        a rebuild instead.
+        """
+        for obj in objects:
+            key = obj.as_pointer()
+            if key not in self.members:
+                continue
+            if obj.name in self.solved:
+                self.stale = True
+                return
+
+            teeth = [i for i, ring in enumerate(obj.gear_data.gears) if ring.teeth == 0]
+            if teeth:
+                self.zero_rings[key] = teeth
+            else:
+                self.zero_rings.pop(key, None)
+
+            # Loops are structural; an edit can't start or end one
+            if self.errors.get(key) in (DRIVE_LOOP, DRIVEN_BY_LOOP):
+                continue
+
+            drive_obj = obj.gear_data.drive_object
+            drive = None
+            if drive_obj and len(drive_obj.gear_data.gears):
+                drive = snapshot_object(drive_obj)
+
+            error, ratio = link_state(snapshot_object(obj), drive)
+            if error:
+                self.errors[key] = error
+            else:
+                self.errors.pop(key, None)
+
+    def error(self, obj):
+        return self.errors.get(obj.as_pointer())
+
+    def ring_has_teeth(self, obj, index):
+        return index not in self.zero_rings.get(obj.as_pointer(), ())
+
+    def __len__(self):
+        return len(self.errors)
+
+
+def diagnostics_key(scene):
+    # Not ratio_version: ratio edits are patched in by patch_diagnostics
+    return (properties.gear_version, len(scene.objects))
+
+
+# One per scene, rebuilt on the first read after an edit
+diagnostics_cache = {}
+
+
+def get_diagnostics(scene):
+    diag = diagnostics_cache.get(scene.name)
+    if diag is None or diag.stale or diag.key != diagnostics_key(scene):
+        diag = Diagnostics(scene)
+        diagnostics_cache[scene.name] = diag
+    return diag
+
+
+def patch_diagnostics(objects):
+    for diag in diagnostics_cache.values():
+        diag.patch(objects)
+
+
+def clear_diagnostics():
+    diagnostics_cache.clear()
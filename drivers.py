@@ -0,0 +1,455 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Driver setup is split into a planning pass and an apply pass, so a whole
+# selection can be worked out up front and then written in one go, without
+# bouncing through bpy.ops for every object.
+
+from collections import namedtuple
+
+from . properties import refresh_ratios, float_changed, shaft_axis
+from . graph import GearGraph, axis_map, DRIVE_LOOP
+from . speedcurve import speed_fcurve
+from . kinematics import Mechanism
+from . rotations import (
+    rotation_kind,
+    rotation_paths,
+    spin_values,
+    spin_channels,
+    EULER,
+    QUATERNION,
+)
+
+MOTOR_EXPRESSION = '(frame/FPS) * speed'
+GEAR_EXPRESSION = '((flip * 2) - 1) * (ratio * angle)'
+FLAT_EXPRESSION = '(frame/FPS) * speed * ratio'
+
+# Motors with keyframed speed read the angle the frame handler integrated
+SPIN_EXPRESSION = 'spin'
+FLAT_SPIN_EXPRESSION = 'spin * ratio'
+
+DriverVar = namedtuple("DriverVar", ["name", "id", "data_path"])
+
+
+# Every property a rotation driver could sit on
+ROTATION_PATHS = tuple(path for path, width in rotation_paths.values())
+
+
+class DriverPlan:
+    """Everything needed to build the rotation drivers on one object.
+
+    angle is an expression for the spin about axis. How many drivers that
+    takes, and on which property, depends on the object's rotation mode.
+    """
+    __slots__ = ("obj", "data_path", "channels", "fixed", "variables", "is_motor", "chain_ratio")
+
+    def __init__(self, obj, axis, variables, angle, is_motor=False, chain_ratio=None):
+        self.obj = obj
+        self.variables = variables
+        self.is_motor = is_motor
+        self.chain_ratio = chain_ratio
+        self.data_path, self.channels, self.fixed = rotation_channels(obj.rotation_mode, axis, angle)
+
+
+def rotation_channels(mode, axis, angle):
+    """Returns the data path, {index: expression} for the channels that
+    move, and {index: value} for the ones that stay put"""
+    kind = rotation_kind(mode)
+    path, width = rotation_paths[kind]
+    moving = spin_channels(kind, axis)
+
+    if kind == QUATERNION:
+        channels = {0: "cos((%s) / 2)" % angle, moving[1]: "sin((%s) / 2)" % angle}
+    else:
+        channels = {moving[0]: angle}
+
+    # Euler channels on other axes are left alone, so Euler gears can
+    # still be keyed or tilted on those
+    fixed = {}
+    if kind != EULER:
+        rest = spin_values(kind, [axis], [0.0])[0]
+        fixed = {i: float(rest[i]) for i in range(width) if i not in channels}
+
+    return path, channels, fixed
+
+
+def reads_euler(obj):
+    return rotation_kind(obj.rotation_mode) == EULER
+
+
+def ratio_path(obj, index):
+    if obj.gear_data.use_baked_ratios:
+        return 'gear_data.gears[%d].baked_ratio' % index
+    return 'gear_data.gears[%d].drive_ratio' % index
+
+
+def fps_path(obj):
+    if obj.gear_data.use_baked_ratios:
+        return 'gear_data.baked_fps'
+    return 'gear_data.fps'
+
+
+def has_rotation_drivers(obj):
+    if not obj.animation_data:
+        return False
+    return any(d.data_path in ROTATION_PATHS for d in obj.animation_data.drivers)
+
+
+def driver_axis(obj):
+    """The axis obj's rotation driver spins it about, or None"""
+    if not obj.animation_data:
+        return None
+
+    for d in obj.animation_data.drivers:
+        if d.data_path == 'rotation_euler':
+            return "XYZ"[d.array_index]
+        if d.data_path == 'rotation_quaternion' and d.array_index > 0:
+            return "XYZ"[d.array_index - 1]
+        if d.data_path == 'rotation_axis_angle':
+            # The angle's driven; the axis is whichever one's set
+            axis = [abs(v) for v in obj.rotation_axis_angle[1:]]
+            return "XYZ"[axis.index(max(axis))]
+    return None
+
+
+def remove_rotation_drivers(obj):
+    if not obj.animation_data:
+        return False
+
+    prune = [d for d in obj.animation_data.drivers if d.data_path in ROTATION_PATHS]
+    for d in prune:
+        obj.animation_data.drivers.remove(d)
+    return bool(prune)
+
+
+def plan_motor(obj, axis=None):
+    if axis is None:
+        axis = obj.gear_data.motor.axis
+
+    if speed_fcurve(obj) is not None:
+        variables = [DriverVar('spin', obj, 'gear_data.motor.spin')]
+        return DriverPlan(obj, axis_map[axis], variables, SPIN_EXPRESSION, True)
+
+    variables = [
+        DriverVar('FPS', obj, fps_path(obj)),
+        DriverVar('speed', obj, 'gear_data.motor.speed'),
+    ]
+    return DriverPlan(obj, axis_map[axis], variables, MOTOR_EXPRESSION, True)
+
+
+def plan_gear(obj):
+    """Returns a (plan, error) pair; plan is None when obj can't be driven"""
+    data = obj.gear_data
+
+    if data.driver_type == 'MOTOR':
+        return plan_motor(obj), None
+
+    if not data.drive_object:
+        return None, "No drive object"
+
+    # The angle variable reads the drive object's Euler rotation, about
+    # whatever axis its shaft turns on
+    if not reads_euler(data.drive_object):
+        return None, "Drive object isn't in an Euler rotation mode"
+
+    if data.driven_gear < 0 or data.driven_gear >= len(data.gears):
+        return None, "Invalid index. Output Ring doesn't exist"
+
+    main_gear = data.gears[data.driven_gear]
+    drive_axis = axis_map[shaft_axis(data.drive_object)]
+    variables = [
+        DriverVar('ratio', obj, ratio_path(obj, data.driven_gear)),
+        DriverVar('flip', obj, 'gear_data.gears[%d].flip' % data.driven_gear),
+        DriverVar('angle', data.drive_object, 'rotation_euler[%d]' % drive_axis),
+    ]
+    return DriverPlan(obj, axis_map[main_gear.axis], variables, GEAR_EXPRESSION), None
+
+
+def plan_flat(obj, graph, lookup):
+    """Drives obj straight from its root motor's clock.
+
+    The driver only reads properties on obj and on the motor, never another
+    gear's rotation, so every gear in the train is an independent leaf in
+    the depsgraph no matter how deep the chain is.
+    """
+    i = graph.index.get(obj.name)
+    if i is None:
+        return None, "Not in the gear graph"
+
+    if i in graph.errors:
+        return None, graph.errors[i]
+
+    root = graph.records[graph.root[i]]
+    if root.driver_type != 'MOTOR':
+        return None, "Not driven by a motor"
+
+    if graph.cumulative[i] == 0.0:
+        return None, "Broken link further up the chain"
+
+    motor = lookup[root.name]
+    if speed_fcurve(motor) is not None:
+        variables = [
+            DriverVar('spin', motor, 'gear_data.motor.spin'),
+            DriverVar('ratio', obj, 'gear_data.chain_ratio'),
+        ]
+        expression = FLAT_SPIN_EXPRESSION
+    else:
+        variables = [
+            DriverVar('FPS', motor, fps_path(motor)),
+            DriverVar('speed', motor, 'gear_data.motor.speed'),
+            DriverVar('ratio', obj, 'gear_data.chain_ratio'),
+        ]
+        expression = FLAT_EXPRESSION
+
+    return DriverPlan(
+        obj,
+        axis_map[obj.gear_data.gears[obj.gear_data.driven_gear].axis],
+        variables,
+        expression,
+        chain_ratio=graph.cumulative[i]
+    ), None
+
+
+def plan_solved(obj, mechanism, lookup):
+    """Drives obj straight from the motors its solved velocity mixes.
+
+    Planets, planetary set outputs and closed loops can't be written as one
+    ratio times one drive object's angle, so these read every motor they
+    depend on instead, with the solved coefficients baked into the
+    expression. Like flat chains, they need a refresh after upstream edits.
+    """
+    graph = mechanism.graph
+    i = graph.index.get(obj.name)
+    if i is None:
+        return None, "Not in the gear graph"
+
+    if i in mechanism.errors:
+        return None, mechanism.errors[i]
+
+    if obj.gear_data.driven_gear < 0 or obj.gear_data.driven_gear >= len(obj.gear_data.gears):
+        return None, "Invalid index. Output Ring doesn't exist"
+
+    row = mechanism.rows[i]
+    if not row:
+        return None, "Not driven by a motor"
+
+    variables = [DriverVar('FPS', obj, fps_path(obj))]
+    clocked = []
+    integrated = []
+    for k, (slot, coefficient) in enumerate(sorted(row.items())):
+        motor = lookup[graph.records[mechanism.motors[slot]].name]
+        if speed_fcurve(motor) is not None:
+            variables.append(DriverVar('spin%d' % k, motor, 'gear_data.motor.spin'))
+            integrated.append('%r * spin%d' % (coefficient, k))
+        else:
+            variables.append(DriverVar('speed%d' % k, motor, 'gear_data.motor.speed'))
+            clocked.append('%r * speed%d' % (coefficient, k))
+
+    terms = list(integrated)
+    if clocked:
+        terms.insert(0, '(frame/FPS) * (%s)' % ' + '.join(clocked))
+    else:
+        variables = variables[1:]
+
+    return DriverPlan(
+        obj,
+        axis_map[obj.gear_data.gears[obj.gear_data.driven_gear].axis],
+        variables,
+        ' + '.join(terms).replace('+ -', '- ')
+    ), None
+
+
+def tree_like(mechanism, i):
+    """Whether i's solved row is what the drive chain gives on its own,
+    so the usual per-link drivers are right for it"""
+    graph = mechanism.graph
+    row = mechanism.rows[i]
+    if i in mechanism.coupled or len(row) > 1:
+        return False
+    if not row:
+        return True
+
+    slot, coefficient = next(iter(row.items()))
+    if graph.root[i] != mechanism.motors[slot]:
+        return False
+    return abs(coefficient - graph.cumulative[i]) <= 1e-9 * max(1.0, abs(coefficient))
+
+
+def plan_drivers(objects, scene=None):
+    """Plans drivers for every gear in objects.
+
+    Returns the plans, a list of (object, reason) for anything skipped,
+    and the handler-driven objects, which shouldn't have drivers at all.
+    """
+    plans = []
+    skipped = []
+    released = []
+
+    # Flattened chains need the whole train, so compile it once up front
+    graph = None
+    mechanism = None
+    lookup = None
+    loops = set()
+    if scene is not None:
+        lookup = {obj.name: obj for obj in scene.objects}
+        graph = GearGraph.from_scene(scene)
+        mechanism = Mechanism(graph)
+        loops = {graph.records[i].name for i in graph.loops()}
+
+    for obj in objects:
+        if not hasattr(obj, "gear_data"):
+            continue
+
+        if len(obj.gear_data.gears) == 0:
+            continue
+
+        if obj.gear_data.drive_mode == 'HANDLER':
+            released.append(obj)
+            continue
+
+        data = obj.gear_data
+
+        # Planetary sets, closed loops, and anything whose chain runs
+        # through them are solved rather than chained
+        if mechanism is not None and data.driver_type == 'OBJ':
+            i = graph.index.get(obj.name)
+            if i is not None and not tree_like(mechanism, i):
+                plan, err = plan_solved(obj, mechanism, lookup)
+                if plan:
+                    plans.append(plan)
+                else:
+                    skipped.append((obj, err))
+                continue
+
+        # A driver loop just makes the depsgraph spin on a cycle
+        if obj.name in loops:
+            skipped.append((obj, DRIVE_LOOP))
+            continue
+
+        # Quaternion and axis-angle drive objects have no angle a driver
+        # can read without wrapping, so their gears run off the motor clock
+        clocked = data.use_flat_chain or (data.drive_object and not reads_euler(data.drive_object))
+        if clocked and data.driver_type == 'OBJ' and graph is not None:
+            plan, err = plan_flat(obj, graph, lookup)
+        else:
+            plan, err = plan_gear(obj)
+
+        if plan:
+            plans.append(plan)
+        else:
+            skipped.append((obj, err))
+
+    return plans, skipped, released
+
+
+def set_if_changed(struct, attr, value):
+    """Writes only when the value differs, since every RNA write tags the
+    owner for a depsgraph update, and driver edits rebuild relations"""
+    if getattr(struct, attr) != value:
+        setattr(struct, attr, value)
+        return True
+    return False
+
+
+def sync_variables(driver, variables):
+    changed = False
+
+    wanted = {var.name for var in variables}
+    for var in [v for v in driver.variables if v.name not in wanted]:
+        driver.variables.remove(var)
+        changed = True
+
+    for var in variables:
+        dvar = driver.variables.get(var.name)
+        if dvar is None:
+            dvar = driver.variables.new()
+            dvar.name = var.name
+            changed = True
+
+        changed |= set_if_changed(dvar, "type", 'SINGLE_PROP')
+        target = dvar.targets[0]
+        changed |= set_if_changed(target, "id_type", 'OBJECT')
+        changed |= set_if_changed(target, "id", var.id)
+        changed |= set_if_changed(target, "data_path", var.data_path)
+
+    return changed
+
+
+def apply_plan(plan):
+    """Brings obj's rotation drivers in line with plan, touching only what
+    differs. Returns True if anything had to change."""
+    obj = plan.obj
+    fcurves = {}
+    changed = False
+
+    # Drivers are per-channel, so a driver on any other rotation channel
+    # is left over from a different axis or rotation mode and gets pruned.
+    if obj.animation_data:
+        prune = []
+        for d in obj.animation_data.drivers:
+            if d.data_path not in ROTATION_PATHS:
+                continue
+            if d.data_path == plan.data_path and d.array_index in plan.channels and d.array_index not in fcurves:
+                fcurves[d.array_index] = d
+            else:
+                prune.append(d)
+
+        for d in prune:
+            obj.animation_data.drivers.remove(d)
+            changed = True
+
+    for index, expression in plan.channels.items():
+        fcurve = fcurves.get(index)
+        if not fcurve:
+            fcurve = obj.driver_add(plan.data_path, index)
+            changed = True
+
+        driver = fcurve.driver
+        changed |= set_if_changed(driver, "type", 'SCRIPTED')
+        changed |= sync_variables(driver, plan.variables)
+        changed |= set_if_changed(driver, "expression", expression)
+
+    rotation = getattr(obj, plan.data_path)
+    for index, value in plan.fixed.items():
+        if float_changed(rotation[index], value):
+            rotation[index] = value
+            changed = True
+
+    data = obj.gear_data
+    if plan.chain_ratio is not None and float_changed(data.chain_ratio, plan.chain_ratio):
+        data.chain_ratio = plan.chain_ratio
+        changed = True
+
+    if plan.is_motor:
+        changed |= set_if_changed(data.motor, "enabled", True)
+        if len(data.gears) < 1:
+            data.gears.add()
+            data.gears[-1].parent_obj = obj
+            changed = True
+
+    if data.use_baked_ratios:
+        changed |= refresh_ratios(obj)
+
+    return changed
+
+
+def apply_plans(plans):
+    """Returns how many of the plans actually changed something"""
+    return sum(1 for plan in plans if apply_plan(plan))
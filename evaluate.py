@@ -0,0 +1,114 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Array math over a compiled GearGraph, or the Mechanism solved from one.
+# Like graph.py, this doesn't touch bpy; NumPy ships with Blender, so it's
+# safe to lean on here.
+
+import numpy as np
+
+from . graph import axis_map
+
+
+def gear_gains(graph):
+    """Per-gear radians per second: cumulative ratio * root motor speed.
+    Only right for motors whose speed isn't animated."""
+    cumulative = np.asarray(graph.cumulative, dtype=np.float64)
+    root = np.asarray(graph.root, dtype=np.int64)
+
+    speed = np.array(
+        [graph.root_speed(i) for i in range(len(graph))],
+        dtype=np.float64
+    )
+
+    gains = np.zeros(len(graph), dtype=np.float64)
+    linked = root >= 0
+    gains[linked] = cumulative[linked] * speed[root[linked]]
+    return gains
+
+
+def driven_indices(graph):
+    """Indices of the gears that actually turn with a motor.
+
+    Broken links zero out the cumulative ratio below them, and roots that
+    aren't motors never move, so neither are worth baking.
+    """
+    indices = []
+    for i in graph.order:
+        root = graph.root[i]
+        if graph.records[root].driver_type != 'MOTOR':
+            continue
+        if graph.cumulative[i] == 0.0:
+            continue
+        indices.append(i)
+    return np.asarray(indices, dtype=np.int64)
+
+
+def rotation_channel(rec):
+    """The local axis this gear spins about, which is also the
+    rotation_euler index the drivers put it on"""
+    if rec.driver_type == 'MOTOR':
+        return axis_map[rec.motor_axis]
+    return axis_map[rec.rings[rec.driven_gear].axis]
+
+
+def root_angles(graph, root, frames):
+    """graph.root_angle() over an array of frames"""
+    frames = np.asarray(frames, dtype=np.float64)
+    if root == -1:
+        return np.zeros(len(frames))
+
+    rec = graph.records[root]
+    if rec.driver_type == 'MOTOR' and rec.speed_curve is not None:
+        return rec.speed_curve.spins(frames, graph.fps)
+    return frames * (graph.root_speed(root) / graph.fps)
+
+
+def motor_table(mechanism, frames):
+    """Angles of every motor in a Mechanism, shaped (motors, frames)"""
+    graph = mechanism.graph
+    table = np.empty((len(mechanism.motors), len(frames)), dtype=np.float64)
+    for slot, motor in enumerate(mechanism.motors):
+        table[slot] = root_angles(graph, motor, frames)
+    return table
+
+
+def evaluate_angles(mechanism, frames, indices=None):
+    """Angles for every gear in indices, shaped (len(indices), len(frames))"""
+    if indices is None:
+        indices = np.arange(len(mechanism))
+    return mechanism.table(indices).combine(motor_table(mechanism, frames))
+
+
+def iter_angle_blocks(mechanism, frames, indices=None, block_size=512):
+    """Same as evaluate_angles, but in blocks of gears.
+
+    A full 10k x 10k table is most of a gigabyte, and the bake only needs
+    one row at a time anyway.
+    """
+    if indices is None:
+        indices = np.arange(len(mechanism))
+
+    # Motors are few, so their angles are worked out for every frame once
+    motors = motor_table(mechanism, frames)
+
+    for start in range(0, len(indices), block_size):
+        block = indices[start:start + block_size]
+        yield block, mechanism.table(block).combine(motors)
@@ -0,0 +1,288 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Bakes a whole frame range once, up front, across every core, so render
+# farm nodes don't each evaluate the driver stack for the frames they get:
+#
+#   blender -b shot.blend --python-expr "import GearEngine.farm as f; f.main()" -- \
+#       --workers 16 --bake --save
+#
+# or, to leave the file alone and write per-chunk rotation caches instead:
+#
+#   ... -- --cache //gear_cache
+#
+# or one frame cache (see framecache.py) that every node can map and share:
+#
+#   ... -- --frame-cache //gear_frames.npy
+#
+# The gear graph is compiled once in the Blender process; workers only
+# ever see NumPy arrays.
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from contextlib import contextmanager
+
+import bpy
+import numpy as np
+
+from . graph import GearGraph
+from . evaluate import motor_table, rotation_channel
+from . kinematics import Mechanism
+from . bake import bake_angles, bake_indices
+from . profiler import timed
+from . framecache import cache_paths, write_manifest, clear_frame_caches
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_FORMAT = "gearengine-rotations"
+MANIFEST = "manifest.json"
+
+# Gears times frames below which a pool costs more than it saves. Starting
+# spawned workers takes around 0.4s, and solving runs at about 13ns per
+# gear per frame, with shipping the angles back costing about as much
+# again; so a pool only pays for itself on tens of millions.
+POOL_MIN_WORK = 30_000_000
+
+
+@contextmanager
+def worker_path():
+    """The add-on directory on sys.path, for as long as it's needed.
+
+    Spawned workers unpickle jobs by module name, and can't import
+    farmworker as part of the add-on package without importing bpy too, so
+    it has to be importable under its own name while they start.
+    """
+    added = ADDON_DIR not in sys.path
+    if added:
+        sys.path.append(ADDON_DIR)
+    try:
+        yield
+    finally:
+        if added and ADDON_DIR in sys.path:
+            sys.path.remove(ADDON_DIR)
+
+
+def worker_module():
+    """farmworker, imported under its own top-level name"""
+    with worker_path():
+        import farmworker
+    return farmworker
+
+
+def split_frames(frames, chunks):
+    return [chunk for chunk in np.array_split(frames, chunks) if len(chunk)]
+
+
+def run_jobs(jobs, workers):
+    worker = worker_module()
+    work = sum(job.count * len(job.frames) for job in jobs)
+    if workers <= 1 or len(jobs) <= 1 or work < POOL_MIN_WORK:
+        return [worker.solve_chunk(job) for job in jobs]
+
+    # Forking a running Blender isn't safe, so workers start fresh
+    context = multiprocessing.get_context("spawn")
+    with worker_path(), context.Pool(min(workers, len(jobs))) as pool:
+        return pool.map(worker.solve_chunk, jobs)
+
+
+class FarmPlan:
+    """Everything the workers need, pulled out of the scene once"""
+
+    def __init__(self, scene, frame_start, frame_end, frame_step=1, only=None):
+        self.graph = GearGraph.from_scene(scene)
+        self.objects = {rec.name: scene.objects[rec.name] for rec in self.graph.records}
+        self.mechanism = Mechanism(self.graph)
+        self.frames = np.arange(frame_start, frame_end + 1, frame_step, dtype=np.float64)
+        self.set_indices(bake_indices(self.mechanism, only))
+
+    def set_indices(self, indices):
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.mix = self.mechanism.table(self.indices)
+
+    def job(self, frames, path=None, row=None):
+        # Motor angles are worked out here, since animated speeds need the
+        # F-Curve; there are few enough motors that it's cheap
+        motors = motor_table(self.mechanism, frames)
+        return worker_module().Job(self.mix, motors, frames, path, row)
+
+    def jobs(self, chunks, cache_dir=None):
+        jobs = []
+        for i, frames in enumerate(split_frames(self.frames, chunks)):
+            path = None
+            if cache_dir is not None:
+                path = os.path.join(cache_dir, "chunk_%04d.npy" % i)
+            jobs.append(self.job(frames, path))
+        return jobs
+
+    def names(self):
+        return [self.graph.records[i].name for i in self.indices]
+
+    def manifest(self, jobs):
+        records = [self.graph.records[i] for i in self.indices]
+        return {
+            "format": CACHE_FORMAT,
+            "version": 1,
+            "fps": self.graph.fps,
+            "gears": [rec.name for rec in records],
+            "axes": [rotation_channel(rec) for rec in records],
+            "chunks": [
+                {
+                    "file": os.path.basename(job.path),
+                    "first": float(job.frames[0]),
+                    "last": float(job.frames[-1]),
+                    "step": float(job.frames[1] - job.frames[0]) if len(job.frames) > 1 else 1.0,
+                }
+                for job in jobs
+            ],
+        }
+
+
+@timed("farm")
+def farm_bake(scene, frame_start, frame_end, frame_step=1, workers=None, chunks=None, only=None):
+    """Bakes gears to keyframes, solving chunks of frames in parallel.
+    Returns the number of gears baked."""
+    workers = workers or os.cpu_count() or 1
+    plan = FarmPlan(scene, frame_start, frame_end, frame_step, only)
+    if len(plan.indices) == 0:
+        return 0
+
+    results = run_jobs(plan.jobs(chunks or workers), workers)
+    angles = np.concatenate(results, axis=1)
+
+    # Keying stays in this process, since only it can touch bpy
+    block_size = 512
+    for start in range(0, len(plan.indices), block_size):
+        block = plan.indices[start:start + block_size]
+        bake_angles(plan.graph, plan.objects, plan.frames, block, angles[start:start + block_size])
+
+    return len(plan.indices)
+
+
+@timed("farm")
+def farm_cache(scene, cache_dir, frame_start, frame_end, frame_step=1, workers=None, chunks=None, only=None):
+    """Writes one .npy of angles per chunk of frames, plus a manifest that
+    says which file holds which frames. Returns the manifest."""
+    workers = workers or os.cpu_count() or 1
+    cache_dir = bpy.path.abspath(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    plan = FarmPlan(scene, frame_start, frame_end, frame_step, only)
+    jobs = plan.jobs(chunks or workers, cache_dir)
+    run_jobs(jobs, workers)
+
+    manifest = plan.manifest(jobs)
+    with open(os.path.join(cache_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+@timed("farm")
+def farm_frame_cache(scene, path, frame_start, frame_end, frame_step=1, workers=None, chunks=None, only=None):
+    """Writes a frame cache, with each worker filling its own rows of the
+    one file. Returns the manifest."""
+    workers = workers or os.cpu_count() or 1
+    plan = FarmPlan(scene, frame_start, frame_end, frame_step, only)
+
+    # Motors keep their own drivers, so they go at the end; that way the
+    # handler's rows are usually the leading columns, and a frame is a
+    # plain slice
+    motors = np.array([plan.graph.records[i].driver_type == 'MOTOR' for i in plan.indices], dtype=bool)
+    order = np.concatenate([np.flatnonzero(~motors), np.flatnonzero(motors)]).astype(np.int64)
+    plan.set_indices(plan.indices[order])
+
+    data_path, manifest_path = cache_paths(path)
+    os.makedirs(os.path.dirname(data_path) or ".", exist_ok=True)
+
+    # Open caches keep their manifest, and would go on comparing against
+    # the old signature; they're opened again on the next lookup
+    clear_frame_caches()
+
+    # The manifest goes last, so a half-written cache never looks valid
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    # Filled in next to the target and swapped in whole, so nothing that
+    # still has the old file mapped ever sees it half-written or resized.
+    # Sized up front, so workers only ever open it and write.
+    part_path = os.path.splitext(data_path)[0] + ".part.npy"
+    cache = np.lib.format.open_memmap(
+        part_path, mode='w+', dtype=np.float64, shape=(len(plan.frames), len(plan.indices)))
+    del cache
+
+    jobs = []
+    row = 0
+    for frames in split_frames(plan.frames, chunks or workers):
+        jobs.append(plan.job(frames, part_path, row))
+        row += len(frames)
+
+    try:
+        run_jobs(jobs, workers)
+        os.replace(part_path, data_path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    return write_manifest(path, plan.graph, plan.names(), plan.frames)
+
+
+def parse_args(argv):
+    # Blender keeps its own arguments in front of a lone "--"
+    argv = argv[argv.index("--") + 1:] if "--" in argv else []
+
+    parser = argparse.ArgumentParser(prog="GearEngine farm bake")
+    parser.add_argument("--scene", help="Scene to bake, the active one by default")
+    parser.add_argument("--start", type=int, help="First frame, the scene's by default")
+    parser.add_argument("--end", type=int, help="Last frame, the scene's by default")
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0, help="Processes to use, every core by default")
+    parser.add_argument("--chunks", type=int, default=0, help="Frame chunks, one per worker by default")
+    parser.add_argument("--cache", help="Write rotation caches to this directory instead of baking")
+    parser.add_argument("--frame-cache", help="Write one shared frame cache to this .npy instead of baking")
+    parser.add_argument("--bake", action="store_true", help="Bake keyframes into the file")
+    parser.add_argument("--save", action="store_true", help="Save the .blend after baking")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv if argv is None else argv)
+
+    scene = bpy.data.scenes[args.scene] if args.scene else bpy.context.scene
+    start = scene.frame_start if args.start is None else args.start
+    end = scene.frame_end if args.end is None else args.end
+
+    if args.cache:
+        manifest = farm_cache(scene, args.cache, start, end, args.step, args.workers, args.chunks)
+        print("GearEngine: cached %d gears over %d chunks in %s" % (
+            len(manifest["gears"]), len(manifest["chunks"]), args.cache))
+
+    if args.frame_cache:
+        manifest = farm_frame_cache(scene, args.frame_cache, start, end, args.step, args.workers, args.chunks)
+        print("GearEngine: cached %d gears over %d frames in %s" % (
+            len(manifest["gears"]), manifest["frames"], args.frame_cache))
+
+    if args.bake or not (args.cache or args.frame_cache):
+        count = farm_bake(scene, start, end, args.step, args.workers, args.chunks)
+        print("GearEngine: baked %d gears, frames %d-%d" % (count, start, end))
+
+        if args.save:
+            bpy.ops.wm.save_mainfile()
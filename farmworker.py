@@ -0,0 +1,75 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# The part of a farm bake that runs in worker processes. Workers are
+# spawned, not forked, and import this by its plain module name, so it
+# can't import anything from the add-on package: that would drag bpy into
+# a process that doesn't have it. NumPy only.
+
+import numpy as np
+
+
+class Job:
+    """One chunk of frames for one worker"""
+    __slots__ = ("count", "row_ids", "cols", "values", "motors", "frames", "path", "row")
+
+    def __init__(self, mix, motors, frames, path=None, row=None):
+        # Each gear's angle is a sum of motor angles; the terms are
+        # (row_ids, cols, values), same as kinematics.MotorMix
+        self.count = mix.count
+        self.row_ids = mix.row_ids
+        self.cols = mix.cols
+        self.values = mix.values
+        self.motors = motors  # Motor angles, shaped (motors, frames)
+        self.frames = frames
+        self.path = path      # Where to write the chunk, or None to return it
+        self.row = row        # First row of a shared frame cache at path, if any
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+def chunk_angles(job):
+    """Angles shaped (gears, frames), same as evaluate.evaluate_angles"""
+    angles = np.zeros((job.count, job.motors.shape[1]), dtype=np.float64)
+    np.add.at(angles, job.row_ids, job.values[:, None] * job.motors[job.cols])
+    return angles
+
+
+def solve_chunk(job):
+    angles = chunk_angles(job)
+    if job.path is None:
+        return angles
+
+    if job.row is None:
+        np.save(job.path, angles)
+        return job.path
+
+    # Frame caches are one file, rows are frames; every worker writes its
+    # own rows straight into it
+    cache = np.load(job.path, mmap_mode='r+')
+    cache[job.row:job.row + len(job.frames)] = angles.T
+    cache.flush()
+    del cache
+    return job.path
@@ -0,0 +1,191 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Every gear's angle on every frame, in one float64 .npy shaped
+# (frames, gears), next to a .json that says what it was built from.
+# Rows are frames, so looking a frame up is a slice of a memory map:
+# nothing gets read that isn't used, and nothing gets copied.
+#
+# The .json carries a hash of the compiled gear graph. Whenever gear_data
+# has been edited since the last check, the hash is worked out again, and
+# a cache that no longer matches is left alone.
+
+import hashlib
+import json
+import os
+
+import bpy
+import numpy as np
+
+from . import properties, speedcurve
+from . graph import GearGraph
+
+CACHE_FORMAT = "gearengine-frame-cache"
+
+
+def cache_paths(path):
+    base = os.path.splitext(bpy.path.abspath(path))[0]
+    return base + ".npy", base + ".json"
+
+
+def graph_signature(graph):
+    """Hash of everything the angles depend on, in graph order"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(graph.fps).encode())
+
+    for rec in graph.records:
+        digest.update(repr((
+            rec.name, rec.drive_object, rec.drive_gear, rec.driven_gear,
+            rec.driver_type, rec.speed, rec.motor_axis,
+            rec.speed_curve.key if rec.speed_curve is not None else None,
+            rec.carrier,
+            [(r.teeth, r.axis, r.flip, r.gear_type, r.gear_mode, r.planetary_subtype) for r in rec.rings],
+        )).encode())
+
+    return digest.hexdigest()
+
+
+def write_manifest(path, graph, names, frames):
+    step = float(frames[1] - frames[0]) if len(frames) > 1 else 1.0
+    manifest = {
+        "format": CACHE_FORMAT,
+        "version": 1,
+        "signature": graph_signature(graph),
+        "first": float(frames[0]),
+        "step": step,
+        "frames": len(frames),
+        "gears": names,
+    }
+    with open(cache_paths(path)[1], "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def edit_key(scene):
+    return (properties.gear_version, properties.ratio_version, speedcurve.curve_version, len(scene.objects))
+
+
+class FrameCache:
+
+    def __init__(self, path):
+        self.path = path
+        data_path, manifest_path = cache_paths(path)
+
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != CACHE_FORMAT:
+            raise ValueError("Not a GearEngine frame cache")
+
+        self.angles = np.load(data_path, mmap_mode='r')
+        if self.angles.shape != (self.manifest["frames"], len(self.manifest["gears"])):
+            raise ValueError("Cache data doesn't match its manifest")
+
+        self.first = self.manifest["first"]
+        self.step = self.manifest["step"]
+        self.column = {name: i for i, name in enumerate(self.manifest["gears"])}
+
+        self.checked_key = None
+        self.valid = False
+        self.linear = False
+
+    @property
+    def last(self):
+        return self.first + self.step * (len(self.angles) - 1)
+
+    def is_stale(self, scene):
+        key = edit_key(scene)
+        if key != self.checked_key:
+            self.checked_key = key
+            graph = GearGraph.from_scene(scene)
+            self.valid = graph_signature(graph) == self.manifest["signature"]
+            # Angles only change at a steady rate when no motor's speed does
+            self.linear = all(rec.speed_curve is None for rec in graph.records)
+        return not self.valid
+
+    def columns(self, names):
+        """Cache columns for names, a slice when they line up, or None if
+        any of them aren't cached"""
+        cols = [self.column.get(name) for name in names]
+        if None in cols:
+            return None
+        if cols == list(range(len(cols))):
+            return slice(0, len(cols))
+        return np.asarray(cols, dtype=np.int64)
+
+    def frame(self, frame, columns):
+        """Angles on frame, or None outside the cached range and on
+        subframes the rows can't give exactly"""
+        pos = (frame - self.first) / self.step
+        if pos < 0.0 or pos > len(self.angles) - 1:
+            return None
+
+        row = int(pos)
+        t = pos - row
+        if t == 0.0:
+            return self.angles[row, columns]
+
+        # Subframes (motion blur) sit between two rows. With constant
+        # speeds every angle is linear in time, so a lerp is exact; with a
+        # speed curve it isn't, and the caller works the angles out itself.
+        if not self.linear:
+            return None
+        a = self.angles[row, columns]
+        b = self.angles[row + 1, columns]
+        return a + (b - a) * t
+
+
+# One per scene, opened lazily
+frame_caches = {}
+
+
+def get_frame_cache(scene):
+    """The scene's cache if it's on, readable, and matches gear_data"""
+    settings = scene.gear_settings
+    if not settings.use_frame_cache or not settings.frame_cache:
+        return None
+
+    cache = frame_caches.get(scene.name)
+    if cache is None or cache.path != settings.frame_cache:
+        try:
+            cache = FrameCache(settings.frame_cache)
+        except (OSError, ValueError, KeyError):
+            return None
+        frame_caches[scene.name] = cache
+
+    if cache.is_stale(scene):
+        return None
+    return cache
+
+
+def cache_status(scene):
+    """One line for the panel"""
+    settings = scene.gear_settings
+    if not settings.use_frame_cache:
+        return "Off"
+    if get_frame_cache(scene) is not None:
+        cache = frame_caches[scene.name]
+        return "%d gears, frames %g-%g" % (len(cache.column), cache.first, cache.last)
+    if scene.name in frame_caches:
+        return "Out of date, rebuild it"
+    return "No cache at that path"
+
+
+def clear_frame_caches():
+    frame_caches.clear()
@@ -0,0 +1,313 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# A compiled, bpy-free view of every gear train in a scene.
+# The snapshot functions only read attributes, so they work on real
+# Blender objects and on anything else shaped like them.
+
+from collections import deque
+
+from . ratios import ring_ratio
+from . speedcurve import get_speed_table
+
+axis_map = {
+    "X": 0,
+    "Y": 1,
+    "Z": 2
+}
+
+DRIVE_LOOP = "Drive loop"
+DRIVEN_BY_LOOP = "Driven by a drive loop"
+
+
+class RingRecord:
+    """Plain copy of a GearProps entry"""
+    __slots__ = (
+        "name",
+        "teeth",
+        "axis",
+        "flip",
+        "gear_type",
+        "gear_mode",
+        "planetary_subtype",
+    )
+
+    def __init__(self, name="", teeth=24, axis='Z', flip=False,
+                 gear_type='SPUR', gear_mode='A', planetary_subtype='SUN'):
+        self.name = name
+        self.teeth = teeth
+        self.axis = axis
+        self.flip = flip
+        self.gear_type = gear_type
+        self.gear_mode = gear_mode
+        self.planetary_subtype = planetary_subtype
+
+
+class GearRecord:
+    """Plain copy of an object's GearSet"""
+    __slots__ = (
+        "name",
+        "rings",
+        "drive_object",
+        "drive_gear",
+        "driven_gear",
+        "driver_type",
+        "drive_mode",
+        "speed",
+        "motor_axis",
+        "speed_curve",
+        "carrier",
+    )
+
+    def __init__(self, name, rings=None, drive_object=None, drive_gear=-1,
+                 driven_gear=-1, driver_type='OBJ', drive_mode='DRIVER',
+                 speed=1.0, motor_axis='X', speed_curve=None, carrier=None):
+        self.name = name
+        self.rings = rings if rings is not None else []
+        self.drive_object = drive_object  # Name, not the object
+        self.drive_gear = drive_gear
+        self.driven_gear = driven_gear
+        self.driver_type = driver_type
+        self.drive_mode = drive_mode
+        self.speed = speed
+        self.motor_axis = motor_axis
+        self.speed_curve = speed_curve  # SpeedTable when speed is animated
+        self.carrier = carrier          # Name of its planetary carrier, if any
+
+
+def snapshot_ring(gear):
+    return RingRecord(
+        name=gear.name,
+        teeth=gear.teeth,
+        axis=gear.axis,
+        flip=gear.flip,
+        gear_type=gear.gear_type,
+        gear_mode=gear.gear_mode,
+        planetary_subtype=gear.planetary_subtype,
+    )
+
+
+def snapshot_object(obj):
+    data = obj.gear_data
+    drive_obj = data.drive_object
+    carrier = data.carrier
+
+    return GearRecord(
+        obj.name,
+        rings=[snapshot_ring(gear) for gear in data.gears],
+        drive_object=drive_obj.name if drive_obj else None,
+        drive_gear=data.drive_gear,
+        driven_gear=data.driven_gear,
+        driver_type=data.driver_type,
+        drive_mode=data.drive_mode,
+        speed=data.motor.speed,
+        motor_axis=data.motor.axis,
+        speed_curve=get_speed_table(obj) if data.driver_type == 'MOTOR' else None,
+        carrier=carrier.name if carrier else None,
+    )
+
+
+def snapshot_objects(objects):
+    """Returns a GearRecord for every object that has at least one ring"""
+    records = []
+    for obj in objects:
+        data = getattr(obj, "gear_data", None)
+        if data is None or len(data.gears) == 0:
+            continue
+        records.append(snapshot_object(obj))
+    return records
+
+
+def link_state(rec, drive):
+    """(error, signed ratio) for rec's link to its drive object.
+
+    drive is the drive object's record, or None if it has no rings. The
+    ratio is 0.0 whenever there's an error, and for motors.
+    """
+    if rec.driver_type == 'MOTOR':
+        return None, 0.0
+
+    error = None
+    if rec.driven_gear < 0 or rec.driven_gear >= len(rec.rings):
+        error = "Invalid index. Output Ring doesn't exist"
+
+    if not rec.drive_object:
+        return "No drive object", 0.0
+    if drive is None:
+        return "Drive object has no gear rings", 0.0
+    if error:
+        return error, 0.0
+
+    drive_rings = drive.rings
+    if rec.drive_gear == -1:
+        return "Invalid index. Set the Input Ring", 0.0
+    if rec.drive_gear >= len(drive_rings):
+        return "Invalid index. Input Ring doesn't exist", 0.0
+
+    # Every ring on an object turns with it, so the link goes through
+    # whichever ring meshes with the drive object
+    ring = rec.rings[rec.driven_gear]
+    if ring.teeth == 0 or drive_rings[rec.drive_gear].teeth == 0:
+        return "Zero-tooth ring", 0.0
+
+    # Matches the driver expression: ((flip * 2) - 1) * ratio
+    sign = 1.0 if ring.flip else -1.0
+    return None, sign * ring_ratio(drive_rings[rec.drive_gear], ring)
+
+
+class GearGraph:
+    """Drive relationships between gear objects, compiled in one pass.
+
+    Every object is a node; an edge runs from a drive object to each object
+    it drives. Rings on one object share its rotation, so ratios are stored
+    per object. After compiling, cumulative[i] is the signed ratio from the
+    node's root to the node, and a gear's angle at any frame is
+    cumulative[i] * root_angle(root[i], frame).
+    """
+
+    def __init__(self, records, fps=24.0):
+        self.records = list(records)
+        self.fps = float(fps)
+
+        count = len(self.records)
+        self.index = {rec.name: i for i, rec in enumerate(self.records)}
+
+        self.parent = [-1] * count
+        self.children = [[] for i in range(count)]
+        self.ratio = [0.0] * count       # Signed ratio to the parent
+        self.cumulative = [0.0] * count  # Signed ratio to the root
+        self.root = [-1] * count
+        self.depth = [0] * count
+        self.order = []                  # Topological, roots first
+        self.errors = {}
+
+        self._link()
+        self._compile()
+
+    @classmethod
+    def from_objects(cls, objects, fps=24.0):
+        return cls(snapshot_objects(objects), fps)
+
+    @classmethod
+    def from_scene(cls, scene):
+        return cls.from_objects(scene.objects, scene.render.fps)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _link(self):
+        for i, rec in enumerate(self.records):
+            if rec.driver_type == 'MOTOR':
+                continue
+
+            parent = self.index.get(rec.drive_object) if rec.drive_object else None
+            error, ratio = link_state(rec, self.records[parent] if parent is not None else None)
+            if error:
+                self.errors[i] = error
+            if parent is None:
+                continue
+
+            # Errors still link, so a broken ring stalls its subtree
+            # instead of promoting it to a root.
+            self.ratio[i] = ratio
+            self.parent[i] = parent
+            self.children[parent].append(i)
+
+    def _compile(self):
+        queue = deque()
+        for i, parent in enumerate(self.parent):
+            if parent == -1:
+                self.root[i] = i
+                self.cumulative[i] = 1.0
+                queue.append(i)
+
+        # Breadth-first from the roots doubles as a topological sort,
+        # since every node has at most one parent.
+        while queue:
+            i = queue.popleft()
+            self.order.append(i)
+
+            for child in self.children[i]:
+                self.root[child] = self.root[i]
+                self.depth[child] = self.depth[i] + 1
+                self.cumulative[child] = self.cumulative[i] * self.ratio[child]
+                queue.append(child)
+
+        # Anything we never reached is in a drive loop, or hangs off one
+        if len(self.order) < len(self.records):
+            self._find_loops()
+
+    def _find_loops(self):
+        in_loop = set()
+        done = set()
+
+        for start in range(len(self.records)):
+            if self.root[start] != -1 or start in done:
+                continue
+
+            # Walk up until we hit something seen before. If it was seen on
+            # this walk, everything from there on is the loop itself.
+            path = []
+            on_path = {}
+            i = start
+            while i != -1 and i not in done and i not in on_path:
+                on_path[i] = len(path)
+                path.append(i)
+                i = self.parent[i]
+
+            if i in on_path:
+                in_loop.update(path[on_path[i]:])
+            done.update(path)
+
+        for i in done:
+            if i in in_loop:
+                self.errors[i] = DRIVE_LOOP
+            else:
+                self.errors.setdefault(i, DRIVEN_BY_LOOP)
+
+    def loops(self):
+        """Indices of every node that's part of a drive loop"""
+        return [i for i, err in self.errors.items() if err == DRIVE_LOOP]
+
+    def root_speed(self, root):
+        rec = self.records[root]
+        if rec.driver_type == 'MOTOR':
+            return rec.speed
+        return 0.0
+
+    def root_angle(self, root, frame):
+        # Same thing the motor driver does: (frame/FPS) * speed, or the
+        # integral of speed when it's animated
+        if root == -1:
+            return 0.0
+        rec = self.records[root]
+        if rec.driver_type == 'MOTOR' and rec.speed_curve is not None:
+            return rec.speed_curve.spin(frame, self.fps)
+        return (frame / self.fps) * self.root_speed(root)
+
+    def angle(self, name, frame):
+        i = self.index[name]
+        return self.cumulative[i] * self.root_angle(self.root[i], frame)
+
+    def angles(self, frame):
+        return [
+            self.cumulative[i] * self.root_angle(self.root[i], frame)
+            for i in range(len(self.records))
+        ]
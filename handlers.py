@@ -0,0 +1,430 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+from . import properties
+from . properties import (
+    suspend_updates,
+    refresh_fps,
+    refresh_ratios,
+    clear_ratio_cache,
+    clear_dependencies,
+)
+from . profiler import profiler, timed
+from . diagnostics import clear_diagnostics, patch_diagnostics
+from . meshes import clear_mesh_cache
+from . framecache import get_frame_cache, clear_frame_caches
+from . import speedcurve
+from . speedcurve import get_speed_table, motor_spin, clear_speed_tables
+from . evaluate import rotation_channel
+from . kinematics import Mechanism
+from . autosync import on_gears_edited, clear_pending_sync
+from . drivers import has_rotation_drivers, driver_axis
+from . constraints import find_constraints
+from . rotations import rotation_kind, rotation_paths, spin_values, EULER
+
+# msgbus subscriptions get dropped when a file loads, so this is
+# the handle we clear and re-subscribe with.
+msgbus_owner = object()
+
+
+def on_fps_changed(*args):
+    for scene in bpy.data.scenes:
+        refresh_fps(scene)
+
+
+def on_rotation_mode_changed(*args):
+    # Handler tables and drivers are both laid out per rotation mode
+    properties.tag_gears_changed()
+
+
+def subscribe():
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.RenderSettings, "fps"),
+        owner=msgbus_owner,
+        args=(),
+        notify=on_fps_changed,
+    )
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Object, "rotation_mode"),
+        owner=msgbus_owner,
+        args=(),
+        notify=on_rotation_mode_changed,
+    )
+
+
+@persistent
+def on_load_post(dummy):
+    handler_tables.clear()
+    motor_clocks.clear()
+    clear_ratio_cache()
+    clear_dependencies()
+    clear_diagnostics()
+    clear_mesh_cache()
+    clear_frame_caches()
+    clear_speed_tables()
+    clear_pending_sync()
+    subscribe()
+    on_fps_changed()
+
+    # The panel shows stored ratios, and files from older versions
+    # never stored any
+    for obj in bpy.data.objects:
+        if len(obj.gear_data.gears):
+            refresh_ratios(obj)
+
+    # Init Constraint didn't use to record the drive mode, so older files
+    # have constrained gears that still say drivers, and auto sync would
+    # swap them back
+    with suspend_updates():
+        for obj in bpy.data.objects:
+            data = obj.gear_data
+            if not len(data.gears) or data.driver_type == 'MOTOR' or data.drive_mode != 'DRIVER':
+                continue
+            if find_constraints(obj, adopt_legacy=True) and not has_rotation_drivers(obj):
+                data.drive_mode = 'CONSTRAINT'
+
+    migrate_motor_axes()
+
+
+def migrate_motor_axes():
+    """Add Motor used to put the driver on an axis without storing it,
+    and motor.axis is read everywhere now. Motors that never stored one
+    take it from the driver they already have, so re-plans keep them
+    spinning the way they always did."""
+    with suspend_updates():
+        for obj in bpy.data.objects:
+            motor = obj.gear_data.motor
+            if obj.gear_data.driver_type != 'MOTOR' or motor.is_property_set("axis"):
+                continue
+            axis = driver_axis(obj)
+            if axis is not None:
+                motor.axis = axis
+
+
+class RotationGroup:
+    """The rows of a HandlerTable that share a rotation property"""
+
+    def __init__(self, kind, rows, positions, axes):
+        self.kind = kind
+        self.data_path, self.width = rotation_paths[kind]
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.axes = np.asarray(axes, dtype=np.int64)
+
+        positions = np.asarray(positions, dtype=np.int64)
+        if kind == EULER:
+            # Only the spin channel; the other two are left as they are
+            self.flat_index = (positions * 3 + self.axes)[:, None]
+        else:
+            self.flat_index = positions[:, None] * self.width + np.arange(self.width)
+
+    def values(self, angles):
+        if self.kind == EULER:
+            return angles[self.rows][:, None]
+        return spin_values(self.kind, self.axes, angles[self.rows])
+
+    def write(self, objects, count, angles):
+        buffer = np.empty(count * self.width, dtype=np.float32)
+        objects.foreach_get(self.data_path, buffer)
+        buffer[self.flat_index] = self.values(angles)
+        objects.foreach_set(self.data_path, buffer)
+
+
+class HandlerTable:
+    """Precompiled ratio table for every handler-driven gear in a scene.
+
+    Rotations are read and written for all of scene.objects with one
+    foreach_get/foreach_set per rotation mode in use, so positions into
+    that collection are baked in along with the ratios.
+    """
+
+    def __init__(self, scene):
+        mechanism = Mechanism.from_scene(scene)
+        graph = mechanism.graph
+        positions = {obj.name: i for i, obj in enumerate(scene.objects)}
+
+        self.version = properties.gear_version
+        self.object_count = len(scene.objects)
+
+        gears = [i for i in mechanism.moving() if graph.records[i].drive_mode == 'HANDLER']
+
+        # Only the motors these gears hang off get read each frame
+        self.mix = mechanism.table(gears)
+        used = np.unique(self.mix.cols)
+        self.mix.cols = np.searchsorted(used, self.mix.cols)
+
+        # Without planetary sets or closed loops, every row is one motor
+        # times the chain ratio, which edits can patch in place
+        self.patchable = not mechanism.coupled
+
+        self.objects = [scene.objects[graph.records[i].name] for i in gears]
+        self.rows = {obj.as_pointer(): row for row, obj in enumerate(self.objects)}
+        self.names = [graph.records[i].name for i in gears]
+        self.motors = [scene.objects[graph.records[mechanism.motors[slot]].name] for slot in used]
+
+        by_kind = {}
+        for row, obj in enumerate(self.objects):
+            rec = graph.records[gears[row]]
+            rows, places, axes = by_kind.setdefault(rotation_kind(obj.rotation_mode), ([], [], []))
+            rows.append(row)
+            places.append(positions[rec.name])
+            axes.append(rotation_channel(rec))
+
+        self.groups = [RotationGroup(kind, *columns) for kind, columns in by_kind.items()]
+
+        # Which frame cache columns hold these rows, worked out once per cache
+        self.cache = None
+        self.cache_columns = None
+
+    def is_stale(self, scene):
+        if self.version != properties.gear_version:
+            return True
+        return self.object_count != len(scene.objects)
+
+    def update_rows(self, objects):
+        """Patches in new chain ratios for a dirty subtree.
+
+        Only ratios can change in place. A gear that went from broken to
+        driven, or the other way, changes which rows exist, so that throws
+        the whole table out instead.
+        """
+        for obj in objects:
+            data = obj.gear_data
+            if data.driver_type == 'MOTOR' or data.drive_mode != 'HANDLER':
+                continue
+
+            if not self.patchable:
+                self.version = -1
+                return
+
+            row = self.rows.get(obj.as_pointer())
+            if row is None or data.chain_ratio == 0.0:
+                if row is not None or data.chain_ratio != 0.0:
+                    self.version = -1
+                    return
+                continue
+
+            self.mix.values[row] = data.chain_ratio
+
+    def cached_angles(self, cache, frame):
+        """Angles for frame out of a frame cache, or None if it can't say"""
+        if cache is not self.cache:
+            self.cache = cache
+            self.cache_columns = cache.columns(self.names)
+        if self.cache_columns is None:
+            return None
+        return cache.frame(frame, self.cache_columns)
+
+    @timed("handler")
+    def apply(self, scene, frame):
+        if not self.objects:
+            return
+
+        angles = None
+        cache = get_frame_cache(scene)
+        if cache is not None:
+            angles = self.cached_angles(cache, frame)
+
+        if angles is None:
+            fps = scene.render.fps
+            spins = np.array([motor_spin(m, frame, fps) for m in self.motors], dtype=np.float64)
+            angles = self.mix.combine(spins)
+
+        self.write(scene, angles)
+
+    def write(self, scene, angles):
+        for group in self.groups:
+            group.write(scene.objects, self.object_count, angles)
+
+        # foreach_set skips RNA updates, so the depsgraph needs a nudge
+        for obj in self.objects:
+            obj.update_tag(refresh={'OBJECT'})
+
+
+# One table per scene, rebuilt lazily when gear_data changes
+handler_tables = {}
+
+
+def get_handler_table(scene):
+    table = handler_tables.get(scene.name)
+    if table is None or table.is_stale(scene):
+        table = HandlerTable(scene)
+        handler_tables[scene.name] = table
+    return table
+
+
+class MotorClocks:
+    """Every motor in a scene, for writing the integrated angle of the
+    ones with animated speed where their drivers can read it"""
+
+    def __init__(self, scene):
+        self.version = properties.gear_version
+        self.curve_edits = speedcurve.curve_edits
+        self.object_count = len(scene.objects)
+
+        # Looked up once per edit rather than every frame
+        self.tables = []
+        for obj in scene.objects:
+            if obj.gear_data.driver_type != 'MOTOR' or not len(obj.gear_data.gears):
+                continue
+            table = get_speed_table(obj)
+            if table is not None:
+                self.tables.append((obj, table))
+
+    def is_stale(self, scene):
+        if self.version != properties.gear_version:
+            return True
+        if self.curve_edits != speedcurve.curve_edits:
+            return True
+        return self.object_count != len(scene.objects)
+
+    def advance(self, scene, frame):
+        fps = scene.render.fps
+        for obj, table in self.tables:
+            spin = table.spin(frame, fps)
+            if properties.float_changed(obj.gear_data.motor.spin, spin):
+                obj.gear_data.motor.spin = spin
+
+
+motor_clocks = {}
+
+
+def get_motor_clocks(scene):
+    clocks = motor_clocks.get(scene.name)
+    if clocks is None or clocks.is_stale(scene):
+        clocks = MotorClocks(scene)
+        motor_clocks[scene.name] = clocks
+    return clocks
+
+
+def on_gears_dirty(objects):
+    for table in handler_tables.values():
+        table.update_rows(objects)
+
+
+@persistent
+def on_frame_change_pre(scene, depsgraph=None):
+    # Speed F-Curves haven't been evaluated for this frame yet, which is
+    # one more reason to go by the sampled table rather than motor.speed
+    frame = scene.frame_current_final
+    get_motor_clocks(scene).advance(scene, frame)
+    get_handler_table(scene).apply(scene, frame)
+
+
+# These two bracket every frame while profiling. Pre goes in first, so
+# the frame time includes the gear handler as well as driver evaluation.
+@persistent
+def on_profile_frame_pre(scene, depsgraph=None):
+    profiler.begin_frame()
+
+
+@persistent
+def on_profile_frame_post(scene, depsgraph=None):
+    profiler.end_frame(scene.frame_current)
+
+
+def start_profiling(scene):
+    stop_profiling()
+    profiler.start(scene)
+    bpy.app.handlers.frame_change_pre.insert(0, on_profile_frame_pre)
+    bpy.app.handlers.frame_change_post.append(on_profile_frame_post)
+
+
+def stop_profiling():
+    profiler.stop()
+    if on_profile_frame_pre in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(on_profile_frame_pre)
+    if on_profile_frame_post in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(on_profile_frame_post)
+
+
+# Duplicates and appends arrive without running any update callbacks,
+# but they do go through the depsgraph
+@persistent
+def on_depsgraph_update_post(scene, depsgraph=None):
+    if depsgraph is None:
+        return
+    index = properties.dependency_index
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object):
+            index.add(update.id.original)
+        elif isinstance(update.id, bpy.types.Action):
+            speedcurve.tag_curves_edited()
+
+
+# Undo swaps out every ID, so the object references in the tables go
+# bad, and so do the pointers most caches are keyed on
+@persistent
+def on_undo_redo(scene, depsgraph=None):
+    handler_tables.clear()
+    motor_clocks.clear()
+    clear_ratio_cache()
+    clear_dependencies()
+    clear_diagnostics()
+    clear_mesh_cache()
+    clear_frame_caches()
+    clear_speed_tables()
+    clear_pending_sync()
+
+
+def register():
+    bpy.app.handlers.load_post.append(on_load_post)
+    bpy.app.handlers.frame_change_pre.append(on_frame_change_pre)
+    bpy.app.handlers.undo_post.append(on_undo_redo)
+    bpy.app.handlers.redo_post.append(on_undo_redo)
+    bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update_post)
+    properties.dirty_listeners.append(on_gears_dirty)
+    properties.dirty_listeners.append(patch_diagnostics)
+    properties.edit_listeners.append(on_gears_edited)
+    subscribe()
+
+
+def unregister():
+    if on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_load_post)
+    if on_frame_change_pre in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(on_frame_change_pre)
+    if on_undo_redo in bpy.app.handlers.undo_post:
+        bpy.app.handlers.undo_post.remove(on_undo_redo)
+    if on_undo_redo in bpy.app.handlers.redo_post:
+        bpy.app.handlers.redo_post.remove(on_undo_redo)
+    if on_depsgraph_update_post in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update_post)
+    stop_profiling()
+    if on_gears_dirty in properties.dirty_listeners:
+        properties.dirty_listeners.remove(on_gears_dirty)
+    if patch_diagnostics in properties.dirty_listeners:
+        properties.dirty_listeners.remove(patch_diagnostics)
+    if on_gears_edited in properties.edit_listeners:
+        properties.edit_listeners.remove(on_gears_edited)
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    handler_tables.clear()
+    motor_clocks.clear()
+    clear_ratio_cache()
+    clear_dependencies()
+    clear_diagnostics()
+    clear_mesh_cache()
+    clear_frame_caches()
+    clear_speed_tables()
+    clear_pending_sync()
@@ -0,0 +1,160 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# A stand-in for the parts of bpy GearEngine uses, so the add-on, its
+# math and its benchmarks can run under plain CPython. Put the headless
+# directory at the front of sys.path to use it; inside Blender it's never
+# on the path, so the real module always wins.
+
+from . import types
+from . import props
+from . import utils
+from . import ops
+from . import msgbus
+from . import path
+from . import app
+from . import _depsgraph
+from . _rna import Collection as _Collection
+
+
+def _unique_name(collection, name):
+    taken = {item.name for item in collection._items}
+    if name not in taken:
+        return name
+
+    i = 1
+    while "%s.%03d" % (name, i) in taken:
+        i += 1
+    return "%s.%03d" % (name, i)
+
+
+class _IDCollection(_Collection):
+
+    def __init__(self, id_type):
+        super().__init__()
+        self.id_type = id_type
+        self._by_name = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            item = self._by_name.get(key)
+            if item is None or item.name != key:
+                item = super().__getitem__(key)
+            return item
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def _add(self, item):
+        item.name = _unique_name(self, item.name)
+        self._items.append(item)
+        self._by_name[item.name] = item
+        return item
+
+    def new(self, name, *args):
+        return self._add(self.id_type(name, *args))
+
+    def remove(self, item, do_unlink=True):
+        data._remove_ids([item])
+
+
+class _BlendData:
+
+    def __init__(self):
+        self.objects = _IDCollection(types.Object)
+        self.meshes = _IDCollection(types.Mesh)
+        self.actions = _IDCollection(types.Action)
+        self.collections = _IDCollection(types.Collection)
+        self.scenes = _IDCollection(types.Scene)
+        self.window_managers = _IDCollection(types.WindowManager)
+        self.filepath = ""
+
+    def _id_collections(self):
+        return [self.objects, self.meshes, self.actions, self.collections, self.scenes]
+
+    def _all_collections(self):
+        found = list(self.collections._items)
+        found.extend(scene.collection for scene in self.scenes._items)
+        return found
+
+    def _remove_ids(self, ids):
+        doomed = set(id(item) for item in ids)
+
+        for coll in self._all_collections():
+            coll.objects._items = [o for o in coll.objects._items if id(o) not in doomed]
+
+        for scene in self.scenes._items:
+            layer_objects = scene.view_layers[0].objects
+            if id(layer_objects.active) in doomed:
+                layer_objects.active = None
+
+        for obj in self.objects._items:
+            if id(obj.data) in doomed:
+                obj.data = None
+            if id(obj.parent) in doomed:
+                obj.parent = None
+            anim = obj.animation_data
+            if anim and id(anim.action) in doomed:
+                anim.action = None
+
+        for collection in self._id_collections():
+            collection._items = [item for item in collection._items if id(item) not in doomed]
+            collection._by_name = {item.name: item for item in collection._items}
+
+    def batch_remove(self, ids):
+        self._remove_ids(list(ids))
+
+    def _copy_id(self, item):
+        import copy
+        duplicate = copy.copy(item)
+        duplicate.__dict__ = dict(item.__dict__)
+        for collection in self._id_collections():
+            if collection.id_type is type(item):
+                return collection._add(duplicate)
+        return duplicate
+
+
+def reset():
+    """Starts over with an empty file: one scene, nothing in it"""
+    global data, context
+
+    _depsgraph.tagged.clear()
+
+    data = _BlendData()
+    scene = data.scenes.new("Scene")
+    window_manager = data.window_managers.new("WinMan")
+    context = types.Context(scene, window_manager)
+
+    for name in dir(app.handlers):
+        handlers = getattr(app.handlers, name)
+        if isinstance(handlers, list):
+            handlers[:] = [h for h in handlers if getattr(h, "_bpy_persistent", False)]
+
+    for handler in list(app.handlers.load_post):
+        handler(None)
+
+
+data = None
+context = None
+reset()
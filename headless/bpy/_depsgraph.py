@@ -0,0 +1,233 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# A tiny, single-threaded depsgraph: actions first, then drivers in
+# dependency order. Constraints are stored but never evaluated. IDs tagged
+# with update_tag() are reported to depsgraph_update_post on the next
+# view layer update, the way Blender reports edits.
+
+import ast
+import math
+from collections import deque
+
+from . _rna import path_assign, path_resolve
+
+# Blender's simple expression evaluator only knows these
+simple_functions = {
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "atan2": math.atan2,
+    "sqrt": math.sqrt,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "trunc": math.trunc,
+    "fmod": math.fmod,
+    "radians": math.radians,
+    "degrees": math.degrees,
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "round": round,
+    "int": int,
+    "pow": pow,
+    "exp": math.exp,
+    "log": math.log,
+    "signum": lambda x: (x > 0) - (x < 0),
+    "smoothstep": lambda a, b, x: (lambda t: t * t * (3 - 2 * t))(max(0.0, min(1.0, (x - a) / (b - a)))),
+    "lerp": lambda a, b, t: a + (b - a) * t,
+    "clamp": lambda x, lo=0.0, hi=1.0: max(lo, min(hi, x)),
+}
+
+simple_constants = {"pi": math.pi, "True": 1.0, "False": 0.0}
+
+_simple_nodes = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.USub, ast.UAdd, ast.Not,
+    ast.And, ast.Or, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Counts every driver that fell back to the Python evaluator
+python_driver_calls = 0
+
+_compiled = {}
+
+
+def is_simple_expression(expression, variables):
+    """Whether Blender would evaluate this without Python"""
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return False
+
+    allowed = set(variables) | set(simple_constants) | {"frame"}
+    for node in ast.walk(tree):
+        if not isinstance(node, _simple_nodes):
+            return False
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in simple_functions:
+                return False
+        elif isinstance(node, ast.Name):
+            if node.id not in allowed and node.id not in simple_functions:
+                return False
+    return True
+
+
+def _compile(expression):
+    code = _compiled.get(expression)
+    if code is None:
+        code = compile(expression, "<driver>", "eval")
+        _compiled[expression] = code
+    return code
+
+
+def evaluate_driver(driver, frame):
+    """Returns the driver's value, or None when it's invalid"""
+    global python_driver_calls
+
+    namespace = dict(simple_constants)
+    namespace["frame"] = frame
+
+    for var in driver.variables:
+        target = var.targets[0]
+        if target.id is None:
+            driver.is_valid = False
+            return None
+        try:
+            namespace[var.name] = path_resolve(target.id, target.data_path)
+        except ValueError:
+            driver.is_valid = False
+            return None
+
+    if not driver.expression:
+        driver.is_valid = False
+        return None
+
+    if not driver.is_simple_expression:
+        python_driver_calls += 1
+
+    namespace.update(simple_functions)
+    try:
+        value = eval(_compile(driver.expression), {"__builtins__": {}}, namespace)
+    except Exception:
+        driver.is_valid = False
+        return None
+
+    driver.is_valid = True
+    return float(value)
+
+
+def _driver_order(objects):
+    """Objects with drivers, ordered so targets evaluate before readers"""
+    driven = [obj for obj in objects if obj.animation_data and len(obj.animation_data.drivers)]
+    position = {id(obj): i for i, obj in enumerate(driven)}
+
+    readers = [[] for obj in driven]
+    pending = [0] * len(driven)
+
+    for i, obj in enumerate(driven):
+        deps = set()
+        for fcurve in obj.animation_data.drivers:
+            for var in fcurve.driver.variables:
+                target = var.targets[0].id
+                j = position.get(id(target))
+                if j is not None and j != i:
+                    deps.add(j)
+        for j in deps:
+            readers[j].append(i)
+        pending[i] = len(deps)
+
+    queue = deque(i for i in range(len(driven)) if pending[i] == 0)
+    order = []
+    while queue:
+        i = queue.popleft()
+        order.append(driven[i])
+        for k in readers[i]:
+            pending[k] -= 1
+            if pending[k] == 0:
+                queue.append(k)
+
+    # Cycles still get evaluated, just in whatever order they came in
+    if len(order) < len(driven):
+        placed = set(id(obj) for obj in order)
+        order.extend(obj for obj in driven if id(obj) not in placed)
+
+    return order
+
+
+# IDs tagged since the last update, by identity
+tagged = {}
+
+
+def tag(id):
+    tagged[id.as_pointer()] = id
+
+
+def flush_updates(depsgraph):
+    from . app import handlers
+    from . types import DepsgraphUpdate
+
+    if not tagged:
+        return
+    depsgraph.updates = [DepsgraphUpdate(id) for id in tagged.values()]
+    tagged.clear()
+
+    for handler in list(handlers.depsgraph_update_post):
+        handler(depsgraph.scene, depsgraph)
+    depsgraph.updates = []
+
+
+def evaluate(scene):
+    frame = scene.frame_current_final
+    objects = list(scene.objects)
+
+    for obj in objects:
+        anim = obj.animation_data
+        if not anim or not anim.action:
+            continue
+        for fcurve in anim.action.fcurves:
+            if fcurve.mute or not len(fcurve.keyframe_points):
+                continue
+            path_assign(obj, fcurve.data_path, fcurve.array_index, fcurve.evaluate(frame))
+
+    for obj in _driver_order(objects):
+        for fcurve in obj.animation_data.drivers:
+            if fcurve.mute:
+                continue
+            value = evaluate_driver(fcurve.driver, frame)
+            if value is not None:
+                path_assign(obj, fcurve.data_path, fcurve.array_index, value)
+
+
+def frame_change(scene):
+    from . app import handlers
+
+    depsgraph = scene.view_layers[0].depsgraph
+    for handler in list(handlers.frame_change_pre):
+        handler(scene, depsgraph)
+
+    evaluate(scene)
+
+    for handler in list(handlers.frame_change_post):
+        handler(scene, depsgraph)
@@ -0,0 +1,385 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# The RNA side of the stand-in: deferred property definitions, the
+# descriptors they turn into on registration, and the collection types.
+
+import re
+
+
+class _PropertyDeferred:
+    """What bpy.props functions return until a class gets registered"""
+    __slots__ = ("function", "keywords")
+
+    def __init__(self, function, keywords):
+        self.function = function
+        self.keywords = keywords
+
+    def __repr__(self):
+        return "<_PropertyDeferred %s %r>" % (self.function.__name__, self.keywords)
+
+
+def _rna_store(inst):
+    try:
+        return inst.__dict__["_rna_store"]
+    except KeyError:
+        store = {}
+        inst.__dict__["_rna_store"] = store
+        return store
+
+
+def _rna_set(inst):
+    """Names of the properties that have been assigned, not just read"""
+    try:
+        return inst.__dict__["_rna_set"]
+    except KeyError:
+        names = set()
+        inst.__dict__["_rna_set"] = names
+        return names
+
+
+def _owner_id(inst):
+    return getattr(inst, "id_data", None)
+
+
+class RNAProperty:
+    """Descriptor for one registered property"""
+
+    def __init__(self, name, deferred):
+        self.name = name
+        self.kind = deferred.function.__name__
+        self.keywords = dict(deferred.keywords)
+
+        kw = self.keywords
+        self.getter = kw.get("get")
+        self.setter = kw.get("set")
+        self.update = kw.get("update")
+        self.ptype = kw.get("type")
+        self.size = kw.get("size", 3)
+        self.min = kw.get("min")
+        self.max = kw.get("max")
+
+        if self.kind == "EnumProperty":
+            self.items = [item[0] for item in kw.get("items", [])]
+        else:
+            self.items = None
+
+    def default(self):
+        kw = self.keywords
+        kind = self.kind
+
+        if kind == "EnumProperty":
+            if "default" in kw:
+                return kw["default"]
+            return self.items[0] if self.items else ""
+
+        if kind in {"FloatVectorProperty", "IntVectorProperty", "BoolVectorProperty"}:
+            if "default" in kw:
+                return list(kw["default"])
+            zero = {"FloatVectorProperty": 0.0, "IntVectorProperty": 0, "BoolVectorProperty": False}[kind]
+            return [zero] * self.size
+
+        fallback = {
+            "FloatProperty": 0.0,
+            "IntProperty": 0,
+            "BoolProperty": False,
+            "StringProperty": "",
+        }.get(kind)
+        return kw.get("default", fallback)
+
+    def initial(self, inst):
+        if self.kind == "PointerProperty":
+            if _is_property_group(self.ptype):
+                return instantiate_group(self.ptype, _owner_id(inst))
+            return None
+
+        if self.kind == "CollectionProperty":
+            return PropCollection(self.ptype, _owner_id(inst))
+
+        return self.default()
+
+    def coerce(self, value):
+        kind = self.kind
+
+        if kind == "IntProperty":
+            value = int(value)
+        elif kind == "FloatProperty":
+            value = float(value)
+        elif kind == "BoolProperty":
+            return bool(value)
+        elif kind == "StringProperty":
+            return str(value)
+        elif kind == "EnumProperty":
+            if value not in self.items:
+                raise TypeError(
+                    "bpy_struct: item.attr = val: enum \"%s\" not found in %r" % (value, tuple(self.items))
+                )
+            return value
+        elif kind == "PointerProperty":
+            if value is not None and self.ptype is not None and not isinstance(value, self.ptype):
+                raise TypeError("%s expected a %s type" % (self.name, self.ptype.__name__))
+            return value
+        elif kind in {"FloatVectorProperty", "IntVectorProperty", "BoolVectorProperty"}:
+            return list(value)
+        elif kind == "CollectionProperty":
+            raise AttributeError("bpy_struct: attribute \"%s\" from \"%s\" is read-only" % (self.name, kind))
+
+        # Hard limits clamp, same as RNA
+        if self.min is not None and value < self.min:
+            value = type(value)(self.min)
+        if self.max is not None and value > self.max:
+            value = type(value)(self.max)
+        return value
+
+    def __get__(self, inst, owner):
+        if inst is None:
+            return self
+
+        if self.getter:
+            return self.getter(inst)
+
+        store = _rna_store(inst)
+        if self.name not in store:
+            store[self.name] = self.initial(inst)
+        return store[self.name]
+
+    def raw_set(self, inst, value):
+        """Sets the value without running the update callback, like foreach_set"""
+        value = self.coerce(value)
+        if self.setter:
+            self.setter(inst, value)
+        else:
+            _rna_store(inst)[self.name] = value
+        _rna_set(inst).add(self.name)
+
+    def __set__(self, inst, value):
+        self.raw_set(inst, value)
+
+        if self.update:
+            import bpy
+            self.update(inst, bpy.context)
+
+
+def _is_property_group(cls):
+    from . types import PropertyGroup
+    return isinstance(cls, type) and issubclass(cls, PropertyGroup)
+
+
+def instantiate_group(cls, id_data):
+    inst = cls.__new__(cls)
+    inst.__dict__["_rna_store"] = {}
+    inst.__dict__["id_data"] = id_data
+    return inst
+
+
+def install_properties(cls):
+    """Turns a class's deferred annotations into descriptors"""
+    for klass in reversed(cls.__mro__):
+        annotations = vars(klass).get("__annotations__", {})
+        for name, value in annotations.items():
+            if isinstance(value, _PropertyDeferred):
+                setattr(cls, name, RNAProperty(name, value))
+
+
+def raw_set(inst, attr, value):
+    prop = getattr(type(inst), attr, None)
+    if isinstance(prop, RNAProperty):
+        prop.raw_set(inst, value)
+    else:
+        setattr(inst, attr, value)
+
+
+def _is_sequence(value):
+    return hasattr(value, "__len__") and not isinstance(value, str)
+
+
+class Collection:
+    """Base for every bpy_prop_collection lookalike"""
+
+    def __init__(self, items=None):
+        self._items = list(items) if items is not None else []
+
+    def _list(self):
+        return self._items
+
+    def __len__(self):
+        return len(self._list())
+
+    def __iter__(self):
+        return iter(list(self._list()))
+
+    def __getitem__(self, key):
+        items = self._list()
+        if isinstance(key, str):
+            for item in items:
+                if getattr(item, "name", None) == key:
+                    return item
+            raise KeyError("bpy_prop_collection[key]: key \"%s\" not found" % key)
+        if isinstance(key, slice):
+            return items[key]
+        if key < -len(items) or key >= len(items):
+            raise IndexError("bpy_prop_collection[index]: index %d out of range" % key)
+        return items[key]
+
+    def __contains__(self, key):
+        if isinstance(key, str):
+            return any(getattr(item, "name", None) == key for item in self._list())
+        return key in self._list()
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def keys(self):
+        return [item.name for item in self._list()]
+
+    def values(self):
+        return list(self._list())
+
+    def items(self):
+        return [(item.name, item) for item in self._list()]
+
+    def find(self, key):
+        for i, item in enumerate(self._list()):
+            if getattr(item, "name", None) == key:
+                return i
+        return -1
+
+    def foreach_get(self, attr, seq):
+        flat = []
+        for item in self._list():
+            value = getattr(item, attr)
+            if _is_sequence(value):
+                flat.extend(value)
+            else:
+                flat.append(value)
+
+        if len(seq) != len(flat):
+            raise RuntimeError(
+                "internal error setting the array, length mismatch %d != %d" % (len(seq), len(flat))
+            )
+        seq[:] = flat
+
+    def foreach_set(self, attr, seq):
+        items = self._list()
+        if not items:
+            return
+
+        sample = getattr(items[0], attr)
+        width = len(sample) if _is_sequence(sample) else 1
+
+        if len(seq) != width * len(items):
+            raise RuntimeError(
+                "internal error setting the array, length mismatch %d != %d" % (len(seq), width * len(items))
+            )
+
+        values = seq.tolist() if hasattr(seq, "tolist") else list(seq)
+
+        for i, item in enumerate(items):
+            if width == 1 and not _is_sequence(sample):
+                raw_set(item, attr, values[i])
+            else:
+                target = getattr(item, attr)
+                for j in range(width):
+                    target[j] = values[i * width + j]
+
+
+class PropCollection(Collection):
+    """A CollectionProperty of PropertyGroups"""
+
+    def __init__(self, item_type, id_data):
+        super().__init__()
+        self.item_type = item_type
+        self.id_data = id_data
+
+    def add(self):
+        item = instantiate_group(self.item_type, self.id_data)
+        self._items.append(item)
+        return item
+
+    def remove(self, index):
+        if index < -len(self._items) or index >= len(self._items):
+            raise IndexError("bpy_prop_collection.remove(): index %d out of range" % index)
+        del self._items[index]
+
+    def clear(self):
+        self._items.clear()
+
+    def move(self, src, dst):
+        item = self._items.pop(src)
+        self._items.insert(dst, item)
+
+
+_path_token = re.compile(r"""\.?([A-Za-z_]\w*)|\[(-?\d+)\]|\[["'](.*?)["']\]""")
+
+
+def split_path(path):
+    tokens = []
+    pos = 0
+    while pos < len(path):
+        match = _path_token.match(path, pos)
+        if not match:
+            raise ValueError("path_resolve: could not parse \"%s\"" % path)
+        attr, index, key = match.groups()
+        if attr is not None:
+            tokens.append(("attr", attr))
+        elif index is not None:
+            tokens.append(("item", int(index)))
+        else:
+            tokens.append(("item", key))
+        pos = match.end()
+    return tokens
+
+
+def resolve_tokens(base, tokens):
+    value = base
+    for kind, token in tokens:
+        if kind == "attr":
+            value = getattr(value, token)
+        else:
+            value = value[token]
+    return value
+
+
+def path_resolve(base, path):
+    try:
+        return resolve_tokens(base, split_path(path))
+    except (AttributeError, IndexError, KeyError, TypeError) as err:
+        raise ValueError("%r.path_resolve(\"%s\") could not be resolved: %s" % (base, path, err))
+
+
+def path_assign(base, path, index, value):
+    """Writes value to base.path[index], or base.path when index is -1"""
+    tokens = split_path(path)
+
+    if index >= 0:
+        target = resolve_tokens(base, tokens)
+        if _is_sequence(target):
+            target[index] = value
+            return
+
+    owner = resolve_tokens(base, tokens[:-1])
+    kind, token = tokens[-1]
+    if kind == "attr":
+        raw_set(owner, token, value)
+    else:
+        owner[token] = value
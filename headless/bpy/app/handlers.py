@@ -0,0 +1,39 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+load_pre = []
+load_post = []
+save_pre = []
+save_post = []
+frame_change_pre = []
+frame_change_post = []
+depsgraph_update_pre = []
+depsgraph_update_post = []
+undo_pre = []
+undo_post = []
+redo_pre = []
+redo_post = []
+render_pre = []
+render_post = []
+
+
+def persistent(func):
+    func._bpy_persistent = True
+    return func
@@ -0,0 +1,59 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Timers only fire when something calls run_due(), since there's no
+# event loop out here.
+
+import time
+
+_timers = {}
+
+
+def register(function, first_interval=0.0, persistent=False):
+    _timers[function] = time.monotonic() + first_interval
+
+
+def unregister(function):
+    if function not in _timers:
+        raise ValueError("Error: function is not registered")
+    del _timers[function]
+
+
+def is_registered(function):
+    return function in _timers
+
+
+def run_due(now=None):
+    """Fires every timer that's due; returns how many ran"""
+    if now is None:
+        now = time.monotonic()
+
+    ran = 0
+    for function, due in list(_timers.items()):
+        if due > now or function not in _timers:
+            continue
+
+        ran += 1
+        interval = function()
+        if interval is None:
+            _timers.pop(function, None)
+        else:
+            _timers[function] = now + interval
+    return ran
@@ -0,0 +1,38 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Subscriptions are kept, but nothing publishes on its own; call
+# publish_rna() to fake a change from the UI.
+
+_subscriptions = []
+
+
+def subscribe_rna(key, owner, args, notify, options=set()):
+    _subscriptions.append((key, owner, args, notify))
+
+
+def clear_by_owner(owner):
+    _subscriptions[:] = [sub for sub in _subscriptions if sub[1] is not owner]
+
+
+def publish_rna(key):
+    for sub_key, owner, args, notify in list(_subscriptions):
+        if sub_key == key:
+            notify(*args)
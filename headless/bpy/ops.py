@@ -0,0 +1,83 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# bpy.ops.<module>.<name>(...) for registered operators. Calls run
+# execute() directly, or invoke() when passed 'INVOKE_DEFAULT'.
+
+from . _rna import instantiate_group
+
+# Every (type, message) an operator reported, oldest first
+reports = []
+
+_operators = {}
+
+
+class _OperatorCall:
+
+    def __init__(self, idname):
+        self.idname = idname
+
+    def poll(self, *args):
+        import bpy
+        cls = _operators[self.idname]
+        poll = getattr(cls, "poll", None)
+        return bool(poll(bpy.context)) if poll else True
+
+    def __call__(self, *args, **kwargs):
+        import bpy
+
+        cls = _operators.get(self.idname)
+        if cls is None:
+            raise AttributeError("Calling operator \"bpy.ops.%s\" error, could not be found" % self.idname)
+
+        context = bpy.context
+        if not self.poll():
+            raise RuntimeError("Operator bpy.ops.%s.poll() failed, context is incorrect" % self.idname)
+
+        op = instantiate_group(cls, None)
+        for name, value in kwargs.items():
+            setattr(op, name, value)
+
+        if args and args[0] == 'INVOKE_DEFAULT' and hasattr(op, "invoke"):
+            return op.invoke(context, None)
+        return op.execute(context)
+
+
+class _OperatorModule:
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, name):
+        return _OperatorCall("%s.%s" % (self._name, name))
+
+
+def register_operator(cls):
+    _operators[cls.bl_idname] = cls
+
+
+def unregister_operator(cls):
+    _operators.pop(cls.bl_idname, None)
+
+
+def __getattr__(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    return _OperatorModule(name)
@@ -0,0 +1,40 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+from . _rna import _PropertyDeferred
+
+
+def _deferred(function):
+    def define(**keywords):
+        return _PropertyDeferred(define, keywords)
+    define.__name__ = function
+    return define
+
+
+BoolProperty = _deferred("BoolProperty")
+BoolVectorProperty = _deferred("BoolVectorProperty")
+IntProperty = _deferred("IntProperty")
+IntVectorProperty = _deferred("IntVectorProperty")
+FloatProperty = _deferred("FloatProperty")
+FloatVectorProperty = _deferred("FloatVectorProperty")
+StringProperty = _deferred("StringProperty")
+EnumProperty = _deferred("EnumProperty")
+PointerProperty = _deferred("PointerProperty")
+CollectionProperty = _deferred("CollectionProperty")
@@ -0,0 +1,886 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# The slice of bpy.types that GearEngine touches. Anything not in here
+# isn't supported; it's better to fail loudly than to fake it.
+
+from mathutils import Euler, Matrix, Quaternion, Vector
+
+from . _rna import (
+    Collection as PropCollectionBase,
+    RNAProperty,
+    _PropertyDeferred,
+    _rna_set,
+    path_resolve,
+)
+
+
+class bpy_struct:
+    def path_resolve(self, path, coerce=True):
+        return path_resolve(self, path)
+
+    def as_pointer(self):
+        return id(self)
+
+    def is_property_set(self, property, ghost=True):
+        return property in _rna_set(self)
+
+
+# Registerable classes
+
+class PropertyGroup(bpy_struct):
+    pass
+
+
+class Operator(bpy_struct):
+    bl_options = set()
+
+    def report(self, type, message):
+        from . import ops
+        ops.reports.append((set(type), message))
+
+
+class Panel(bpy_struct):
+    layout = None
+
+
+class UIList(bpy_struct):
+    layout = None
+    filter_name = ""
+    use_filter_invert = False
+    use_filter_sort_alpha = False
+    use_filter_sort_reverse = False
+    bitflag_filter_item = 1 << 30
+
+
+class UI_UL_list(UIList):
+    """The helpers Blender ships in bl_ui for custom filter_items()"""
+
+    @staticmethod
+    def filter_items_by_name(pattern, bitflag, items, propname="name", flags=None, reverse=False):
+        import fnmatch
+
+        if not pattern or not items:
+            return []
+
+        if pattern[0] != '*':
+            pattern = '*' + pattern
+        if pattern[-1] != '*':
+            pattern = pattern + '*'
+
+        if not flags:
+            flags = [0] * len(items)
+
+        for i, item in enumerate(items):
+            name = getattr(item, propname, None)
+            if name and fnmatch.fnmatch(name.lower(), pattern.lower()) != reverse:
+                flags[i] |= bitflag
+
+        return flags
+
+    @staticmethod
+    def sort_items_helper(sort_data, key, reverse=False):
+        sort_data.sort(key=key, reverse=reverse)
+        order = [None] * len(sort_data)
+        for new, (old, *rest) in enumerate(sort_data):
+            order[old] = new
+        return order
+
+    @classmethod
+    def sort_items_by_name(cls, items, propname="name"):
+        sort_data = [(i, getattr(item, propname, "")) for i, item in enumerate(items)]
+        return cls.sort_items_helper(sort_data, lambda e: e[1].lower())
+
+
+class Menu(bpy_struct):
+    layout = None
+    _draw_funcs = None
+
+    @classmethod
+    def _funcs(cls):
+        if "_draw_funcs" not in cls.__dict__ or cls._draw_funcs is None:
+            cls._draw_funcs = []
+        return cls._draw_funcs
+
+    @classmethod
+    def append(cls, draw_func):
+        cls._funcs().append(draw_func)
+
+    @classmethod
+    def prepend(cls, draw_func):
+        cls._funcs().insert(0, draw_func)
+
+    @classmethod
+    def remove(cls, draw_func):
+        if draw_func in cls._funcs():
+            cls._funcs().remove(draw_func)
+
+
+class VIEW3D_MT_mesh_add(Menu):
+    pass
+
+
+class TOPBAR_MT_file_import(Menu):
+    pass
+
+
+class TOPBAR_MT_file_export(Menu):
+    pass
+
+
+class AddonPreferences(bpy_struct):
+    layout = None
+
+
+# Datablocks
+
+class _IDMeta(type):
+    """Lets add-ons hang new properties off ID types, like Object.gear_data"""
+
+    def __setattr__(cls, name, value):
+        if isinstance(value, _PropertyDeferred):
+            value = RNAProperty(name, value)
+        super().__setattr__(name, value)
+
+
+class ID(bpy_struct, metaclass=_IDMeta):
+
+    def __init__(self, name=""):
+        self.name = name
+        self.library = None
+        self.users = 0
+        self.use_fake_user = False
+        self.animation_data = None
+        self._idprops = {}
+
+    def __repr__(self):
+        return "bpy.data.%s['%s']" % (type(self).__name__.lower() + "s", self.name)
+
+    @property
+    def id_data(self):
+        return self
+
+    # Custom properties
+
+    def __getitem__(self, key):
+        return self._idprops[key]
+
+    def __setitem__(self, key, value):
+        self._idprops[key] = value
+
+    def __delitem__(self, key):
+        del self._idprops[key]
+
+    def __contains__(self, key):
+        return key in self._idprops
+
+    def keys(self):
+        return self._idprops.keys()
+
+    def get(self, key, default=None):
+        return self._idprops.get(key, default)
+
+    # Animation
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        return self.animation_data
+
+    def animation_data_clear(self):
+        self.animation_data = None
+
+    def driver_add(self, path, index=-1):
+        anim = self.animation_data_create()
+
+        if index == -1:
+            value = self.path_resolve(path)
+            if hasattr(value, "__len__") and not isinstance(value, str):
+                return [self.driver_add(path, i) for i in range(len(value))]
+            index = 0
+
+        fcurve = anim.drivers.find(path, index=index)
+        if fcurve is None:
+            fcurve = FCurve(path, index)
+            fcurve.driver = Driver()
+            anim.drivers._items.append(fcurve)
+        return fcurve
+
+    def driver_remove(self, path, index=-1):
+        if not self.animation_data:
+            return False
+
+        drivers = self.animation_data.drivers
+        prune = [d for d in drivers if d.data_path == path and index in (-1, d.array_index)]
+        for d in prune:
+            drivers.remove(d)
+        return bool(prune)
+
+    def keyframe_insert(self, data_path, index=-1, frame=None, group=""):
+        import bpy
+
+        if frame is None:
+            frame = bpy.context.scene.frame_current
+
+        anim = self.animation_data_create()
+        if anim.action is None:
+            anim.action = bpy.data.actions.new(self.name + "Action")
+
+        value = self.path_resolve(data_path)
+        if hasattr(value, "__len__") and not isinstance(value, str):
+            indices = range(len(value)) if index == -1 else [index]
+            values = [value[i] for i in indices]
+        else:
+            indices = [0]
+            values = [value]
+
+        for i, v in zip(indices, values):
+            fcurve = anim.action.fcurves.find(data_path, index=i)
+            if fcurve is None:
+                fcurve = anim.action.fcurves.new(data_path, index=i, action_group=group)
+            fcurve.keyframe_points.insert(frame, v)
+        return True
+
+    def update_tag(self, refresh=set()):
+        from . import _depsgraph
+        _depsgraph.tag(self)
+
+    def evaluated_get(self, depsgraph):
+        return self
+
+    @property
+    def original(self):
+        return self
+
+    def copy(self):
+        import bpy
+        return bpy.data._copy_id(self)
+
+
+class Mesh(ID):
+
+    def __init__(self, name=""):
+        super().__init__(name)
+        self.vertices = MeshVertices()
+        self.edges = MeshEdges()
+        self.polygons = MeshPolygons()
+        self.loops = MeshLoops()
+        self.materials = PropCollectionBase()
+        self.uv_layers = PropCollectionBase()
+        self.color_attributes = PropCollectionBase()
+        self.shape_keys = None
+        self.has_custom_normals = False
+
+    def from_pydata(self, vertices, edges, faces):
+        self.vertices._items = [MeshVertex(co) for co in vertices]
+
+        edge_list = [tuple(e) for e in edges]
+        loops = []
+        polygons = []
+        for face in faces:
+            polygons.append(MeshPolygon(len(loops), len(face)))
+            loops.extend(face)
+            for i in range(len(face)):
+                edge = (face[i], face[(i + 1) % len(face)])
+                edge_list.append(edge)
+
+        # Deduplicate edges the way mesh validation would
+        seen = set()
+        unique = []
+        for a, b in edge_list:
+            key = (min(a, b), max(a, b))
+            if key not in seen:
+                seen.add(key)
+                unique.append(key)
+
+        self.edges._items = [MeshEdge(e) for e in unique]
+        self.loops._items = [MeshLoop(v) for v in loops]
+        self.polygons._items = polygons
+
+    def update(self, calc_edges=False):
+        pass
+
+    def validate(self, verbose=False):
+        return False
+
+
+class MeshVertex(bpy_struct):
+    def __init__(self, co=(0.0, 0.0, 0.0)):
+        self.co = Vector(co)
+
+
+class MeshEdge(bpy_struct):
+    def __init__(self, vertices=(0, 0)):
+        self.vertices = list(vertices)
+
+
+class MeshLoop(bpy_struct):
+    def __init__(self, vertex_index=0):
+        self.vertex_index = vertex_index
+
+
+class MeshPolygon(bpy_struct):
+    def __init__(self, loop_start=0, loop_total=0):
+        self.loop_start = loop_start
+        self.loop_total = loop_total
+        self.material_index = 0
+        self.use_smooth = False
+
+
+class _MeshElements(PropCollectionBase):
+    item_type = None
+
+    def add(self, count):
+        self._items.extend(self.item_type() for i in range(count))
+
+
+class MeshVertices(_MeshElements):
+    item_type = MeshVertex
+
+
+class MeshEdges(_MeshElements):
+    item_type = MeshEdge
+
+
+class MeshLoops(_MeshElements):
+    item_type = MeshLoop
+
+
+class MeshPolygons(_MeshElements):
+    item_type = MeshPolygon
+
+
+class Object(ID):
+
+    def __init__(self, name="", object_data=None):
+        super().__init__(name)
+        self.data = object_data
+        self.type = 'EMPTY' if object_data is None else 'MESH'
+        self.mode = 'OBJECT'
+        self.parent = None
+        self.rotation_mode = 'XYZ'
+        self.location = Vector((0.0, 0.0, 0.0))
+        self.scale = Vector((1.0, 1.0, 1.0))
+        self.rotation_euler = Euler((0.0, 0.0, 0.0))
+        self.rotation_quaternion = Quaternion((1.0, 0.0, 0.0, 0.0))
+        self.rotation_axis_angle = [0.0, 0.0, 1.0, 0.0]
+        self.delta_rotation_euler = Euler((0.0, 0.0, 0.0))
+        self.delta_rotation_quaternion = Quaternion((1.0, 0.0, 0.0, 0.0))
+        self.constraints = ObjectConstraints()
+        self._select = False
+        self._hide = False
+
+    @property
+    def matrix_basis(self):
+        # Deltas go on the outside, like BKE_object_rot_to_mat3
+        if self.rotation_mode == 'QUATERNION':
+            rot = (self.delta_rotation_quaternion @ self.rotation_quaternion).to_matrix()
+        elif self.rotation_mode == 'AXIS_ANGLE':
+            angle, x, y, z = self.rotation_axis_angle
+            rot = Quaternion((x, y, z), angle).to_matrix()
+        else:
+            delta = Euler(self.delta_rotation_euler, self.rotation_mode).to_matrix()
+            rot = delta @ Euler(self.rotation_euler, self.rotation_mode).to_matrix()
+
+        scale = Matrix.Identity(4)
+        for i in range(3):
+            scale.rows[i][i] = self.scale[i]
+
+        return Matrix.Translation(self.location) @ rot.to_4x4() @ scale
+
+    @property
+    def matrix_world(self):
+        # Blender caches this on evaluation; here it's just worked out on demand
+        basis = self.matrix_basis
+        if self.parent:
+            return self.parent.matrix_world @ basis
+        return basis
+
+    @matrix_world.setter
+    def matrix_world(self, matrix):
+        self.location = Vector(matrix.translation)
+
+    def select_set(self, state, view_layer=None):
+        self._select = bool(state)
+
+    def select_get(self, view_layer=None):
+        return self._select
+
+    def hide_get(self, view_layer=None):
+        return self._hide
+
+    def hide_set(self, state, view_layer=None):
+        self._hide = bool(state)
+
+    @property
+    def users_collection(self):
+        import bpy
+        return [c for c in bpy.data._all_collections() if self in c.objects._items]
+
+
+class Action(ID):
+
+    def __init__(self, name=""):
+        super().__init__(name)
+        self.fcurves = ActionFCurves()
+
+
+class Collection(ID):
+
+    def __init__(self, name=""):
+        super().__init__(name)
+        self.objects = CollectionObjects()
+        self.children = CollectionChildren()
+
+    @property
+    def all_objects(self):
+        if not self.children._items:
+            return list(self.objects._items)
+
+        found = []
+        seen = set()
+        stack = [self]
+        while stack:
+            coll = stack.pop()
+            for obj in coll.objects._items:
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    found.append(obj)
+            stack.extend(coll.children._items)
+        return found
+
+
+class CollectionObjects(PropCollectionBase):
+
+    def link(self, obj):
+        if obj in self._items:
+            raise RuntimeError("Object '%s' already in collection" % obj.name)
+        self._items.append(obj)
+
+    def unlink(self, obj):
+        self._items.remove(obj)
+
+
+class CollectionChildren(PropCollectionBase):
+
+    def link(self, child):
+        self._items.append(child)
+
+    def unlink(self, child):
+        self._items.remove(child)
+
+
+class RenderSettings(bpy_struct):
+
+    def __init__(self):
+        self.fps = 24
+        self.fps_base = 1.0
+        self.resolution_x = 1920
+        self.resolution_y = 1080
+
+
+class SceneObjects(PropCollectionBase):
+    """Live view of every object linked anywhere under the scene collection"""
+
+    def __init__(self, scene):
+        super().__init__()
+        self.scene = scene
+
+    def _list(self):
+        return self.scene.collection.all_objects
+
+
+class View3DCursor(bpy_struct):
+
+    def __init__(self):
+        self.location = Vector((0.0, 0.0, 0.0))
+        self.rotation_euler = Euler((0.0, 0.0, 0.0))
+
+
+class Scene(ID):
+
+    def __init__(self, name=""):
+        super().__init__(name)
+        self.cursor = View3DCursor()
+        self.collection = Collection("Scene Collection")
+        self.objects = SceneObjects(self)
+        self.render = RenderSettings()
+        self.frame_current = 1
+        self.frame_subframe = 0.0
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_step = 1
+        self.view_layers = PropCollectionBase([ViewLayer(self)])
+
+    @property
+    def frame_current_final(self):
+        return self.frame_current + self.frame_subframe
+
+    def frame_set(self, frame, subframe=0.0):
+        from . import _depsgraph
+        self.frame_current = int(frame)
+        self.frame_subframe = float(subframe)
+        _depsgraph.frame_change(self)
+
+
+class LayerObjects(PropCollectionBase):
+
+    def __init__(self, scene):
+        super().__init__()
+        self.scene = scene
+        self.active = None
+
+    def _list(self):
+        return self.scene.objects._list()
+
+    @property
+    def selected(self):
+        return [obj for obj in self._list() if obj.select_get()]
+
+
+class ViewLayer(bpy_struct):
+
+    def __init__(self, scene):
+        self.name = "ViewLayer"
+        self.scene = scene
+        self.objects = LayerObjects(scene)
+        self.depsgraph = Depsgraph(scene)
+
+    def update(self):
+        self.depsgraph.update()
+
+
+class DepsgraphUpdate(bpy_struct):
+
+    def __init__(self, id):
+        self.id = id
+
+
+class Depsgraph(bpy_struct):
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.updates = []
+
+    def update(self):
+        from . import _depsgraph
+        _depsgraph.evaluate(self.scene)
+        _depsgraph.flush_updates(self)
+
+
+# Animation
+
+class AnimData(bpy_struct):
+
+    def __init__(self):
+        self.action = None
+        self.drivers = AnimDataDrivers()
+
+
+class _FCurveCollection(PropCollectionBase):
+
+    def find(self, data_path, index=0):
+        for fcurve in self._items:
+            if fcurve.data_path == data_path and fcurve.array_index == index:
+                return fcurve
+        return None
+
+    def remove(self, fcurve):
+        self._items.remove(fcurve)
+
+    def clear(self):
+        self._items.clear()
+
+
+class AnimDataDrivers(_FCurveCollection):
+    pass
+
+
+class ActionFCurves(_FCurveCollection):
+
+    def new(self, data_path, index=0, action_group=""):
+        if self.find(data_path, index):
+            raise RuntimeError("F-Curve '%s[%d]' already exists in action" % (data_path, index))
+        fcurve = FCurve(data_path, index)
+        fcurve.group = action_group or None
+        self._items.append(fcurve)
+        return fcurve
+
+
+class Keyframe(bpy_struct):
+    # Keyframe.interpolation as foreach_set sees it
+    interpolation_items = ['CONSTANT', 'LINEAR', 'BEZIER']
+
+    def __init__(self, co=(0.0, 0.0)):
+        self.co = Vector(co)
+        self.handle_left = Vector(co)
+        self.handle_right = Vector(co)
+        self._interpolation = 'BEZIER'
+
+    @property
+    def interpolation(self):
+        return self._interpolation
+
+    @interpolation.setter
+    def interpolation(self, value):
+        if isinstance(value, int):
+            value = self.interpolation_items[value]
+        if value not in self.interpolation_items:
+            raise TypeError("enum \"%s\" not found" % value)
+        self._interpolation = value
+
+
+class FCurveKeyframePoints(PropCollectionBase):
+
+    def add(self, count):
+        self._items.extend(Keyframe() for i in range(count))
+
+    def insert(self, frame, value, options=set(), keyframe_type='KEYFRAME'):
+        for point in self._items:
+            if point.co[0] == frame:
+                point.co[1] = value
+                return point
+
+        point = Keyframe((frame, value))
+        self._items.append(point)
+        self._items.sort(key=lambda p: p.co[0])
+        return point
+
+    def remove(self, point, fast=False):
+        self._items.remove(point)
+
+    def clear(self):
+        self._items.clear()
+
+
+class FCurve(bpy_struct):
+
+    def __init__(self, data_path="", array_index=0):
+        self.data_path = data_path
+        self.array_index = array_index
+        self.driver = None
+        self.group = None
+        self.mute = False
+        self.is_valid = True
+        self.extrapolation = 'CONSTANT'
+        self.keyframe_points = FCurveKeyframePoints()
+        self.modifiers = FCurveModifiers()
+
+    def update(self):
+        self.keyframe_points._items.sort(key=lambda p: p.co[0])
+
+    def evaluate(self, frame):
+        """Linear between keys (Bezier keys are treated as linear too).
+        Modifiers are stored but never applied."""
+        points = self.keyframe_points._items
+        if not points:
+            return 0.0
+
+        if frame <= points[0].co[0]:
+            return points[0].co[1] + self._end_slope(0, 1) * (frame - points[0].co[0])
+        if frame >= points[-1].co[0]:
+            return points[-1].co[1] + self._end_slope(-2, -1) * (frame - points[-1].co[0])
+
+        lo, hi = 0, len(points) - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if points[mid].co[0] <= frame:
+                lo = mid
+            else:
+                hi = mid
+
+        a, b = points[lo], points[hi]
+        if a.interpolation == 'CONSTANT':
+            return a.co[1]
+
+        t = (frame - a.co[0]) / (b.co[0] - a.co[0])
+        return a.co[1] + (b.co[1] - a.co[1]) * t
+
+    def _end_slope(self, i, j):
+        points = self.keyframe_points._items
+        if self.extrapolation != 'LINEAR' or len(points) < 2:
+            return 0.0
+        a, b = points[i], points[j]
+        if a.interpolation == 'CONSTANT' or b.co[0] == a.co[0]:
+            return 0.0
+        return (b.co[1] - a.co[1]) / (b.co[0] - a.co[0])
+
+
+class FModifier(bpy_struct):
+
+    def __init__(self, type):
+        self.type = type
+        self.mute = False
+        self.active = True
+
+
+class FCurveModifiers(PropCollectionBase):
+
+    def new(self, type):
+        modifier = FModifier(type)
+        self._items.append(modifier)
+        return modifier
+
+    def remove(self, modifier):
+        self._items.remove(modifier)
+
+
+class DriverTarget(bpy_struct):
+
+    def __init__(self):
+        self.id_type = 'OBJECT'
+        self.id = None
+        self.data_path = ""
+        self.transform_type = 'LOC_X'
+        self.transform_space = 'WORLD_SPACE'
+
+
+class DriverVariable(bpy_struct):
+
+    def __init__(self):
+        self.name = "var"
+        self.type = 'SINGLE_PROP'
+        self.targets = PropCollectionBase([DriverTarget(), DriverTarget()])
+
+
+class ChannelDriverVariables(PropCollectionBase):
+
+    def new(self):
+        var = DriverVariable()
+        self._items.append(var)
+        return var
+
+    def remove(self, variable):
+        self._items.remove(variable)
+
+
+class Driver(bpy_struct):
+
+    def __init__(self):
+        self.type = 'SCRIPTED'
+        self.expression = ""
+        self.use_self = False
+        self.is_valid = True
+        self.variables = ChannelDriverVariables()
+
+    @property
+    def is_simple_expression(self):
+        from . import _depsgraph
+        return _depsgraph.is_simple_expression(self.expression, [v.name for v in self.variables])
+
+
+# Default names and settings for the constraint types anything here uses
+_constraint_names = {'TRANSFORM': "Transformation"}
+
+_constraint_defaults = {
+    'TRANSFORM': dict(
+        [("use_motion_extrapolate", False), ("map_from", 'LOCATION'), ("map_to", 'LOCATION')]
+        + [("%s_%s_%s_rot" % (side, end, axis), 0.0)
+           for side in ("from", "to") for end in ("min", "max") for axis in "xyz"]
+    ),
+}
+
+
+class Constraint(bpy_struct):
+    """Loose stand-in for every constraint type; attributes are free-form"""
+
+    def __init__(self, type):
+        self.type = type
+        self.name = _constraint_names.get(type, type.title())
+        self.mute = False
+        self.influence = 1.0
+        self.target = None
+        for attr, value in _constraint_defaults.get(type, {}).items():
+            setattr(self, attr, value)
+
+
+class ObjectConstraints(PropCollectionBase):
+
+    def new(self, type):
+        constraint = Constraint(type)
+
+        # Names are unique per object, same as Blender
+        names = {c.name for c in self._items}
+        base, n = constraint.name, 0
+        while constraint.name in names:
+            n += 1
+            constraint.name = "%s.%03d" % (base, n)
+
+        self._items.append(constraint)
+        return constraint
+
+    def remove(self, constraint):
+        self._items.remove(constraint)
+
+    def clear(self):
+        self._items.clear()
+
+
+# Context and window manager
+
+class WindowManager(ID):
+
+    def invoke_props_dialog(self, operator, width=300):
+        # No one to ask in the background, so just run it
+        import bpy
+        return operator.execute(bpy.context)
+
+    def invoke_confirm(self, operator, event):
+        import bpy
+        return operator.execute(bpy.context)
+
+    def fileselect_add(self, operator):
+        return {'RUNNING_MODAL'}
+
+
+class Context(bpy_struct):
+
+    def __init__(self, scene, window_manager):
+        self.scene = scene
+        self.window_manager = window_manager
+        self.window = None
+        self.area = None
+        self.region = None
+        self.preferences = None
+
+    @property
+    def view_layer(self):
+        return self.scene.view_layers[0]
+
+    @property
+    def collection(self):
+        return self.scene.collection
+
+    @property
+    def active_object(self):
+        return self.view_layer.objects.active
+
+    object = active_object
+
+    @property
+    def selected_objects(self):
+        return self.view_layer.objects.selected
+
+    @property
+    def selected_editable_objects(self):
+        return [obj for obj in self.selected_objects if obj.library is None]
+
+    def evaluated_depsgraph_get(self):
+        return self.view_layer.depsgraph
@@ -0,0 +1,402 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Just enough of mathutils for GearEngine to run outside Blender.
+# Pure Python and slow; correctness over speed.
+
+import math
+
+
+class _Sequence:
+    """Fixed-length float sequence shared by Vector, Euler and Quaternion"""
+
+    def __init__(self, values):
+        self._values = [float(v) for v in values]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._values[index]
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            values = [float(v) for v in value]
+            if len(self._values[index]) != len(values):
+                raise ValueError("slice assignment would change the length")
+            self._values[index] = values
+        else:
+            self._values[index] = float(value)
+
+    def __eq__(self, other):
+        try:
+            return list(self) == [float(v) for v in other]
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return "%s((%s))" % (type(self).__name__, ", ".join("%.4f" % v for v in self._values))
+
+    def to_tuple(self, precision=-1):
+        if precision == -1:
+            return tuple(self._values)
+        return tuple(round(v, precision) for v in self._values)
+
+
+class Vector(_Sequence):
+
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        super().__init__(values)
+
+    def _axis(index):
+        def get(self):
+            return self._values[index]
+
+        def set(self, value):
+            self._values[index] = float(value)
+
+        return property(get, set)
+
+    x = _axis(0)
+    y = _axis(1)
+    z = _axis(2)
+    w = _axis(3)
+    del _axis
+
+    def copy(self):
+        return Vector(self._values)
+
+    def __add__(self, other):
+        return Vector([a + b for a, b in zip(self, other)])
+
+    def __sub__(self, other):
+        return Vector([a - b for a, b in zip(self, other)])
+
+    def __neg__(self):
+        return Vector([-a for a in self])
+
+    def __mul__(self, scalar):
+        return Vector([a * scalar for a in self])
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        return Vector([a / scalar for a in self])
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self, other))
+
+    def cross(self, other):
+        ax, ay, az = self
+        bx, by, bz = other
+        return Vector((ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx))
+
+    @property
+    def length(self):
+        return math.sqrt(self.dot(self))
+
+    @property
+    def length_squared(self):
+        return self.dot(self)
+
+    def normalized(self):
+        length = self.length
+        if length == 0.0:
+            return self.copy()
+        return self / length
+
+    def normalize(self):
+        self._values = list(self.normalized())
+
+    def angle(self, other, fallback=None):
+        lengths = self.length * Vector(other).length
+        if lengths == 0.0:
+            if fallback is not None:
+                return fallback
+            raise ValueError("Vector.angle(other): zero length vectors have no valid angle")
+        cos = max(-1.0, min(1.0, self.dot(other) / lengths))
+        return math.acos(cos)
+
+    def to_3d(self):
+        values = list(self._values[:3])
+        return Vector(values + [0.0] * (3 - len(values)))
+
+    def to_4d(self):
+        values = list(self._values[:4])
+        values += [0.0] * (3 - len(values))
+        if len(values) < 4:
+            values.append(1.0)
+        return Vector(values)
+
+
+class Euler(_Sequence):
+
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        super().__init__(angles)
+        self.order = order
+
+    x = Vector.x
+    y = Vector.y
+    z = Vector.z
+
+    def copy(self):
+        return Euler(self._values, self.order)
+
+    def to_matrix(self):
+        result = Matrix.Identity(3)
+        # Euler order is the order the rotations are applied in
+        for axis in self.order:
+            angle = self._values["XYZ".index(axis)]
+            result = Matrix.Rotation(angle, 3, axis) @ result
+        return result
+
+    def to_quaternion(self):
+        return self.to_matrix().to_quaternion()
+
+
+class Quaternion(_Sequence):
+
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0), angle=None):
+        if angle is not None:
+            axis = Vector(values).normalized()
+            half = angle / 2.0
+            s = math.sin(half)
+            values = (math.cos(half), axis[0] * s, axis[1] * s, axis[2] * s)
+        super().__init__(values)
+
+    w = Vector.x
+    x = Vector.y
+    y = Vector.z
+    z = Vector.w
+
+    def copy(self):
+        return Quaternion(self._values)
+
+    def __matmul__(self, other):
+        if isinstance(other, Quaternion):
+            aw, ax, ay, az = self
+            bw, bx, by, bz = other
+            return Quaternion((
+                aw * bw - ax * bx - ay * by - az * bz,
+                aw * bx + ax * bw + ay * bz - az * by,
+                aw * by - ax * bz + ay * bw + az * bx,
+                aw * bz + ax * by - ay * bx + az * bw,
+            ))
+        return self.to_matrix() @ Vector(other)
+
+    @property
+    def angle(self):
+        w = max(-1.0, min(1.0, self._values[0]))
+        return 2.0 * math.acos(w)
+
+    @property
+    def axis(self):
+        s = math.sqrt(max(0.0, 1.0 - self._values[0] ** 2))
+        if s < 1e-12:
+            return Vector((1.0, 0.0, 0.0))
+        return Vector([v / s for v in self._values[1:]])
+
+    def to_axis_angle(self):
+        return self.axis, self.angle
+
+    def normalized(self):
+        length = math.sqrt(sum(v * v for v in self._values))
+        if length == 0.0:
+            return self.copy()
+        return Quaternion([v / length for v in self._values])
+
+    def inverted(self):
+        w, x, y, z = self.normalized()
+        return Quaternion((w, -x, -y, -z))
+
+    def to_matrix(self):
+        w, x, y, z = self.normalized()
+        return Matrix((
+            (1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)),
+            (2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)),
+            (2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)),
+        ))
+
+    def to_euler(self, order='XYZ'):
+        return self.to_matrix().to_euler(order)
+
+
+class Matrix:
+
+    def __init__(self, rows=None):
+        if rows is None:
+            rows = Matrix.Identity(4).rows
+        self.rows = [[float(v) for v in row] for row in rows]
+
+    @classmethod
+    def Identity(cls, size):
+        return cls([[1.0 if i == j else 0.0 for j in range(size)] for i in range(size)])
+
+    @classmethod
+    def Translation(cls, vector):
+        result = cls.Identity(4)
+        for i in range(3):
+            result.rows[i][3] = float(vector[i])
+        return result
+
+    @classmethod
+    def Scale(cls, factor, size, axis=None):
+        result = cls.Identity(size)
+        for i in range(min(size, 3)):
+            result.rows[i][i] = float(factor)
+        return result
+
+    @classmethod
+    def Rotation(cls, angle, size, axis):
+        if isinstance(axis, str):
+            axis = {'X': (1, 0, 0), 'Y': (0, 1, 0), 'Z': (0, 0, 1)}[axis]
+        rot = Quaternion(axis, angle).to_matrix()
+        if size == 4:
+            return rot.to_4x4()
+        if size == 2:
+            c, s = math.cos(angle), math.sin(angle)
+            return cls(((c, -s), (s, c)))
+        return rot
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __eq__(self, other):
+        return isinstance(other, Matrix) and self.rows == other.rows
+
+    def __repr__(self):
+        return "Matrix(%r)" % (self.rows,)
+
+    def copy(self):
+        return Matrix(self.rows)
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            cols = list(zip(*other.rows))
+            return Matrix([[sum(a * b for a, b in zip(row, col)) for col in cols] for row in self.rows])
+
+        values = list(other)
+        size = len(self.rows)
+        if len(values) == size - 1:
+            # 4x4 @ 3D vector treats it as a point
+            out = [sum(a * b for a, b in zip(row, values + [1.0])) for row in self.rows]
+            return Vector(out[:len(values)])
+        return Vector([sum(a * b for a, b in zip(row, values)) for row in self.rows])
+
+    @property
+    def translation(self):
+        return Vector([self.rows[i][3] for i in range(3)])
+
+    @translation.setter
+    def translation(self, vector):
+        for i in range(3):
+            self.rows[i][3] = float(vector[i])
+
+    def to_3x3(self):
+        return Matrix([row[:3] for row in self.rows[:3]])
+
+    def to_4x4(self):
+        result = Matrix.Identity(4)
+        for i in range(min(3, len(self.rows))):
+            for j in range(min(3, len(self.rows))):
+                result.rows[i][j] = self.rows[i][j]
+        if len(self.rows) == 4:
+            return self.copy()
+        return result
+
+    def transposed(self):
+        return Matrix([list(col) for col in zip(*self.rows)])
+
+    def inverted(self):
+        size = len(self.rows)
+        work = [row[:] + [1.0 if i == j else 0.0 for j in range(size)] for i, row in enumerate(self.rows)]
+
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda r: abs(work[r][col]))
+            if abs(work[pivot][col]) < 1e-12:
+                raise ValueError("Matrix.inverted(): matrix does not have an inverse")
+            work[col], work[pivot] = work[pivot], work[col]
+
+            scale = work[col][col]
+            work[col] = [v / scale for v in work[col]]
+
+            for r in range(size):
+                if r != col:
+                    factor = work[r][col]
+                    work[r] = [a - factor * b for a, b in zip(work[r], work[col])]
+
+        return Matrix([row[size:] for row in work])
+
+    def to_quaternion(self):
+        m = self.to_3x3().rows
+        trace = m[0][0] + m[1][1] + m[2][2]
+
+        if trace > 0.0:
+            s = math.sqrt(trace + 1.0) * 2.0
+            w = 0.25 * s
+            x = (m[2][1] - m[1][2]) / s
+            y = (m[0][2] - m[2][0]) / s
+            z = (m[1][0] - m[0][1]) / s
+        elif m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+            s = math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2]) * 2.0
+            w = (m[2][1] - m[1][2]) / s
+            x = 0.25 * s
+            y = (m[0][1] + m[1][0]) / s
+            z = (m[0][2] + m[2][0]) / s
+        elif m[1][1] > m[2][2]:
+            s = math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2]) * 2.0
+            w = (m[0][2] - m[2][0]) / s
+            x = (m[0][1] + m[1][0]) / s
+            y = 0.25 * s
+            z = (m[1][2] + m[2][1]) / s
+        else:
+            s = math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1]) * 2.0
+            w = (m[1][0] - m[0][1]) / s
+            x = (m[0][2] + m[2][0]) / s
+            y = (m[1][2] + m[2][1]) / s
+            z = 0.25 * s
+
+        return Quaternion((w, x, y, z))
+
+    def to_euler(self, order='XYZ'):
+        if order != 'XYZ':
+            raise NotImplementedError("Only XYZ eulers are supported outside Blender")
+        m = self.to_3x3().rows
+        sy = math.sqrt(m[0][0] ** 2 + m[1][0] ** 2)
+        if sy > 1e-9:
+            x = math.atan2(m[2][1], m[2][2])
+            y = math.atan2(-m[2][0], sy)
+            z = math.atan2(m[1][0], m[0][0])
+        else:
+            x = math.atan2(-m[1][2], m[1][1])
+            y = math.atan2(-m[2][0], sy)
+            z = 0.0
+        return Euler((x, y, z), order)
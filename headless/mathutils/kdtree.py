@@ -0,0 +1,100 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# mathutils.kdtree.KDTree: a median-split tree over 3D points, with the
+# same insert/balance/find/find_n/find_range calls as Blender's.
+
+import math
+
+from . import Vector
+
+
+class KDTree:
+
+    def __init__(self, size):
+        self.size = size
+        self._points = []
+        self._root = None
+        self._balanced = False
+
+    def insert(self, co, index):
+        if len(self._points) >= self.size:
+            raise RuntimeError("Size exceeded")
+        self._points.append((tuple(float(v) for v in co), index))
+        self._balanced = False
+
+    def balance(self):
+        self._root = self._build(list(self._points), 0)
+        self._balanced = True
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return (
+            points[mid],
+            axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1),
+        )
+
+    def _check(self):
+        if not self._balanced:
+            raise RuntimeError("KDTree must be balanced before calling find()")
+
+    def find_range(self, co, radius):
+        self._check()
+        co = tuple(float(v) for v in co)
+        found = []
+        stack = [self._root]
+
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            (point, index), axis, left, right = node
+
+            dist = math.dist(point, co)
+            if dist <= radius:
+                found.append((Vector(point), index, dist))
+
+            delta = co[axis] - point[axis]
+            if delta - radius <= 0.0:
+                stack.append(left)
+            if delta + radius >= 0.0:
+                stack.append(right)
+
+        found.sort(key=lambda item: item[2])
+        return found
+
+    def find_n(self, co, n):
+        self._check()
+        co = tuple(float(v) for v in co)
+        found = [(Vector(point), index, math.dist(point, co)) for point, index in self._points]
+        found.sort(key=lambda item: item[2])
+        return found[:n]
+
+    def find(self, co, filter=None):
+        for item in self.find_n(co, len(self._points)):
+            if filter is None or filter(item[1]):
+                return item
+        return (None, None, None)
@@ -0,0 +1,67 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Runs the add-on against the stand-in one directory up, so the tests need
+# nothing but NumPy and pytest:
+#
+#   python -m pytest headless/tests
+#
+# Every test gets a fresh, empty file through the scene fixture.
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+HEADLESS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(HEADLESS)
+ADDON_NAME = "GearEngine"
+
+sys.path.insert(0, HEADLESS)
+
+import bpy
+
+
+def load_addon():
+    """Imports the repo as a package and registers it, once"""
+    if ADDON_NAME in sys.modules:
+        return sys.modules[ADDON_NAME]
+
+    spec = importlib.util.spec_from_file_location(
+        ADDON_NAME,
+        os.path.join(ROOT, "__init__.py"),
+        submodule_search_locations=[ROOT]
+    )
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[ADDON_NAME] = addon
+    spec.loader.exec_module(addon)
+    addon.register()
+    return addon
+
+
+load_addon()
+
+
+@pytest.fixture
+def scene():
+    # load_post runs as it would on File > New, which drops every cache
+    bpy.reset()
+    return bpy.context.scene
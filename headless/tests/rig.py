@@ -0,0 +1,85 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Small helpers for putting rigs together in tests, and for checking what
+# the drivers did against the solver.
+
+import bpy
+import pytest
+
+from GearEngine.evaluate import rotation_channel
+from GearEngine.kinematics import Mechanism
+
+
+def add_gear(scene, name, *rings, motor=False, speed=1.0):
+    """An empty with one ring per (teeth, gear_type, planetary_subtype)"""
+    obj = bpy.data.objects.new(name, None)
+    scene.collection.objects.link(obj)
+
+    for teeth, gear_type, subtype in rings:
+        ring = obj.gear_data.gears.add()
+        ring.teeth = teeth
+        ring.gear_type = gear_type
+        if subtype:
+            ring.planetary_subtype = subtype
+        ring.parent_obj = obj
+
+    if motor:
+        obj.gear_data.driver_type = 'MOTOR'
+        obj.gear_data.motor.speed = speed
+    return obj
+
+
+def spur(teeth):
+    return (teeth, 'SPUR', None)
+
+
+def planetary(teeth, subtype):
+    return (teeth, 'PLANETARY', subtype)
+
+
+def link(obj, drive, drive_gear=0, driven_gear=0, flip=False):
+    data = obj.gear_data
+    data.drive_object = drive
+    data.drive_gear = drive_gear
+    data.driven_gear = driven_gear
+    data.gears[driven_gear].flip = flip
+
+
+def init_drivers(scene):
+    for obj in scene.objects:
+        obj.select_set(True)
+    assert bpy.ops.ge.init_drivers(do_all=True) == {'FINISHED'}
+
+
+def solved_angles(scene, frame):
+    """{name: (rotation_euler index, angle)} straight from the solver"""
+    mechanism = Mechanism.from_scene(scene)
+    return {
+        rec.name: (rotation_channel(rec), mechanism.angle(i, frame))
+        for i, rec in enumerate(mechanism.graph.records)
+    }
+
+
+def assert_matches_solver(scene, frame):
+    scene.frame_set(frame)
+    for name, (axis, angle) in solved_angles(scene, frame).items():
+        turned = scene.objects[name].rotation_euler[axis]
+        assert turned == pytest.approx(angle, rel=1e-6, abs=1e-9), name
@@ -0,0 +1,128 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Edits queue a sync, and the timer brings drivers and constraints back in
+# line once the edits stop.
+
+import bpy
+import pytest
+
+from GearEngine import autosync
+from GearEngine.constraints import find_constraints
+from GearEngine.drivers import has_rotation_drivers
+
+from rig import add_gear, spur, link, init_drivers, assert_matches_solver
+
+
+@pytest.fixture(autouse=True)
+def no_delay(monkeypatch):
+    monkeypatch.setattr(autosync, "SYNC_DELAY", 0.0)
+    yield
+    autosync.clear_pending_sync()
+
+
+def chain(scene):
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(20))
+    b = add_gear(scene, "B", spur(40))
+    link(a, motor)
+    link(b, a)
+    return motor, a, b
+
+
+def driven_by(obj):
+    return {
+        target.id
+        for fcurve in obj.animation_data.drivers
+        for var in fcurve.driver.variables
+        for target in var.targets
+        if target.id and target.id is not obj
+    }
+
+
+def test_teeth_edits_keep_matching(scene):
+    motor, a, b = chain(scene)
+    init_drivers(scene)
+    assert_matches_solver(scene, 24)
+
+    a.gear_data.gears[0].teeth = 30
+    b.gear_data.gears[0].teeth = 15
+    assert autosync.pending
+    bpy.app.timers.run_due()
+
+    assert not autosync.pending
+    assert not bpy.app.timers.is_registered(autosync.sync_pending)
+    assert_matches_solver(scene, 24)
+
+
+def test_relinking_retargets_drivers(scene):
+    motor, a, b = chain(scene)
+    fast = add_gear(scene, "Fast", spur(10), motor=True, speed=5.0)
+    init_drivers(scene)
+
+    link(b, fast, flip=True)
+    bpy.app.timers.run_due()
+    assert driven_by(b) == {fast}
+    assert_matches_solver(scene, 24)
+
+
+def test_uninitialised_gears_are_left_alone(scene):
+    motor, a, b = chain(scene)
+
+    a.gear_data.gears[0].teeth = 30
+    bpy.app.timers.run_due()
+
+    assert not any(has_rotation_drivers(obj) for obj in (motor, a, b))
+    assert not any(find_constraints(obj) for obj in (motor, a, b))
+
+
+def test_constraints_stay_constraints(scene):
+    motor, a, b = chain(scene)
+    init_drivers(scene)
+    b.select_set(True)
+    assert bpy.ops.ge.init_constraint(do_all=False) == {'FINISHED'}
+    assert find_constraints(b)
+    before = {attr: getattr(find_constraints(b)[0], attr) for attr in ("to_max_x_rot", "to_max_y_rot", "to_max_z_rot")}
+
+    b.gear_data.gears[0].teeth = 80
+    bpy.app.timers.run_due()
+
+    assert find_constraints(b)
+    assert not has_rotation_drivers(b)
+    after = {attr: getattr(find_constraints(b)[0], attr) for attr in before}
+    assert after != before
+
+
+def test_toggle_off_skips_the_sync(scene):
+    motor, a, b = chain(scene)
+    fast = add_gear(scene, "Fast", spur(10), motor=True, speed=5.0)
+    init_drivers(scene)
+    scene.gear_settings.use_auto_sync = False
+
+    link(b, fast)
+    bpy.app.timers.run_due()
+
+    # Still reading A until someone re-initializes
+    assert not autosync.pending
+    assert driven_by(b) == {a}
+
+    init_drivers(scene)
+    assert driven_by(b) == {fast}
+    assert_matches_solver(scene, 24)
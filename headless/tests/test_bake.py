@@ -0,0 +1,71 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Baked keys have to land where the drivers would have put the gears, and
+# nothing else can be left turning them.
+
+import bpy
+
+from GearEngine.benchmarks.bench_gears import build_scene
+from GearEngine.benchmarks.trains import trains
+from GearEngine.constraints import find_constraints
+
+from rig import add_gear, spur, link, init_drivers, assert_matches_solver
+
+
+def test_bake_matches_solver(scene):
+    build_scene(scene, trains["linear"](8), "driver")
+    init_drivers(scene)
+    assert bpy.ops.ge.bake_gears(frame_start=1, frame_end=48) == {'FINISHED'}
+
+    for obj in scene.objects:
+        assert not (obj.animation_data and len(obj.animation_data.drivers))
+    assert_matches_solver(scene, 30)
+
+
+def test_bake_removes_constraints(scene):
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(20))
+    link(a, motor)
+    init_drivers(scene)
+    a.select_set(True)
+    assert bpy.ops.ge.init_constraint(do_all=False) == {'FINISHED'}
+    assert find_constraints(a)
+
+    assert bpy.ops.ge.bake_gears(frame_start=1, frame_end=48) == {'FINISHED'}
+    assert not len(a.constraints)
+    assert_matches_solver(scene, 30)
+
+
+def test_bake_removes_legacy_constraints(scene):
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(20))
+    link(a, motor)
+    init_drivers(scene)
+
+    # What the init operator made before its constraints were named
+    constraint = a.constraints.new('TRANSFORM')
+    constraint.target = motor
+    constraint.map_from = 'ROTATION'
+    constraint.map_to = 'ROTATION'
+    assert not find_constraints(a)
+
+    assert bpy.ops.ge.bake_gears(frame_start=1, frame_end=48) == {'FINISHED'}
+    assert not len(a.constraints)
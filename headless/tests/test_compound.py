@@ -0,0 +1,86 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Compound shafts: several rings on one object, turning as one.
+
+import pytest
+
+from GearEngine.kinematics import LOCKED
+from GearEngine.diagnostics import get_diagnostics
+
+from rig import add_gear, spur, link, init_drivers, assert_matches_solver
+
+modes = ["driver", "driver_python", "driver_flat", "handler"]
+
+
+def build_compound(scene):
+    """Motor -> A's first ring; A's second ring -> B's second ring, with A
+    spinning about X, so the link has to go through the right rings"""
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(30), spur(10))
+    b = add_gear(scene, "B", spur(99), spur(40))
+    for ring in a.gear_data.gears:
+        ring.axis = 'X'
+
+    link(a, motor)
+    link(b, a, drive_gear=1, driven_gear=1, flip=True)
+    return motor, a, b
+
+
+@pytest.mark.parametrize("mode", modes)
+def test_compound_matches_solver(scene, mode):
+    motor, a, b = build_compound(scene)
+    drive_mode, flat = {
+        "driver": ('DRIVER', False),
+        "driver_python": ('DRIVER', False),
+        "driver_flat": ('DRIVER', True),
+        "handler": ('HANDLER', False),
+    }[mode]
+    for obj in (a, b):
+        obj.gear_data.drive_mode = drive_mode
+        obj.gear_data.use_flat_chain = flat
+    b.gear_data.use_baked_ratios = mode != "driver_python"
+
+    init_drivers(scene)
+    assert_matches_solver(scene, 48)
+
+    # A turns about X, and B reads it from there
+    assert a.rotation_euler[0] != 0.0
+    assert b.rotation_euler[2] == pytest.approx(2.0 * -1.0 / 3.0 * 10.0 / 40.0 * 2.0)
+
+
+def test_compound_ratio_follows_driven_ring(scene):
+    motor, a, b = build_compound(scene)
+    assert b.gear_data.chain_ratio == pytest.approx(-1.0 / 3.0 * 10.0 / 40.0)
+
+    b.gear_data.driven_gear = 0
+    assert b.gear_data.chain_ratio == pytest.approx(-1.0 / 3.0 * -10.0 / 99.0)
+
+
+def test_loop_through_a_second_ring_locks(scene):
+    a = add_gear(scene, "A", spur(20), spur(20))
+    b = add_gear(scene, "B", spur(20))
+
+    # Same 1:1 loop as in test_solver, closed through A's other ring
+    link(b, a, drive_gear=1, flip=True)
+    link(a, b, driven_gear=1, flip=True)
+
+    assert get_diagnostics(scene).error(a) == LOCKED
+    assert get_diagnostics(scene).error(b) == LOCKED
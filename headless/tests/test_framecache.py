@@ -0,0 +1,91 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Frame caches: built from inside Blender, looked up while scrubbing, and
+# rebuilt in place after an edit.
+
+import bpy
+import pytest
+
+from GearEngine.framecache import get_frame_cache, cache_status
+
+from rig import add_gear, spur, link, init_drivers, assert_matches_solver
+
+
+def build(scene, tmp_path):
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(20))
+    b = add_gear(scene, "B", spur(40))
+    link(a, motor)
+    link(b, a)
+    init_drivers(scene)
+
+    scene.gear_settings.frame_cache = str(tmp_path / "cache.npy")
+    assert bpy.ops.ge.build_frame_cache(frame_start=1, frame_end=48) == {'FINISHED'}
+    return motor, a, b
+
+
+def test_cached_angles_match_solver(scene, tmp_path):
+    build(scene, tmp_path)
+    assert get_frame_cache(scene) is not None
+    assert_matches_solver(scene, 30)
+
+
+def test_rebuild_after_an_edit(scene, tmp_path):
+    motor, a, b = build(scene, tmp_path)
+
+    b.gear_data.gears[0].teeth = 80
+    assert get_frame_cache(scene) is None
+    assert cache_status(scene) == "Out of date, rebuild it"
+
+    # Same path, so the open cache has to be let go of and read again
+    assert bpy.ops.ge.build_frame_cache(frame_start=1, frame_end=48) == {'FINISHED'}
+    cache = get_frame_cache(scene)
+    assert cache is not None
+    assert cache_status(scene).startswith("3 gears")
+    assert_matches_solver(scene, 30)
+
+
+def test_gear_count_can_change(scene, tmp_path):
+    build(scene, tmp_path)
+    assert get_frame_cache(scene).angles.shape[1] == 3
+
+    c = add_gear(scene, "C", spur(30))
+    link(c, scene.objects["B"])
+    assert bpy.ops.ge.build_frame_cache(frame_start=1, frame_end=24) == {'FINISHED'}
+    cache = get_frame_cache(scene)
+    assert cache.angles.shape == (24, 4)
+    assert_matches_solver(scene, 12)
+
+
+def test_rebuild_leaves_open_mappings_alone(scene, tmp_path):
+    build(scene, tmp_path)
+    old = get_frame_cache(scene).angles
+    before = old.copy()
+
+    c = add_gear(scene, "C", spur(30))
+    link(c, scene.objects["B"])
+    assert bpy.ops.ge.build_frame_cache(frame_start=1, frame_end=24) == {'FINISHED'}
+
+    # Whoever still had the old file mapped keeps reading the old angles
+    assert old.shape == before.shape
+    assert (old == before).all()
+    assert get_frame_cache(scene).angles.shape == (24, 4)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache.json", "cache.npy"]
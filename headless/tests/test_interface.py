@@ -0,0 +1,48 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Ratios shown in the panel, which come from the stored copies.
+
+from GearEngine.interface import ratio_text
+
+from rig import add_gear, spur, planetary, link
+
+
+def test_minus_one_is_a_ratio(scene):
+    sun = add_gear(scene, "Sun", planetary(20, 'SUN'), motor=True)
+    ring = add_gear(scene, "Ring", planetary(20, 'RING'))
+    ring.gear_data.gears[0].gear_mode = 'A'
+    link(ring, sun)
+
+    assert ring.gear_data.gears[0].baked_ratio == -1.0
+    assert ratio_text(ring.gear_data.gears[0]) == "-1.000"
+
+
+def test_missing_input_ring_is_an_error(scene):
+    motor = add_gear(scene, "Motor", spur(20), motor=True)
+    a = add_gear(scene, "A", spur(40))
+    link(a, motor, drive_gear=3)
+    assert ratio_text(a.gear_data.gears[0]) == "Error"
+
+    a.gear_data.drive_gear = 0
+    assert ratio_text(a.gear_data.gears[0]) == "0.500"
+
+    motor.gear_data.gears[0].teeth = 0
+    assert ratio_text(a.gear_data.gears[0]) == "Error"
@@ -0,0 +1,72 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Motors spin on the axis they store, and ones from before it was stored
+# keep spinning the way their drivers always did.
+
+import bpy
+import pytest
+
+from GearEngine import handlers
+from GearEngine.drivers import apply_plan, plan_motor
+
+from rig import add_gear, spur, link, init_drivers, assert_matches_solver
+
+
+def test_new_motors_default_to_x(scene):
+    motor = add_gear(scene, "Motor", spur(10), motor=True)
+    assert motor.gear_data.motor.axis == 'X'
+
+
+@pytest.mark.parametrize("axis", ['X', 'Y', 'Z'])
+def test_add_motor_stores_its_axis(scene, axis):
+    motor = add_gear(scene, "Motor", spur(10))
+    bpy.context.view_layer.objects.active = motor
+    assert bpy.ops.ge.add_motor(axis=axis) == {'FINISHED'}
+    assert motor.gear_data.motor.axis == axis
+
+
+@pytest.mark.parametrize("rotation_mode", ['XYZ', 'QUATERNION', 'AXIS_ANGLE'])
+def test_old_motors_take_their_axis_from_the_driver(scene, rotation_mode):
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(20))
+    link(a, motor)
+    motor.rotation_mode = rotation_mode
+
+    # What Add Motor left behind before it stored the axis
+    apply_plan(plan_motor(motor, 'Y'))
+    assert not motor.gear_data.motor.is_property_set("axis")
+
+    handlers.on_load_post(None)
+    assert motor.gear_data.motor.axis == 'Y'
+
+    motor.rotation_mode = 'XYZ'
+    init_drivers(scene)
+    assert_matches_solver(scene, 24)
+    assert motor.rotation_euler[1] != 0.0
+
+
+def test_stored_axes_are_left_alone(scene):
+    motor = add_gear(scene, "Motor", spur(10), motor=True)
+    motor.gear_data.motor.axis = 'X'
+    apply_plan(plan_motor(motor, 'Z'))
+
+    handlers.on_load_post(None)
+    assert motor.gear_data.motor.axis == 'X'
@@ -0,0 +1,130 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Planetary sets, differentials and closed loops, checked against the
+# Willis equation worked out by hand.
+
+import pytest
+
+from GearEngine.kinematics import Mechanism, LOCKED
+from GearEngine.diagnostics import get_diagnostics
+
+from rig import add_gear, spur, planetary, link, init_drivers, solved_angles, assert_matches_solver
+
+
+def build_differential(scene):
+    """Two motors: one turns the sun, the other the carrier. The ring is
+    the set's output, and X hangs off the ring."""
+    ma = add_gear(scene, "MA", spur(20), motor=True, speed=1.0)
+    mb = add_gear(scene, "MB", spur(30), motor=True, speed=2.0)
+    sun = add_gear(scene, "S", spur(20), planetary(20, 'SUN'))
+    carrier = add_gear(scene, "C", spur(30), planetary(1, 'CARRIER'))
+    ring = add_gear(scene, "R", planetary(60, 'RING'))
+    planet = add_gear(scene, "P", planetary(20, 'PLANET'))
+    x = add_gear(scene, "X", spur(30))
+
+    link(sun, ma, flip=True)
+    link(carrier, mb, flip=True)
+    link(ring, sun, drive_gear=1)
+    link(planet, sun, drive_gear=1)
+    link(x, ring)
+    for obj in (sun, ring, planet):
+        obj.gear_data.carrier = carrier
+    return ma, mb, sun, carrier, ring, planet, x
+
+
+def angles(scene, frame):
+    return {name: angle for name, (axis, angle) in solved_angles(scene, frame).items()}
+
+
+def test_differential(scene):
+    build_differential(scene)
+    w = angles(scene, 24)
+
+    assert w["S"] == pytest.approx(1.0)
+    assert w["C"] == pytest.approx(2.0)
+    # Willis: w_ring = (1 + Zs/Zr) w_carrier - (Zs/Zr) w_sun
+    assert w["R"] == pytest.approx((1.0 + 20.0 / 60.0) * 2.0 - 20.0 / 60.0 * 1.0)
+    # Planets mesh with the sun relative to the carrier
+    assert w["P"] - w["C"] == pytest.approx(-1.0 * (w["S"] - w["C"]))
+    assert w["X"] == pytest.approx(-2.0 * w["R"])
+
+
+@pytest.mark.parametrize("drive_mode", ['DRIVER', 'HANDLER'])
+def test_differential_drivers_match_solver(scene, drive_mode):
+    for obj in build_differential(scene):
+        obj.gear_data.drive_mode = drive_mode
+    init_drivers(scene)
+
+    if drive_mode == 'DRIVER':
+        for name in ("R", "P", "X"):
+            driver = scene.objects[name].animation_data.drivers[0].driver
+            assert driver.is_simple_expression
+    assert_matches_solver(scene, 24)
+    assert_matches_solver(scene, 101)
+
+
+def test_fixed_carrier_reduces(scene):
+    motor = add_gear(scene, "M", spur(20), motor=True, speed=1.0)
+    carrier = add_gear(scene, "C", planetary(1, 'CARRIER'))
+    sun = add_gear(scene, "S", planetary(20, 'SUN'))
+    ring = add_gear(scene, "R", planetary(60, 'RING'))
+    link(sun, motor, flip=True)
+    link(ring, sun)
+    for obj in (sun, ring):
+        obj.gear_data.carrier = carrier
+
+    w = angles(scene, 24)
+    assert w["C"] == 0.0
+    assert w["R"] == pytest.approx(-20.0 / 60.0 * w["S"])
+
+
+def test_solvable_loop(scene):
+    ma, mb, sun, carrier, ring, planet, x = build_differential(scene)
+
+    # Feed the carrier back from the ring, which closes a loop
+    y = add_gear(scene, "Y", spur(30))
+    link(y, ring)
+    link(carrier, y)
+
+    w = angles(scene, 24)
+    assert w["R"] == pytest.approx(4.0 / 3.0 * w["C"] - 1.0 / 3.0 * w["S"])
+    assert w["Y"] == pytest.approx(-2.0 * w["R"])
+    assert w["C"] == pytest.approx(-w["Y"])
+
+    diagnostics = get_diagnostics(scene)
+    assert len(diagnostics) == 0
+    assert "C" in diagnostics.solved
+
+
+def test_locked_loop(scene):
+    a = add_gear(scene, "A", spur(20))
+    b = add_gear(scene, "B", spur(20))
+
+    # B turns with A and A with B, both 1:1 the same way round, so any
+    # speed at all fits and the loop can't be solved
+    link(b, a, flip=True)
+    link(a, b, flip=True)
+
+    mechanism = Mechanism.from_scene(scene)
+    names = [rec.name for rec in mechanism.graph.records]
+    assert mechanism.errors[names.index("A")] == LOCKED
+    assert mechanism.errors[names.index("B")] == LOCKED
+    assert get_diagnostics(scene).error(a) == LOCKED
@@ -0,0 +1,119 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Keyframed motor speed: the table has to integrate it, on and off the
+# keys, and everything downstream has to turn with the integral.
+
+import bpy
+import numpy as np
+import pytest
+
+from GearEngine.speedcurve import get_speed_table, speed_fcurve
+
+from rig import add_gear, spur, link, init_drivers, assert_matches_solver
+
+
+def ramp(scene, extrapolation='CONSTANT'):
+    """Motor speeding up from 0 to 2 over frames 0-24, driving a chain"""
+    motor = add_gear(scene, "Motor", spur(10), motor=True)
+    a = add_gear(scene, "A", spur(20))
+    b = add_gear(scene, "B", spur(40))
+    link(a, motor)
+    link(b, a)
+
+    motor.gear_data.motor.speed = 0.0
+    motor.keyframe_insert("gear_data.motor.speed", frame=0)
+    motor.gear_data.motor.speed = 2.0
+    motor.keyframe_insert("gear_data.motor.speed", frame=24)
+
+    fcurve = motor.animation_data.action.fcurves[0]
+    fcurve.extrapolation = extrapolation
+    for point in fcurve.keyframe_points:
+        point.interpolation = 'LINEAR'
+    return motor, a, b
+
+
+def test_integral_on_and_past_the_keys(scene):
+    motor, a, b = ramp(scene)
+    table = get_speed_table(motor)
+
+    # Area under the ramp, over 24fps
+    assert table.spin(12, 24) == pytest.approx(0.25)
+    assert table.spin(24, 24) == pytest.approx(1.0)
+    # Held at 2 past the last key
+    assert table.spin(48, 24) == pytest.approx(3.0)
+    assert table.spin(-24, 24) == pytest.approx(0.0)
+
+    frames = [-24.0, 0.0, 12.0, 24.0, 30.5, 48.0]
+    assert table.spins(frames, 24) == pytest.approx([table.spin(f, 24) for f in frames])
+
+
+def test_linear_extrapolation(scene):
+    motor, a, b = ramp(scene, 'LINEAR')
+    table = get_speed_table(motor)
+
+    # Speed keeps climbing at 1/12 per frame: 2 -> 4 over frames 24-48
+    assert table.spin(48, 24) == pytest.approx(1.0 + (2.0 + 4.0) / 2.0)
+    # And falls to -2 by frame -24; running backwards at negative speed
+    # still winds the angle forwards
+    assert table.spin(-24, 24) == pytest.approx(1.0)
+
+    frames = np.array([-30.0, 60.0])
+    assert table.spins(frames, 24) == pytest.approx([table.spin(f, 24) for f in frames])
+
+
+def test_modifiers_are_refused(scene):
+    motor, a, b = ramp(scene)
+    fcurve = motor.animation_data.action.fcurves[0]
+    modifier = fcurve.modifiers.new('CYCLES')
+    motor.animation_data.action.update_tag()
+    bpy.context.view_layer.update()
+
+    assert speed_fcurve(motor) is None
+    assert get_speed_table(motor) is None
+    assert speed_fcurve(motor, allow_modifiers=True) is fcurve
+
+    modifier.mute = True
+    assert get_speed_table(motor) is not None
+
+
+def test_edits_rebuild_the_table(scene):
+    motor, a, b = ramp(scene)
+    before = get_speed_table(motor)
+
+    motor.animation_data.action.fcurves[0].keyframe_points[1].co[1] = 4.0
+    motor.animation_data.action.update_tag()
+    bpy.context.view_layer.update()
+
+    after = get_speed_table(motor)
+    assert after is not before
+    assert after.spin(24, 24) == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize("drive_mode", ['DRIVER', 'HANDLER'])
+def test_gears_follow_the_integral(scene, drive_mode):
+    motor, a, b = ramp(scene)
+    for obj in (a, b):
+        obj.gear_data.drive_mode = drive_mode
+    init_drivers(scene)
+
+    assert_matches_solver(scene, 48)
+    assert motor.rotation_euler[0] == pytest.approx(3.0)
+    assert b.rotation_euler[2] == pytest.approx(3.0 * 10.0 / 40.0)
@@ -0,0 +1,141 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Gear trains out to a file and back in again.
+
+import json
+
+import bpy
+import pytest
+
+from GearEngine.graph import snapshot_objects
+from GearEngine.traintable import GearTable
+from GearEngine.trainio import export_train, import_train, load_train, save_train
+
+from rig import add_gear, spur, link
+
+
+def build(scene):
+    motor = add_gear(scene, "Motor", spur(10), motor=True, speed=2.0)
+    a = add_gear(scene, "A", spur(30), spur(10))
+    b = add_gear(scene, "B", spur(40))
+    link(a, motor)
+    link(b, a, drive_gear=1, flip=True)
+    motor.gear_data.motor.axis = 'X'
+    a.location = (1.0, 2.0, 3.0)
+    return motor, a, b
+
+
+def state(scene):
+    return [
+        (rec.name, rec.drive_object, rec.drive_gear, rec.driven_gear, rec.driver_type,
+         rec.speed, rec.motor_axis, [(r.teeth, r.flip, r.axis, r.gear_type) for r in rec.rings])
+        for rec in snapshot_objects(scene.objects)
+    ]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".npz"])
+def test_round_trip(scene, tmp_path, suffix):
+    motor, a, b = build(scene)
+    b.rotation_mode = 'QUATERNION'
+    b.rotation_quaternion = (0.8, 0.6, 0.0, 0.0)
+    a.rotation_mode = 'AXIS_ANGLE'
+    a.rotation_axis_angle = [0.7, 0.0, 1.0, 0.0]
+
+    before = state(scene)
+    chain = [obj.gear_data.chain_ratio for obj in (motor, a, b)]
+    path = str(tmp_path / ("train" + suffix))
+    save_train(path, scene.objects)
+
+    # Scramble everything the file should put back
+    for obj in (motor, a, b):
+        obj.gear_data.gears[0].teeth = 99
+        obj.gear_data.drive_object = None
+        obj.rotation_mode = 'XYZ'
+    a.location = (0.0, 0.0, 0.0)
+
+    objects = load_train(path, scene.collection)
+    assert objects == [motor, a, b]
+    assert len(scene.objects) == 3
+    assert state(scene) == before
+    assert [obj.gear_data.chain_ratio for obj in objects] == pytest.approx(chain)
+
+    assert tuple(a.location) == (1.0, 2.0, 3.0)
+    assert a.rotation_mode == 'AXIS_ANGLE'
+    assert list(a.rotation_axis_angle) == pytest.approx([0.7, 0.0, 1.0, 0.0])
+    assert b.rotation_mode == 'QUATERNION'
+    assert list(b.rotation_quaternion) == pytest.approx([0.8, 0.6, 0.0, 0.0])
+
+
+def test_version_1_files_still_load(scene, tmp_path):
+    motor, a, b = build(scene)
+    b.rotation_euler = (0.0, 0.0, 0.5)
+    path = tmp_path / "train.json"
+    save_train(str(path), scene.objects)
+
+    data = json.loads(path.read_text())
+    data["version"] = 1
+    del data["objects"]["rotation_mode"]
+    del data["vocab"]["objects.rotation_mode"]
+    data["rotation"] = [row[:3] for row in data["rotation"]]
+    path.write_text(json.dumps(data))
+
+    b.rotation_euler = (0.0, 0.0, 0.0)
+    load_train(str(path), scene.collection)
+    assert tuple(b.rotation_euler) == pytest.approx((0.0, 0.0, 0.5))
+
+
+def test_unknown_enums_change_nothing(scene, tmp_path):
+    build(scene)
+    path = tmp_path / "train.json"
+    save_train(str(path), scene.objects)
+
+    data = json.loads(path.read_text())
+    data["vocab"]["rings.gear_type"] = ["SPOOR"]
+    path.write_text(json.dumps(data))
+
+    before = state(scene)
+    with pytest.raises(ValueError):
+        load_train(str(path), scene.collection)
+    assert state(scene) == before
+
+    assert bpy.ops.ge.import_train(filepath=str(path)) == {'CANCELLED'}
+
+
+def test_objects_without_rings_are_left_alone(scene):
+    motor, a, b = build(scene)
+    table = export_train([motor])
+
+    cube = bpy.data.objects.new("Cube", None)
+    scene.collection.objects.link(cube)
+    table.objects["name"][:] = "Cube"
+
+    objects = import_train(table, scene.collection)
+    assert len(cube.gear_data.gears) == 0
+    assert objects[0] is not cube
+    assert objects[0].name != "Cube"
+    assert objects[0].gear_data.driver_type == 'MOTOR'
+
+
+def test_table_without_bpy():
+    table = GearTable.from_records([])
+    table.validate()
+    assert len(table) == 0
+    assert table.rotation.shape == (0, 4)
@@ -0,0 +1,40 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Whatever drives a gear, it should end up where the solver says.
+
+import pytest
+
+from GearEngine.benchmarks.bench_gears import build_scene
+from GearEngine.benchmarks.trains import trains
+
+from rig import init_drivers, assert_matches_solver
+
+modes = ["driver", "driver_python", "driver_flat", "handler"]
+
+
+@pytest.mark.parametrize("mode", modes)
+@pytest.mark.parametrize("train", ["linear", "planetary", "worm"])
+def test_train_matches_solver(scene, train, mode):
+    build_scene(scene, trains[train](12), mode)
+    init_drivers(scene)
+
+    for frame in (1, 37, 250):
+        assert_matches_solver(scene, frame)
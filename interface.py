@@ -19,6 +19,13 @@
 # Hell is other people's code.
 
 import bpy
+from bpy.props import BoolProperty, EnumProperty
+
+from . properties import gear_types
+from . profiler import profiler
+from . diagnostics import get_diagnostics
+from . framecache import cache_status
+from . speedcurve import speed_fcurve, has_modifiers
 
 class View3dPanel:
     bl_space_type = 'VIEW_3D'
@@ -31,6 +38,18 @@ class View3dPanel:
             return True
 
 
+def draw_add_menu(self, context):
+    self.layout.operator("ge.add_gear_mesh", text="Gear", icon='MESH_CYLINDER')
+
+
+def draw_import_menu(self, context):
+    self.layout.operator("ge.import_train", text="Gear Train (.json/.npz)")
+
+
+def draw_export_menu(self, context):
+    self.layout.operator("ge.export_train", text="Gear Train (.json/.npz)")
+
+
 class GE_PT_MainPanel(View3dPanel, bpy.types.Panel):
     bl_idname = "GE_PT_MainPanel"
     bl_label = "Gear Settings"
@@ -41,11 +60,6 @@ class GE_PT_MainPanel(View3dPanel, bpy.types.Panel):
 
         root = layout.column(align=True)
 
-        op = root.operator(
-            "ge.add_gear_to_set",
-            text="Add Gear"
-        )
-
         row = root.row(align=True)
         row.prop(obj.gear_data, "drive_mode", text="")
         op = row.operator(
@@ -53,6 +67,22 @@ class GE_PT_MainPanel(View3dPanel, bpy.types.Panel):
             text="",
             icon='FILE_REFRESH'
         )
+        row.prop(context.scene.gear_settings, "use_auto_sync", text="", icon='AUTO')
+        op = row.operator(
+            "ge.bake_gears",
+            text="",
+            icon='KEYFRAME'
+        )
+        op = row.operator(
+            "ge.dedup_meshes",
+            text="",
+            icon='LINKED'
+        )
+        op = row.operator(
+            "ge.auto_mesh",
+            text="",
+            icon='SNAP_ON'
+        )
 
         root.separator()
 
@@ -73,78 +103,219 @@ class GE_PT_MainPanel(View3dPanel, bpy.types.Panel):
             col.prop(obj.gear_data, "drive_object")
             col.prop(obj.gear_data, "drive_gear")
             col.prop(obj.gear_data, "driven_gear")
+            if any(gear.gear_type == 'PLANETARY' for gear in obj.gear_data.gears):
+                col.prop(obj.gear_data, "carrier")
         else:
             col.prop(obj.gear_data.motor, 'speed')
+            fcurve = speed_fcurve(obj, allow_modifiers=True)
+            if fcurve is not None and has_modifiers(fcurve):
+                row = col.row()
+                row.alert = True
+                row.label(text="Speed curve modifiers aren't supported", icon='ERROR')
             row = col.row(align=True)
             row.prop(obj.gear_data.motor, 'axis', expand=True)
 
+        col.prop(obj.gear_data, "use_baked_ratios")
+        if obj.gear_data.driver_type == 'OBJ':
+            col.prop(obj.gear_data, "use_flat_chain")
 
         col.separator()
 
-        root.label(text="Gear Rings:")
+        data = obj.gear_data
 
-        for i, gear in enumerate(obj.gear_data.gears):
-            box = root.box()
-            box = box.column(align=True)
-            box.use_property_decorate = False
-            box.use_property_split = True
+        header = root.row(align=True)
+        header.prop(
+            data,
+            "show_rings",
+            text="Gear Rings",
+            icon='DISCLOSURE_TRI_DOWN' if data.show_rings else 'DISCLOSURE_TRI_RIGHT',
+            emboss=False
+        )
 
-            header = box.row(align=True)
-            header.label(text="Ring " + str(i))
-            op = header.operator(
-                "ge.remove_gear",
-                text="",
-                icon='PANEL_CLOSE'
-            )
-            op.index = i
+        # Validation runs once per structural edit; this is just a lookup
+        error = get_diagnostics(context.scene).error(obj)
+        if error:
+            row = root.row(align=True)
+            row.alert = True
+            row.label(text=error, icon='ERROR')
+
+        active = None
+        if 0 <= data.active_ring < len(data.gears):
+            active = data.gears[data.active_ring]
+
+        if not data.show_rings:
+            summary = root.row(align=True)
+            summary.label(text="%d rings" % len(data.gears))
+            if active:
+                summary.label(text="%s: %s" % (active.name, ratio_text(active)))
+            return
+
+        row = root.row()
+        row.template_list(
+            "GE_UL_GearRings", "",
+            data, "gears",
+            data, "active_ring",
+            rows=3
+        )
 
-            box.prop(gear, "name")
-            if gear.gear_type == 'WORM':
-                box.prop(gear, "teeth", text='Threads')
-            else:
-                box.prop(gear, "teeth")
-            row = box.row(align=True)
-            row.prop(gear, "axis", expand=True)
-            box.separator()
+        side = row.column(align=True)
+        side.operator("ge.add_gear_to_set", text="", icon='ADD')
+        op = side.operator("ge.remove_gear", text="", icon='REMOVE')
+        op.index = data.active_ring
+
+        # Only the active ring gets the full editor
+        if active:
+            draw_ring(root, obj, active, error)
+
+
+def ratio_failed(gear):
+    """Whether the ratio getters soft-failed for gear. They return -1.0
+    then, but so does an equal-teeth planetary stage, so this asks the
+    same questions they did instead of looking at the value."""
+    data = gear.id_data.gear_data
+    drive_obj = data.drive_object
+    if not drive_obj:
+        return False
+
+    drive_gears = drive_obj.gear_data.gears
+    if data.drive_gear == -1 or data.drive_gear >= len(drive_gears):
+        return True
+    return gear.teeth == 0 or drive_gears[data.drive_gear].teeth == 0
 
-            if obj.gear_data.drive_object:
 
+def ratio_text(gear):
+    # baked_ratio is refreshed by every edit that can change it, so it's
+    # safe to show without running the drive_ratio getter on redraw
+    if ratio_failed(gear):
+        return "Error"
+    return "%.3f" % gear.baked_ratio
+
+
+def draw_ring(layout, obj, gear, error=None):
+    box = layout.box()
+    box = box.column(align=True)
+    box.use_property_decorate = False
+    box.use_property_split = True
+
+    box.prop(gear, "name")
+    if gear.gear_type == 'WORM':
+        box.prop(gear, "teeth", text='Threads')
+    else:
+        box.prop(gear, "teeth")
+    row = box.row(align=True)
+    row.prop(gear, "axis", expand=True)
+    box.separator()
+
+    if obj.gear_data.drive_object:
+
+        row = box.row(align=True)
+        row.prop(gear, "gear_type")
+
+        if gear.gear_type == 'PLANETARY':
+            row.prop(gear, "planetary_subtype", text="")
+
+            if gear.planetary_subtype == 'PLANET':
+                tip = row.operator("ge.tool_tip", text="", icon='INFO')
+                tip.tooltip = "Drive this with a gear on the carrier"
+
+            if not gear.planetary_subtype == 'PLANET':
                 row = box.row(align=True)
-                row.prop(gear, "gear_type")
-
-                if gear.gear_type == 'PLANETARY':
-                    row.prop(gear, "planetary_subtype", text="")
-
-                    if gear.planetary_subtype == 'PLANET':
-                        tip = row.operator("ge.tool_tip", text="", icon='INFO')
-                        tip.tooltip = "Drive this with a gear on the carrier"
-
-                    if not gear.planetary_subtype == 'PLANET':
-                        row = box.row(align=True)
-                        row.prop(
-                            gear,
-                            "gear_mode",
-                            text="Drive Mode",
-                            expand=True
-                        )
-
-
-            row = box.row(align=True)
-            row.prop(gear, "drive_ratio")
-
-            if gear.drive_ratio == -1.0:
-                err = row.row(align=True)
-                err.alert =True
-                err.emboss = 'NONE'
-                # err.label(text="", icon='ERROR')
-                tip = err.operator("ge.tool_tip", text="", icon='ERROR')
-                tip.tooltip = gear.ratio_err
-
-            box.prop(
-                gear,
-                "flip",
-                invert_checkbox=True
+                row.prop(
+                    gear,
+                    "gear_mode",
+                    text="Drive Mode",
+                    expand=True
+                )
+
+    row = box.row(align=True)
+    # Not a prop: an unembossed field can still be dragged or typed into
+    row.label(text="Drive Ratio: %s" % ratio_text(gear))
+
+    if error or gear.teeth == 0:
+        err = row.row(align=True)
+        err.alert =True
+        err.emboss = 'NONE'
+        tip = err.operator("ge.tool_tip", text="", icon='ERROR')
+        tip.tooltip = error or "This ring has no teeth"
+
+    box.prop(
+        gear,
+        "flip",
+        invert_checkbox=True
+    )
+
+
+class GE_UL_GearRings(bpy.types.UIList):
+    """Gear rings, with filtering by name and type and sorting by teeth"""
+
+    ring_types = [('ALL', "All", "Show every ring")] + gear_types
+
+    filter_type: EnumProperty(
+        items=ring_types,
+        name="Type",
+        default='ALL'
+    )
+
+    sort_by_teeth: BoolProperty(
+        name="Sort by Teeth",
+        default=False
+    )
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        if self.layout_type in {'DEFAULT', 'COMPACT'}:
+            row = layout.row(align=True)
+            row.prop(item, "name", text="", emboss=False)
+            row.label(text=str(item.teeth))
+
+            if ratio_failed(item):
+                row.label(text="", icon='ERROR')
+            else:
+                row.label(text=ratio_text(item))
+        else:
+            layout.alignment = 'CENTER'
+            layout.label(text=str(index))
+
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "use_filter_invert", text="", icon='ARROW_LEFTRIGHT')
+
+        row = layout.row(align=True)
+        row.prop(self, "filter_type", text="")
+        row.prop(self, "use_filter_sort_alpha", text="", icon='SORTALPHA')
+        row.prop(self, "sort_by_teeth", text="", icon='SORTSIZE')
+        row.prop(self, "use_filter_sort_reverse", text="", icon='SORT_DESC')
+
+    def filter_items(self, context, data, propname):
+        rings = getattr(data, propname)
+        helper = bpy.types.UI_UL_list
+
+        flags = []
+        if self.filter_name:
+            flags = helper.filter_items_by_name(
+                self.filter_name,
+                self.bitflag_filter_item,
+                rings,
+                "name"
+            )
+
+        if self.filter_type != 'ALL':
+            if not flags:
+                flags = [self.bitflag_filter_item] * len(rings)
+            for i, ring in enumerate(rings):
+                if ring.gear_type != self.filter_type:
+                    flags[i] &= ~self.bitflag_filter_item
+
+        order = []
+        if self.sort_by_teeth:
+            order = helper.sort_items_helper(
+                [(i, ring.teeth) for i, ring in enumerate(rings)],
+                lambda item: item[1]
             )
+        elif self.use_filter_sort_alpha:
+            order = helper.sort_items_by_name(rings, "name")
+
+        return flags, order
 
 
 class GE_PT_MotorPanel(View3dPanel, bpy.types.Panel):
@@ -200,7 +371,7 @@ class GE_PT_HelpPanel(View3dPanel, bpy.types.Panel):
 
         if section_flags[0]:
             root.label(text="Your standard spur gear.")
-            root.label(text="Parent it to an empty for better axis control.")
+            root.label(text="Tilt it with its Delta Rotation; it spins on its own axis.")
         elif section_flags[1]:
             root.label(text="How To Planetary Gear:")
             root.label(text="If the carrier spins, drive the planets with it.")
@@ -210,4 +381,71 @@ class GE_PT_HelpPanel(View3dPanel, bpy.types.Panel):
             root.label(text="How to Worm Gear:")
             root.label(text="For worms, Tooth Count == Number of Threads.")
 
+        if any(section_flags):
+            root.separator()
+            root.operator("ge.orientation_to_delta", icon='ORIENTATION_GIMBAL')
+
         
+
+
+class GE_PT_FrameCachePanel(View3dPanel, bpy.types.Panel):
+    bl_idname = "GE_PT_FrameCachePanel"
+    bl_label = "Frame Cache"
+    bl_parent_id = "GE_PT_MainPanel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw_header(self, context):
+        self.layout.prop(context.scene.gear_settings, "use_frame_cache", text="")
+
+    def draw(self, context):
+        layout = self.layout
+        settings = context.scene.gear_settings
+
+        root = layout.column(align=True)
+        root.prop(settings, "frame_cache", text="")
+        root.operator("ge.build_frame_cache", icon='FILE_CACHE')
+
+        col = root.column(align=True)
+        col.scale_y = 0.75
+        col.label(text=cache_status(context.scene))
+
+
+class GE_PT_ProfilerPanel(View3dPanel, bpy.types.Panel):
+    bl_idname = "GE_PT_ProfilerPanel"
+    bl_label = "Profiler"
+    bl_parent_id = "GE_PT_HelpPanel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+
+        root = layout.column(align=True)
+        row = root.row(align=True)
+        row.operator(
+            "ge.toggle_profiler",
+            text="Stop" if profiler.enabled else "Record",
+            icon='PAUSE' if profiler.enabled else 'REC',
+            depress=profiler.enabled
+        )
+        row.operator("ge.export_profile", text="", icon='EXPORT')
+
+        if not profiler.frames:
+            root.label(text="Play back to record frames")
+            return
+
+        col = root.column(align=True)
+        col.scale_y = 0.75
+        col.label(text="%d frames, %.2f ms mean" % (len(profiler.frames), profiler.mean_frame() * 1000.0))
+
+        frames = len(profiler.frames)
+        for name, (calls, seconds) in sorted(profiler.sections.items()):
+            col.label(text="%s: %.3f ms/frame" % (name, seconds * 1000.0 / frames))
+
+        col.separator()
+        col.label(text="Slowest gears:")
+        for name, (calls, seconds) in profiler.slowest_gears(3):
+            col.label(text="  %s: %.3f ms" % (name, seconds * 1000.0))
+
+        chains = profiler.deepest_chains(1)
+        if chains:
+            col.label(text="Deepest chain: %s (%d)" % (chains[0][1], chains[0][0]))
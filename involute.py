@@ -0,0 +1,219 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Gear geometry as flat NumPy arrays, ready for foreach_set. Nothing in
+# here touches bpy. Every builder returns a GearGeometry, with faces stored
+# the way Blender stores them: one flat loop -> vertex array, plus a
+# start and a length per polygon.
+#
+# Sizes follow the usual metric conventions: pitch diameter is
+# module * teeth, the addendum is one module and the dedendum 1.25.
+
+import math
+
+import numpy as np
+
+ADDENDUM = 1.0
+DEDENDUM = 1.25
+
+
+class GearGeometry:
+    __slots__ = ("co", "loop_vertex", "loop_start", "loop_total")
+
+    def __init__(self, co, faces):
+        self.co = np.ascontiguousarray(co, dtype=np.float32)
+
+        # faces is a list of (count, loops) blocks, each loops array
+        # shaped (count, sides), so mixed tris and quads stay vectorized
+        totals = []
+        loops = []
+        for block in faces:
+            if len(block) == 0:
+                continue
+            loops.append(block.ravel())
+            totals.append(np.full(len(block), block.shape[1], dtype=np.int32))
+
+        self.loop_vertex = np.concatenate(loops).astype(np.int32)
+        self.loop_total = np.concatenate(totals)
+        self.loop_start = np.zeros(len(self.loop_total), dtype=np.int32)
+        np.cumsum(self.loop_total[:-1], out=self.loop_start[1:])
+
+    @property
+    def vertex_count(self):
+        return len(self.co)
+
+    @property
+    def polygon_count(self):
+        return len(self.loop_total)
+
+
+def involute_outline(teeth, module, pressure_angle, addendum=ADDENDUM, dedendum=DEDENDUM, samples=6):
+    """Polar (radius, angle) outline of an external gear, counter-clockwise.
+
+    Each tooth gets samples points per flank, plus a root point on either
+    side when the root circle sits inside the base circle.
+    """
+    alpha = math.radians(pressure_angle)
+    pitch = module * teeth / 2.0
+    base = pitch * math.cos(alpha)
+    tip = pitch + addendum * module
+    root = max(pitch - dedendum * module, module * 0.25)
+
+    # Involute parameter at the start and end of the flank
+    start = math.sqrt(max((max(root, base) / base) ** 2 - 1.0, 0.0))
+    end = math.sqrt((tip / base) ** 2 - 1.0)
+    t = np.linspace(start, end, samples)
+
+    flank_r = base * np.sqrt(1.0 + t * t)
+    flank_a = t - np.arctan(t)
+
+    # Half a tooth at the pitch circle, plus the involute's roll up to it
+    inv_alpha = math.tan(alpha) - alpha
+    half = math.pi / (2.0 * teeth) + inv_alpha
+
+    radii = np.concatenate([flank_r, flank_r[::-1]])
+    offsets = np.concatenate([flank_a - half, half - flank_a[::-1]])
+
+    if root < base:
+        radii = np.concatenate([[root], radii, [root]])
+        offsets = np.concatenate([[-half], offsets, [half]])
+
+    centers = np.arange(teeth) * (2.0 * math.pi / teeth)
+    angles = centers[:, None] + offsets[None, :]
+    return np.broadcast_to(radii, angles.shape).ravel(), angles.ravel()
+
+
+def ring_faces(count, inner, outer):
+    """Quads bridging two closed loops of equal length"""
+    i = np.arange(count)
+    j = (i + 1) % count
+    return np.stack([inner + i, inner + j, outer + j, outer + i], axis=1)
+
+
+def fan_faces(count, first, center, flip=False):
+    i = np.arange(count)
+    j = (i + 1) % count
+    centers = np.full(count, center)
+    if flip:
+        return np.stack([centers, first + j, first + i], axis=1)
+    return np.stack([centers, first + i, first + j], axis=1)
+
+
+def extrude(radii, angles, width):
+    """Stacks a polar outline at -width/2 and +width/2, as (2 * n, 3)"""
+    count = len(radii)
+    co = np.empty((2 * count, 3), dtype=np.float64)
+    co[:count, 0] = co[count:, 0] = radii * np.cos(angles)
+    co[:count, 1] = co[count:, 1] = radii * np.sin(angles)
+    co[:count, 2] = -width / 2.0
+    co[count:, 2] = width / 2.0
+    return co
+
+
+def spur_gear(teeth, module=0.1, pressure_angle=20.0, width=0.1, samples=6):
+    radii, angles = involute_outline(teeth, module, pressure_angle, samples=samples)
+    count = len(radii)
+
+    co = extrude(radii, angles, width)
+    co = np.vstack([co, [[0.0, 0.0, -width / 2.0], [0.0, 0.0, width / 2.0]]])
+
+    # The outline is star-shaped around the axis, so fans make valid caps
+    faces = [
+        ring_faces(count, 0, count),
+        fan_faces(count, 0, 2 * count, flip=True),
+        fan_faces(count, count, 2 * count + 1),
+    ]
+    return GearGeometry(co, faces)
+
+
+def ring_gear(teeth, module=0.1, pressure_angle=20.0, width=0.1, rim=2.0, samples=6):
+    """Internal gear: the teeth of a ring are the gaps of a spur gear"""
+    radii, angles = involute_outline(
+        teeth, module, pressure_angle,
+        addendum=DEDENDUM, dedendum=ADDENDUM,
+        samples=samples
+    )
+    angles = angles + math.pi / teeth
+    count = len(radii)
+
+    outer = module * teeth / 2.0 + (DEDENDUM + rim) * module
+    outer_r = np.full(count, outer)
+
+    # Inner bottom, inner top, outer bottom, outer top
+    co = np.vstack([extrude(radii, angles, width), extrude(outer_r, angles, width)])
+
+    faces = [
+        ring_faces(count, count, 0),              # teeth, facing in
+        ring_faces(count, 2 * count, 3 * count),  # outside wall
+        ring_faces(count, 0, 2 * count),          # bottom
+        ring_faces(count, 3 * count, count),      # top
+    ]
+    return GearGeometry(co, faces)
+
+
+def worm_gear(threads, module=0.1, pressure_angle=20.0, length=0.4, diameter_quotient=10.0,
+              radial=48, axial=8):
+    """Worm along Z, with threads starts. The thread is a trapezoid in the
+    axial section, swept along a helix."""
+    alpha = math.radians(pressure_angle)
+    pitch = math.pi * module          # Axial pitch
+    lead = pitch * threads
+    pitch_r = diameter_quotient * module / 2.0
+    tip = pitch_r + ADDENDUM * module
+    root = pitch_r - DEDENDUM * module
+
+    rings = max(int(math.ceil(length / pitch * axial)), 2) + 1
+    z = np.linspace(-length / 2.0, length / 2.0, rings)
+    theta = np.arange(radial) * (2.0 * math.pi / radial)
+
+    # Phase along the thread, 0 at a thread center, 0.5 halfway between
+    phase = np.mod((z[:, None] - lead * theta[None, :] / (2.0 * math.pi)) / pitch, 1.0)
+    offset = np.abs(phase - 0.5)
+    r = np.clip(pitch_r + (offset - 0.25) * pitch / math.tan(alpha), root, tip)
+
+    co = np.empty((rings * radial + 2, 3), dtype=np.float64)
+    co[:-2, 0] = (r * np.cos(theta)[None, :]).ravel()
+    co[:-2, 1] = (r * np.sin(theta)[None, :]).ravel()
+    co[:-2, 2] = np.repeat(z, radial)
+    co[-2] = (0.0, 0.0, z[0])
+    co[-1] = (0.0, 0.0, z[-1])
+
+    # One band of quads, repeated up the length
+    band = ring_faces(radial, 0, radial)
+    side = (band[None, :, :] + (np.arange(rings - 1) * radial)[:, None, None]).reshape(-1, 4)
+    faces = [
+        side,
+        fan_faces(radial, 0, rings * radial, flip=True),
+        fan_faces(radial, (rings - 1) * radial, rings * radial + 1),
+    ]
+    return GearGeometry(co, faces)
+
+
+builders = {
+    'SPUR': spur_gear,
+    'RING': ring_gear,
+    'WORM': worm_gear,
+}
+
+
+def build_geometry(kind, teeth, module, pressure_angle, width):
+    if kind == 'WORM':
+        return worm_gear(teeth, module, pressure_angle, length=width)
+    return builders[kind](teeth, module, pressure_angle, width)
@@ -0,0 +1,361 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# The whole mechanism as one linear system over angular velocities.
+#
+# Every object is a rigid body and gets exactly one equation:
+#
+#   motor:          w = its own speed
+#   plain link:     w = k * w_drive
+#   planet:         w - w_carrier = k * (w_drive - w_carrier)
+#   set output:     Zs * (w_sun - w_carrier) + Zr * (w_ring - w_carrier) = 0
+#   anything else:  w = 0
+#
+# where k is the signed ratio the graph already works out for the link.
+# Suns, rings and planets join a planetary set by pointing their carrier
+# property at its carrier. The member whose drive object is another member
+# of the same set is the set's output, and follows the Willis equation
+# instead of a fixed mode; so a set with two driven members is a
+# differential, and one with a member left undriven is the usual
+# single-stage reducer.
+#
+# Most of the system is a tree, where each equation only needs the ones
+# above it. So it's solved in block triangular order: strongly connected
+# blocks of the dependency graph, dependencies first. Tree gears are single
+# blocks and cost one substitution; only closed loops and planetary sets
+# ever reach np.linalg.solve, and only at their own size.
+#
+# The result is each gear's velocity as a sparse combination of motor
+# speeds. Angles are linear in velocities, so the same coefficients turn
+# motor angles into gear angles on any frame.
+
+import numpy as np
+
+from . graph import GearGraph
+
+PLAIN = 0
+PLANET = 1
+WILLIS = 2
+
+# Below this a coefficient is rounding noise
+EPSILON = 1e-12
+
+SET_INCOMPLETE = "Planetary set needs a sun, a ring and a carrier"
+SET_TWO_OUTPUTS = "Planetary set has more than one output"
+LOCKED = "Locked: the gears in this loop can't turn consistently"
+
+
+def planetary_role(rec):
+    """What part rec plays in a planetary set, going by its first
+    planetary ring, or None"""
+    for ring in rec.rings:
+        if ring.gear_type == 'PLANETARY':
+            return ring.planetary_subtype, ring
+    return None, None
+
+
+class PlanetarySet:
+    __slots__ = ("carrier", "sun", "ring", "sun_teeth", "ring_teeth", "output")
+
+    def __init__(self, carrier):
+        self.carrier = carrier
+        self.sun = -1
+        self.ring = -1
+        self.sun_teeth = 0
+        self.ring_teeth = 0
+        self.output = -1
+
+    @property
+    def complete(self):
+        return self.sun != -1 and self.ring != -1 and self.sun_teeth > 0 and self.ring_teeth > 0
+
+    def members(self):
+        return (self.sun, self.ring, self.carrier)
+
+    def willis(self, i):
+        """The Willis equation solved for member i, as {j: coefficient}"""
+        zs = float(self.sun_teeth)
+        zr = float(self.ring_teeth)
+        if i == self.sun:
+            return {self.carrier: 1.0 + zr / zs, self.ring: -zr / zs}
+        if i == self.ring:
+            return {self.carrier: 1.0 + zs / zr, self.sun: -zs / zr}
+        return {self.sun: zs / (zs + zr), self.ring: zr / (zs + zr)}
+
+
+class Mechanism:
+    """Gear velocities as sparse combinations of motor speeds.
+
+    Row i of the compiled table is indptr[i]:indptr[i + 1] into cols
+    (motor slots, into motors) and values.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        count = len(graph)
+
+        self.motors = [i for i, rec in enumerate(graph.records) if rec.driver_type == 'MOTOR']
+        self.motor_slot = {i: slot for slot, i in enumerate(self.motors)}
+
+        self.kind = [PLAIN] * count
+        self.terms = [{} for i in range(count)]   # w_i = sum(terms[i][j] * w_j) ...
+        self.inputs = [{} for i in range(count)]  # ... + sum(inputs[i][slot] * u_slot)
+        self.errors = {}
+        self.sets = {}
+
+        self._gather_sets()
+        self._equations()
+        self._solve()
+
+    @classmethod
+    def from_scene(cls, scene):
+        return cls(GearGraph.from_scene(scene))
+
+    def __len__(self):
+        return len(self.graph)
+
+    def _gather_sets(self):
+        graph = self.graph
+        for i, rec in enumerate(graph.records):
+            role, ring = planetary_role(rec)
+            if role == 'CARRIER':
+                self.sets.setdefault(i, PlanetarySet(i))
+                continue
+
+            carrier = graph.index.get(rec.carrier) if rec.carrier else None
+            if carrier is None or carrier == i:
+                continue
+            group = self.sets.setdefault(carrier, PlanetarySet(carrier))
+
+            if role == 'SUN' and group.sun == -1:
+                group.sun, group.sun_teeth = i, ring.teeth
+            elif role == 'RING' and group.ring == -1:
+                group.ring, group.ring_teeth = i, ring.teeth
+
+    def set_of(self, i):
+        """The planetary set i belongs to, if any"""
+        group = self.sets.get(i)
+        if group is not None:
+            return group
+        carrier = self.graph.records[i].carrier
+        if carrier:
+            return self.sets.get(self.graph.index.get(carrier))
+        return None
+
+    def _equations(self):
+        graph = self.graph
+
+        for i, rec in enumerate(graph.records):
+            if rec.driver_type == 'MOTOR':
+                self.inputs[i] = {self.motor_slot[i]: 1.0}
+                continue
+
+            parent = graph.parent[i]
+            ratio = graph.ratio[i]
+            if parent == -1 or ratio == 0.0:
+                # Broken links stall, same as the graph
+                continue
+
+            group = self.set_of(i)
+            role, ring = planetary_role(rec)
+
+            if group is not None and role == 'PLANET':
+                self.kind[i] = PLANET
+                if parent == group.carrier:
+                    self.terms[i] = {parent: 1.0}
+                else:
+                    self.terms[i] = {parent: ratio, group.carrier: 1.0 - ratio}
+                continue
+
+            if group is not None and i in group.members() and parent in group.members():
+                self.kind[i] = WILLIS
+                if not group.complete:
+                    self.errors[i] = SET_INCOMPLETE
+                    continue
+                if group.output != -1:
+                    self.errors[i] = SET_TWO_OUTPUTS
+                    continue
+                group.output = i
+                self.terms[i] = group.willis(i)
+                continue
+
+            self.terms[i] = {parent: ratio}
+
+    def blocks(self):
+        """Strongly connected blocks of the dependency graph, each one
+        after every block it depends on (Tarjan's, without recursion)"""
+        count = len(self.graph)
+        index = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        blocks = []
+        counter = 0
+
+        for start in range(count):
+            if index[start] != -1:
+                continue
+
+            work = [(start, iter(self.terms[start]))]
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack[start] = True
+
+            while work:
+                i, edges = work[-1]
+                pushed = False
+                for j in edges:
+                    if index[j] == -1:
+                        index[j] = low[j] = counter
+                        counter += 1
+                        stack.append(j)
+                        on_stack[j] = True
+                        work.append((j, iter(self.terms[j])))
+                        pushed = True
+                        break
+                    if on_stack[j]:
+                        low[i] = min(low[i], index[j])
+                if pushed:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[i])
+
+                if low[i] == index[i]:
+                    block = []
+                    while True:
+                        j = stack.pop()
+                        on_stack[j] = False
+                        block.append(j)
+                        if j == i:
+                            break
+                    blocks.append(block)
+
+        return blocks
+
+    def _solve(self):
+        count = len(self.graph)
+        rows = [None] * count
+        self.coupled = set()
+
+        for block in self.blocks():
+            if len(block) == 1 and block[0] not in self.terms[block[0]]:
+                i = block[0]
+                row = dict(self.inputs[i])
+                for j, a in self.terms[i].items():
+                    for slot, c in rows[j].items():
+                        row[slot] = row.get(slot, 0.0) + a * c
+                rows[i] = row
+                continue
+
+            for i, row in zip(block, self.solve_block(block, rows)):
+                rows[i] = row
+
+        self.rows = [{slot: c for slot, c in row.items() if abs(c) > EPSILON} for row in rows]
+        self.coupled.update(i for i, kind in enumerate(self.kind) if kind != PLAIN)
+
+        # Compiled table
+        self.indptr = np.zeros(count + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(row) for row in self.rows])
+        self.cols = np.array([slot for row in self.rows for slot in row], dtype=np.int64)
+        self.values = np.array([c for row in self.rows for c in row.values()], dtype=np.float64)
+
+    def solve_block(self, block, rows):
+        """(I - A) w = B u for one closed loop, with everything outside it
+        already solved"""
+        self.coupled.update(block)
+        position = {i: k for k, i in enumerate(block)}
+        size = len(block)
+
+        outside = {}
+        matrix = np.eye(size)
+        for k, i in enumerate(block):
+            for j, a in self.terms[i].items():
+                if j in position:
+                    matrix[k, position[j]] -= a
+                else:
+                    for slot, c in rows[j].items():
+                        outside.setdefault(slot, np.zeros(size))[k] += a * c
+            for slot, c in self.inputs[i].items():
+                outside.setdefault(slot, np.zeros(size))[k] += c
+
+        slots = sorted(outside)
+        rhs = np.column_stack([outside[slot] for slot in slots]) if slots else np.zeros((size, 0))
+
+        try:
+            # A loop that's close to singular is locked up just the same
+            if np.linalg.cond(matrix) > 1e12:
+                raise np.linalg.LinAlgError
+            solution = np.linalg.solve(matrix, rhs)
+        except np.linalg.LinAlgError:
+            for i in block:
+                self.errors[i] = LOCKED
+            return [{} for i in block]
+
+        return [dict(zip(slots, solution[k].tolist())) for k in range(size)]
+
+    def moving(self):
+        """Indices of gears that turn with some motor, roots first"""
+        seen = set(self.graph.order)
+        order = list(self.graph.order) + [i for i in range(len(self.graph)) if i not in seen]
+        return np.asarray([i for i in order if self.rows[i]], dtype=np.int64)
+
+    def table(self, indices):
+        """The compiled rows for indices, flattened for combine()"""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.indptr[indices]
+        lengths = self.indptr[indices + 1] - starts
+
+        row_ids = np.repeat(np.arange(len(indices)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        flat = np.repeat(starts, lengths) + offsets
+        return MotorMix(len(indices), row_ids, self.cols[flat], self.values[flat])
+
+    def angle(self, i, frame):
+        graph = self.graph
+        return sum(c * graph.root_angle(self.motors[slot], frame) for slot, c in self.rows[i].items())
+
+    def angles(self, frame):
+        return [self.angle(i, frame) for i in range(len(self.graph))]
+
+
+class MotorMix:
+    """Some gears' rows of a Mechanism, ready to apply to motor angles"""
+    __slots__ = ("count", "row_ids", "cols", "values")
+
+    def __init__(self, count, row_ids, cols, values):
+        self.count = count
+        self.row_ids = row_ids
+        self.cols = cols
+        self.values = values
+
+    def combine(self, motors):
+        """Gear angles from motor angles; motors is one per motor slot, or
+        shaped (motor slots, frames) for a table of frames"""
+        motors = np.asarray(motors, dtype=np.float64)
+        if motors.ndim == 1:
+            return np.bincount(self.row_ids, weights=self.values * motors[self.cols], minlength=self.count)
+
+        out = np.zeros((self.count, motors.shape[1]), dtype=np.float64)
+        np.add.at(out, self.row_ids, self.values[:, None] * motors[self.cols])
+        return out
@@ -0,0 +1,136 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Generated gear meshes, one datablock per distinct gear. Every object
+# with the same teeth, module, pressure angle, width and type links the
+# same mesh, so a thousand identical spur gears cost one mesh.
+
+import math
+
+import bpy
+
+from . involute import build_geometry
+
+# Stored on every generated mesh, so the cache can find them again
+# after a reload
+MESH_KEY = "ge_mesh_key"
+
+mesh_cache = {}
+
+
+def mesh_key(kind, teeth, module, pressure_angle, width):
+    # Rounded, so floats that came through a UI field still match
+    return (kind, int(teeth), round(module, 6), round(pressure_angle, 4), round(width, 6))
+
+
+def key_string(key):
+    return "%s:%d:%g:%g:%g" % key
+
+
+def parse_key(text):
+    kind, teeth, module, pressure_angle, width = text.split(":")
+    return (kind, int(teeth), float(module), float(pressure_angle), float(width))
+
+
+def mesh_name(key):
+    return "GE_%s_%d_m%g_pa%g_w%g" % key
+
+
+def write_geometry(mesh, geom):
+    """Fills an empty mesh from a GearGeometry with one foreach_set per array"""
+    mesh.vertices.add(geom.vertex_count)
+    mesh.vertices.foreach_set("co", geom.co.ravel())
+
+    mesh.loops.add(len(geom.loop_vertex))
+    mesh.loops.foreach_set("vertex_index", geom.loop_vertex)
+
+    mesh.polygons.add(geom.polygon_count)
+    mesh.polygons.foreach_set("loop_start", geom.loop_start)
+    # 4.0 works out polygon sizes from the starts, and made this read-only
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set("loop_total", geom.loop_total)
+
+    mesh.update(calc_edges=True)
+
+
+def find_mesh(key):
+    text = key_string(key)
+
+    mesh = mesh_cache.get(key)
+    if mesh is not None:
+        try:
+            if mesh.get(MESH_KEY) == text:
+                return mesh
+        except ReferenceError:
+            pass
+
+    # Usually right first time; a full scan only happens on a miss
+    mesh = bpy.data.meshes.get(mesh_name(key))
+    if mesh is not None and mesh.get(MESH_KEY) == text:
+        return mesh
+
+    for mesh in bpy.data.meshes:
+        if mesh.get(MESH_KEY) == text:
+            return mesh
+
+    return None
+
+
+def get_gear_mesh(kind, teeth, module=0.1, pressure_angle=20.0, width=0.1):
+    """Returns the shared mesh for this gear, building it on first use"""
+    key = mesh_key(kind, teeth, module, pressure_angle, width)
+
+    mesh = find_mesh(key)
+    if mesh is None:
+        mesh = bpy.data.meshes.new(mesh_name(key))
+        write_geometry(mesh, build_geometry(*key))
+        mesh[MESH_KEY] = key_string(key)
+
+        # Same properties the Extra Objects gears carry, so
+        # ge.add_gear_to_set picks the tooth count up
+        mesh["Gear"] = 1
+        mesh["number_of_teeth"] = int(teeth)
+
+    mesh_cache[key] = mesh
+    return mesh
+
+
+def clear_mesh_cache():
+    mesh_cache.clear()
+
+
+def planet_layout(sun_teeth, planet_teeth, count):
+    """Angles and spin offsets that put count planets in mesh with both
+    the sun and the ring.
+
+    Planets can only be spaced evenly when (sun + ring) teeth divide by
+    count; otherwise each one snaps to the nearest angle that meshes.
+    """
+    ring_teeth = sun_teeth + 2 * planet_teeth
+    step = 2.0 * math.pi / (sun_teeth + ring_teeth)
+
+    layout = []
+    for k in range(count):
+        angle = step * round(k * (sun_teeth + ring_teeth) / count)
+        spin = angle * (1.0 + sun_teeth / planet_teeth) + math.pi - math.pi / planet_teeth
+        layout.append((angle, spin))
+
+    ring_spin = math.pi * (planet_teeth - 2) / ring_teeth
+    return layout, ring_spin
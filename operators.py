@@ -21,17 +21,30 @@
 import bpy
 import math
 import bpy_extras
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+from mathutils import Euler, Quaternion
 from bpy.props import (
     BoolProperty, IntProperty,
+    StringProperty,
+    FloatProperty,
     FloatVectorProperty,
     EnumProperty
 )
 
-axis_map = {
-    "X": 0,
-    "Y": 1,
-    "Z": 2
-}
+from . properties import refresh_fps, rings_changed, dirty_objects, suspend_updates
+from . drivers import plan_motor, apply_plan
+from . sync import sync_objects
+from . bake import bake_scene
+from . farm import farm_frame_cache
+from . framecache import get_frame_cache
+from . meshes import get_gear_mesh, planet_layout
+from . dedup import dedup_meshes
+from . automesh import auto_mesh
+from . trainio import save_train, load_train
+from . rotations import rotation_kind, EULER, QUATERNION
+from . profiler import profiler
+from . handlers import start_profiling, stop_profiling
+
 
 class GE_OT_AddGearToSet(bpy.types.Operator):
     """Adds a ring of teeth to the selected gear"""
@@ -45,9 +58,12 @@ class GE_OT_AddGearToSet(bpy.types.Operator):
         new_gear = obj.gear_data.gears[-1]
         new_gear.parent_obj = obj
 
-        if 'Gear' in obj.data.keys():
+        if obj.data is not None and 'Gear' in obj.data.keys():
             new_gear.teeth = obj.data["number_of_teeth"]
 
+        obj.gear_data.active_ring = len(obj.gear_data.gears) - 1
+        rings_changed(obj, context.scene)
+
         return {'FINISHED'}
 
 
@@ -68,7 +84,13 @@ class GE_OT_RemoveGear(bpy.types.Operator):
             return{'CANCELLED'}
 
         obj = context.active_object
-        obj.gear_data.gears.remove(self.index)
+        data = obj.gear_data
+        data.gears.remove(self.index)
+
+        if data.active_ring >= len(data.gears):
+            data.active_ring = max(len(data.gears) - 1, 0)
+
+        rings_changed(obj, context.scene)
         return {'FINISHED'}
 
 
@@ -94,54 +116,72 @@ class GE_OT_AddMotor(bpy.types.Operator):
             return {'CANCELLED'}
 
         obj = context.active_object
-        do_destructive = True
-        driver = None
-
-        if obj.animation_data:
-            if len(obj.animation_data.drivers) > 0:
-                target = ("rotation_euler['%s']" % axis_map[self.axis])
-                do = False
-                prune = []
-
-                for d in obj.animation_data.drivers:
-                    if d.data_path == target:
-                        driver = d
-                    elif do_destructive:
-                        if 'rotation_euler' in d.data_path:
-                            prune.append(d)
-                        
-                for d in prune:
-                    obj.animation_data.drivers.remove(d)
-
-        if not driver:
-            fcurve = obj.driver_add('rotation_euler', axis_map[self.axis])
-            driver = fcurve.driver
-
-        var = driver.variables.new()
-        var.name = 'FPS'
-        var.targets[0].id_type = 'OBJECT'
-        var.targets[0].id = obj
-        var.targets[0].data_path = 'gear_data.fps'
-
-        var = driver.variables.new()
-        var.name = 'speed'
-        var.targets[0].id_type = 'OBJECT'
-        var.targets[0].id = obj
-        var.targets[0].data_path = 'gear_data.motor.speed'
-
-        driver.expression = '(frame/FPS) * speed'
-
-        obj.gear_data.motor.enabled = True
-        if len(obj.gear_data.gears) < 1:
-            bpy.ops.ge.add_gear_to_set()
+        obj.gear_data.baked_fps = context.scene.render.fps
+        # Stored, so every later re-plan keeps it
+        obj.gear_data.motor.axis = self.axis
+        apply_plan(plan_motor(obj))
+
+        return {'FINISHED'}
+
+
+class GE_OT_OrientationToDelta(bpy.types.Operator):
+    """Moves the selected gears' rotation into their delta rotation, so the
+    gear keeps facing the same way but spins about its own axis.
+    Replaces parenting gears to empties just to tilt them"""
+    bl_idname = "ge.orientation_to_delta"
+    bl_label = "Orientation to Delta"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        moved = 0
+        skipped = 0
+
+        for obj in context.selected_objects:
+            if not hasattr(obj, "gear_data") or len(obj.gear_data.gears) == 0:
+                continue
+
+            kind = rotation_kind(obj.rotation_mode)
+            if kind == EULER:
+                delta = Euler(obj.delta_rotation_euler, obj.rotation_mode).to_matrix()
+                rot = Euler(obj.rotation_euler, obj.rotation_mode).to_matrix()
+                obj.delta_rotation_euler = (delta @ rot).to_euler(obj.rotation_mode)
+                obj.rotation_euler = (0.0, 0.0, 0.0)
+            elif kind == QUATERNION:
+                obj.delta_rotation_quaternion = obj.delta_rotation_quaternion @ obj.rotation_quaternion
+                obj.rotation_quaternion = Quaternion()
+            else:
+                # There's no delta axis-angle in the API; the axis itself
+                # is as good as an orientation there
+                skipped += 1
+                continue
+
+            moved += 1
 
+        if skipped:
+            self.report({'WARNING'}, "Moved %d gears, skipped %d in axis-angle mode" % (moved, skipped))
+        else:
+            self.report({'INFO'}, "Moved %d gears" % moved)
         return {'FINISHED'}
 
 
+def report_sync(op, result):
+    for obj, err in result.skipped:
+        print("%s: %s" % (obj.name, err))
+
+    if result.skipped:
+        op.report(
+            {'WARNING'},
+            "Skipped %d of %d gears, see the console" % (len(result.skipped), result.total)
+        )
+    else:
+        op.report({'INFO'}, "Updated %d of %d gears" % (result.changed, result.total))
+
+
 class GE_OT_InitDrivers(bpy.types.Operator):
     """Does the initial Driver Wrangling"""
     bl_idname = "ge.init_drivers"
     bl_label = "Initialize Gear Drivers"
+    bl_options = {'REGISTER', 'UNDO'}
 
     do_all: BoolProperty(
         name="Initialize All",
@@ -150,128 +190,513 @@ class GE_OT_InitDrivers(bpy.types.Operator):
     )
 
     def execute(self, context):
-        for obj in context.selected_editable_objects:
-            if not hasattr(obj, "gear_data"):
-                continue
-
-            if len(obj.gear_data.gears) == 0:
-                continue
+        if self.do_all:
+            objects = [obj for obj in context.scene.objects if not obj.library]
+        else:
+            objects = context.selected_editable_objects
 
-            main_gear = obj.gear_data.gears[obj.gear_data.driven_gear]
-            do_destructive = True
-
-            if obj.rotation_mode in {'QUATERNION', 'AXIS_ANGLE'}:
-                print("%s mode not handled yet" % obj.rotation_mode)
-                return {'CANCELLED'}
-
-            if obj.gear_data.driver_type == 'MOTOR':
-                bpy.ops.ge.add_motor()
-            else:
-                driver = None
-
-                # Since drivers are per-axis, if we're changing what axis it rotates around
-                # we need to look for other drivers to remove before adding a new one
-                # WARNING: This is a fairly destructive process
-                if obj.animation_data:
-                    if len(obj.animation_data.drivers) > 0:
-                        target = ("rotation_euler['%s']" % axis_map[main_gear.axis])
-                        do = False
-                        prune = []
-
-                        for d in obj.animation_data.drivers:
-                            if d.data_path == target:
-                                driver = d
-                            elif do_destructive:
-                                if 'rotation_euler' in d.data_path:
-                                    prune.append(d)
-                                
-                        for d in prune:
-                            obj.animation_data.drivers.remove(d)
-
-                if not driver:
-                    fcurve = obj.driver_add('rotation_euler', axis_map[main_gear.axis])
-                    driver = fcurve.driver
-
-                if 'ratio' in driver.variables:
-                    var = driver.variables.get('ratio')
-                else:
-                    var = driver.variables.new()
-                var.name = 'ratio'
-                var.targets[0].id_type = 'OBJECT'
-                var.targets[0].id = obj
-                var.targets[0].data_path = 'gear_data.gears[0].drive_ratio'
-
-                if 'flip' in driver.variables:
-                    var = driver.variables.get('flip')
-                else:
-                    var = driver.variables.new()
-                var.name = 'flip'
-                var.targets[0].id_type = 'OBJECT'
-                var.targets[0].id = obj
-                var.targets[0].data_path = 'gear_data.gears[0].flip'
-
-                if 'angle' in driver.variables:
-                    var = driver.variables.get('angle')
-                else:
-                    var = driver.variables.new()
-                var.name = 'angle'
-                var.targets[0].id_type = 'OBJECT'
-                var.targets[0].id = obj.gear_data.drive_object
-                var.targets[0].data_path = 'rotation_euler[2]'
-
-                driver.expression = '((flip * 2) - 1) * (ratio * angle)'
+        # Work out every driver and constraint first, then only write
+        # the ones that don't already match
+        refresh_fps(context.scene)
+        result = sync_objects(objects, context.scene)
+        report_sync(self, result)
 
         return {'FINISHED'}
 
 
 # TODO: Add drivers to the constraint properties, so it all updates live.
 class GE_OT_InitConstraint(bpy.types.Operator):
-    """Does the initial Driver Wrangling"""
+    """Drives the selected gears with Transformation constraints"""
     bl_idname = "ge.init_constraint"
     bl_label = "Initialize Gear Constraint"
+    bl_options = {'REGISTER', 'UNDO'}
 
     do_all: BoolProperty(
         name="Initialize All",
-        description="Only initiializes drivers for the selected objects when false",
+        description="Only initiializes constraints for the selected objects when false",
         default=False
     )
 
     def execute(self, context):
-        for obj in context.selected_editable_objects:
-            if not hasattr(obj, "gear_data"):
+        if self.do_all:
+            objects = [obj for obj in context.scene.objects if not obj.library]
+        else:
+            objects = context.selected_editable_objects
+
+        result = sync_objects(objects, context.scene, constraints_only=True)
+        report_sync(self, result)
+
+        # Record the choice, so later syncs keep the constraint rather
+        # than putting a driver back
+        skipped = {obj.as_pointer() for obj, err in result.skipped}
+        for obj in objects:
+            data = obj.gear_data
+            if not len(data.gears) or data.driver_type == 'MOTOR' or obj.as_pointer() in skipped:
                 continue
+            if data.drive_mode != 'CONSTRAINT':
+                data.drive_mode = 'CONSTRAINT'
 
-            if len(obj.gear_data.gears) == 0:
-                continue
+        return {'FINISHED'}
 
-            main_gear = obj.gear_data.gears[obj.gear_data.driven_gear]
-            drive_obj = obj.gear_data.drive_object
-            drive_gear = drive_obj.gear_data.gears[obj.gear_data.drive_gear]
 
-            constraint = obj.constraints.new('TRANSFORM')
+def add_gear_object(context, name, mesh, teeth, gear_type, subtype=None):
+    obj = bpy.data.objects.new(name, mesh)
+    context.collection.objects.link(obj)
+    obj.location = context.scene.cursor.location.copy()
 
-            constraint.target = obj.gear_data.drive_object
-            constraint.use_motion_extrapolate = True
+    # One refresh for the whole ring, not one per property
+    with suspend_updates():
+        ring = obj.gear_data.gears.add()
+        ring.name = name
+        ring.parent_obj = obj
+        ring.teeth = teeth
+        ring.gear_type = gear_type
+        if subtype:
+            ring.planetary_subtype = subtype
 
-            constraint.map_from ='ROTATION'
+    rings_changed(obj, context.scene)
+    return obj
 
-            if drive_gear.axis == 'X':
-                constraint.from_max_x_rot = math.radians(360)
-            elif drive_gear.axis == 'Y':
-                constraint.from_max_y_rot = math.radians(360)
-            else:
-                constraint.from_max_z_rot = math.radians(360)
 
-            constraint.map_to = 'ROTATION'
+class GE_OT_AddGearMesh(bpy.types.Operator):
+    """Adds a generated involute gear, sharing its mesh with every identical gear"""
+    bl_idname = "ge.add_gear_mesh"
+    bl_label = "Add Gear"
+    bl_options = {'REGISTER', 'UNDO'}
 
-            if main_gear.axis == 'X':
-                constraint.to_max_x_rot = -math.radians(360) * main_gear.drive_ratio
-            elif main_gear.axis == 'Y':
-                constraint.to_max_y_rot = -math.radians(360) * main_gear.drive_ratio
-            else:
-                constraint.to_max_z_rot = -math.radians(360) * main_gear.drive_ratio
+    gear_type: EnumProperty(
+        items=[
+            ('SPUR', "Spur", "An external spur gear"),
+            ('RING', "Ring", "An internal gear"),
+            ('WORM', "Worm", "A worm; teeth sets the number of threads"),
+            ('PLANETARY', "Planetary", "Sun, planets and ring, already in mesh")],
+        name="Type",
+        default='SPUR'
+    )
+
+    teeth: IntProperty(
+        name="Teeth",
+        description="Tooth count, or thread count for worms, or the sun's teeth for planetaries",
+        default=24,
+        min=1
+    )
+
+    module: FloatProperty(
+        name="Module",
+        description="Pitch diameter divided by the number of teeth",
+        default=0.1,
+        min=0.001,
+        subtype='DISTANCE'
+    )
+
+    pressure_angle: FloatProperty(
+        name="Pressure Angle",
+        description="In degrees",
+        default=20.0,
+        min=5.0,
+        max=35.0
+    )
+
+    width: FloatProperty(
+        name="Width",
+        description="Face width, or length for worms",
+        default=0.1,
+        min=0.001,
+        subtype='DISTANCE'
+    )
+
+    planet_teeth: IntProperty(
+        name="Planet Teeth",
+        default=12,
+        min=4
+    )
 
+    planets: IntProperty(
+        name="Planets",
+        default=3,
+        min=1,
+        max=12
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+
+        layout.prop(self, "gear_type")
+        layout.prop(self, "teeth", text="Threads" if self.gear_type == 'WORM' else "Teeth")
+        layout.prop(self, "module")
+        layout.prop(self, "pressure_angle")
+        layout.prop(self, "width")
+
+        if self.gear_type == 'PLANETARY':
+            layout.prop(self, "planet_teeth")
+            layout.prop(self, "planets")
+
+    def execute(self, context):
+        if self.gear_type != 'WORM' and self.teeth < 4:
+            self.report({'ERROR'}, "Gears need at least 4 teeth")
+            return {'CANCELLED'}
+
+        args = (self.module, self.pressure_angle, self.width)
+
+        for obj in context.selected_objects:
+            obj.select_set(False)
+
+        if self.gear_type == 'PLANETARY':
+            objects = self.add_planetary(context, args)
+        elif self.gear_type == 'RING':
+            mesh = get_gear_mesh('RING', self.teeth, *args)
+            objects = [add_gear_object(context, "Ring", mesh, self.teeth, 'SPUR')]
+        else:
+            mesh = get_gear_mesh(self.gear_type, self.teeth, *args)
+            objects = [add_gear_object(context, self.gear_type.title(), mesh, self.teeth, self.gear_type)]
+
+        for obj in objects:
+            obj.select_set(True)
+        context.view_layer.objects.active = objects[0]
+
+        return {'FINISHED'}
+
+    def add_planetary(self, context, args):
+        sun_teeth = self.teeth
+        ring_teeth = sun_teeth + 2 * self.planet_teeth
+
+        sun = add_gear_object(context, "Sun", get_gear_mesh('SPUR', sun_teeth, *args), sun_teeth, 'PLANETARY', 'SUN')
+        ring = add_gear_object(context, "Ring", get_gear_mesh('RING', ring_teeth, *args), ring_teeth, 'PLANETARY', 'RING')
+
+        layout, ring_spin = planet_layout(sun_teeth, self.planet_teeth, self.planets)
+        ring.rotation_euler[2] = ring_spin
+
+        # Every planet links the same mesh
+        planet_mesh = get_gear_mesh('SPUR', self.planet_teeth, *args)
+        distance = self.module * (sun_teeth + self.planet_teeth) / 2.0
+
+        planets = []
+        for angle, spin in layout:
+            planet = add_gear_object(context, "Planet", planet_mesh, self.planet_teeth, 'PLANETARY', 'PLANET')
+            planet.location.x += distance * math.cos(angle)
+            planet.location.y += distance * math.sin(angle)
+            planet.rotation_euler[2] = spin
+            planets.append(planet)
+
+        return [sun, ring] + planets
+
+
+class GE_OT_DedupMeshes(bpy.types.Operator):
+    """Relinks gears with identical meshes to one shared mesh"""
+    bl_idname = "ge.dedup_meshes"
+    bl_label = "Share Identical Gear Meshes"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    do_all: BoolProperty(
+        name="Whole Scene",
+        description="Only looks at the selected objects when false",
+        default=True
+    )
+
+    remove_orphans: BoolProperty(
+        name="Remove Unused Meshes",
+        description="Delete the duplicates right away instead of on the next save",
+        default=True
+    )
+
+    def execute(self, context):
+        if self.do_all:
+            objects = context.scene.objects
+        else:
+            objects = context.selected_objects
+
+        result = dedup_meshes(objects, self.remove_orphans)
+
+        self.report(
+            {'INFO'},
+            "Relinked %d gears to %d shared meshes, saving about %.1f MB" % (
+                result.relinked, result.groups, result.bytes_saved / (1024.0 * 1024.0)
+            )
+        )
+        return {'FINISHED'}
+
+
+class GE_OT_BakeGears(bpy.types.Operator):
+    """Bakes every motor-driven gear in the scene to keyframes and removes its drivers"""
+    bl_idname = "ge.bake_gears"
+    bl_label = "Bake Gears to Keyframes"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frame_start: IntProperty(
+        name="Start Frame",
+        default=1
+    )
+
+    frame_end: IntProperty(
+        name="End Frame",
+        default=250
+    )
+
+    frame_step: IntProperty(
+        name="Frame Step",
+        default=1,
+        min=1
+    )
+
+    only_dirty: BoolProperty(
+        name="Only Changed Gears",
+        description="Only re-bake gears whose ratios changed since the last bake",
+        default=False
+    )
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.frame_end < self.frame_start:
+            self.report({'ERROR'}, "End frame is before the start frame")
+            return {'CANCELLED'}
+
+        # Removed objects can still sit in dirty_objects, so this goes
+        # by pointer rather than touching them
+        scene_objects = {obj.as_pointer(): obj for obj in context.scene.objects}
+
+        only = None
+        if self.only_dirty:
+            only = {scene_objects[key].name for key in dirty_objects if key in scene_objects}
+
+        count = bake_scene(
+            context.scene,
+            self.frame_start,
+            self.frame_end,
+            self.frame_step,
+            only
+        )
+
+        for key in scene_objects:
+            dirty_objects.pop(key, None)
+
+        self.report({'INFO'}, "Baked %d gears" % count)
+        return {'FINISHED'}
+
+
+class GE_OT_BuildFrameCache(bpy.types.Operator):
+    """Writes every gear's angle on every frame to disk, so scrubbing only has to look them up"""
+    bl_idname = "ge.build_frame_cache"
+    bl_label = "Build Frame Cache"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frame_start: IntProperty(
+        name="Start Frame",
+        default=1
+    )
+
+    frame_end: IntProperty(
+        name="End Frame",
+        default=250
+    )
+
+    frame_step: IntProperty(
+        name="Frame Step",
+        default=1,
+        min=1
+    )
+
+    use_handler: BoolProperty(
+        name="Switch to Handler",
+        description="Put driven gears in handler mode, so they read the cache instead of running drivers",
+        default=True
+    )
+
+    def invoke(self, context, event):
+        self.frame_start = context.scene.frame_start
+        self.frame_end = context.scene.frame_end
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.frame_end < self.frame_start:
+            self.report({'ERROR'}, "End frame is before the start frame")
+            return {'CANCELLED'}
+
+        scene = context.scene
+        settings = scene.gear_settings
+
+        if self.use_handler:
+            objects = [
+                obj for obj in scene.objects
+                if not obj.library
+                and obj.gear_data.driver_type != 'MOTOR'
+                and obj.gear_data.drive_object
+            ]
+            for obj in objects:
+                if obj.gear_data.drive_mode != 'HANDLER':
+                    obj.gear_data.drive_mode = 'HANDLER'
+            refresh_fps(scene)
+            sync_objects(objects, scene)
+
+        try:
+            manifest = farm_frame_cache(
+                scene,
+                settings.frame_cache,
+                self.frame_start,
+                self.frame_end,
+                self.frame_step,
+                workers=1
+            )
+        except OSError as e:
+            self.report({'ERROR'}, "Couldn't write the frame cache: %s" % e)
+            return {'CANCELLED'}
+
+        settings.use_frame_cache = True
+        if get_frame_cache(scene) is None:
+            self.report({'ERROR'}, "The frame cache was written but couldn't be read back")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "Cached %d gears over %d frames" % (len(manifest["gears"]), manifest["frames"]))
+        return {'FINISHED'}
+
+
+class GE_OT_AutoMesh(bpy.types.Operator):
+    """Finds gears whose pitch circles touch and sets up their drive links"""
+    bl_idname = "ge.auto_mesh"
+    bl_label = "Auto-Mesh Gears"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    selected_only: BoolProperty(
+        name="Selected Only",
+        description="Only look at selected gears",
+        default=False
+    )
+
+    tolerance: FloatProperty(
+        name="Tolerance",
+        description="How far off the pitch circles can be and still count as meshing, in modules",
+        default=0.25,
+        min=0.0,
+        soft_max=2.0
+    )
+
+    keep_existing: BoolProperty(
+        name="Keep Existing Links",
+        description="Leave gears that already have a drive object alone",
+        default=True
+    )
+
+    default_module: FloatProperty(
+        name="Fallback Module",
+        description="Module for gears without a mesh to measure",
+        default=0.1,
+        min=0.001
+    )
+
+    def execute(self, context):
+        objects = context.selected_objects if self.selected_only else context.scene.objects
+        result = auto_mesh(objects, self.tolerance, self.keep_existing, self.default_module)
+
+        if result.unpowered:
+            self.report(
+                {'WARNING'},
+                "Linked %d gears from %d contacts; %d trains have no motor" % (
+                    result.wired, result.contacts, result.unpowered))
+        else:
+            self.report({'INFO'}, "Linked %d gears from %d contacts" % (result.wired, result.contacts))
+        return {'FINISHED'}
+
+
+class GE_OT_ToggleProfiler(bpy.types.Operator):
+    """Starts or stops recording where GearEngine spends its time on each frame"""
+    bl_idname = "ge.toggle_profiler"
+    bl_label = "Toggle Gear Profiler"
+
+    def execute(self, context):
+        if profiler.enabled:
+            stop_profiling()
+            self.report({'INFO'}, "Recorded %d frames" % len(profiler.frames))
+        else:
+            start_profiling(context.scene)
+        return {'FINISHED'}
+
+
+class GE_OT_ExportProfile(bpy.types.Operator, ExportHelper):
+    """Writes the gear profiler's report to a CSV or JSON file"""
+    bl_idname = "ge.export_profile"
+    bl_label = "Export Gear Profile"
+
+    filename_ext = ".json"
+
+    format: EnumProperty(
+        items=[
+            ('JSON', "JSON", "Everything, including per-frame timings"),
+            ('CSV', "CSV", "One flat table")],
+        name="Format",
+        default='JSON'
+    )
+
+    def check(self, context):
+        self.filename_ext = "." + self.format.lower()
+        return super().check(context)
+
+    def execute(self, context):
+        if self.format == 'CSV':
+            profiler.write_csv(self.filepath)
+        else:
+            profiler.write_json(self.filepath)
+
+        self.report({'INFO'}, "Wrote %s" % self.filepath)
+        return {'FINISHED'}
+
+
+class GE_OT_ExportTrain(bpy.types.Operator, ExportHelper):
+    """Writes gear rings, drive links and transforms to a JSON or NumPy file"""
+    bl_idname = "ge.export_train"
+    bl_label = "Export Gear Train"
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json;*.npz", options={'HIDDEN'})
+
+    format: EnumProperty(
+        items=[
+            ('JSON', "JSON", "Plain text, easy to generate from other tools"),
+            ('NPZ', "NumPy", "Compressed binary columns, much smaller for big trains")],
+        name="Format",
+        default='JSON'
+    )
+
+    selected_only: BoolProperty(
+        name="Selected Only",
+        description="Only export selected gears",
+        default=False
+    )
+
+    def check(self, context):
+        self.filename_ext = "." + self.format.lower()
+        return super().check(context)
+
+    def execute(self, context):
+        objects = context.selected_objects if self.selected_only else context.scene.objects
+        table = save_train(self.filepath, objects)
+
+        self.report({'INFO'}, "Wrote %d gears, %d rings" % (len(table), table.ring_count))
+        return {'FINISHED'}
+
+
+class GE_OT_ImportTrain(bpy.types.Operator, ImportHelper):
+    """Builds a gear train from a JSON or NumPy file. Gears that already
+    exist by name are updated in place; other objects are left alone"""
+    bl_idname = "ge.import_train"
+    bl_label = "Import Gear Train"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filter_glob: StringProperty(default="*.json;*.npz", options={'HIDDEN'})
+
+    def execute(self, context):
+        try:
+            objects = load_train(self.filepath, context.collection)
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            self.report({'ERROR'}, "Couldn't read %s: %s" % (self.filepath, err))
+            return {'CANCELLED'}
 
+        self.report({'INFO'}, "Imported %d gears" % len(objects))
         return {'FINISHED'}
 
 
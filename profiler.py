@@ -0,0 +1,203 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Where the time goes during playback. Hot functions are wrapped with
+# @timed, which is a single flag check while the profiler is off; the
+# frame handlers that bracket each frame are only installed while it's on.
+
+import csv
+import functools
+import heapq
+import json
+import time
+from collections import defaultdict
+
+from . graph import GearGraph
+
+# Properties backed by a Python getter. A driver reading one of these
+# calls into Python even when its expression is simple.
+python_paths = (".drive_ratio", "gear_data.fps")
+
+
+def needs_python(driver):
+    if not driver.is_simple_expression:
+        return True
+    return any(
+        var.targets[0].data_path.endswith(python_paths)
+        for var in driver.variables
+    )
+
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.sections = defaultdict(lambda: [0, 0.0])  # name -> [calls, seconds]
+        self.gears = defaultdict(lambda: [0, 0.0])     # object name -> [calls, seconds]
+        self.python_drivers = {}  # object name -> drivers that need Python
+        self.driver_calls = defaultdict(int)  # Estimated, see end_frame
+        self.chains = []          # (depth, object name)
+        self.frames = []
+        self.frame_start = None
+        self.frame_sections = None
+
+    def start(self, scene):
+        self.reset()
+        self.scan(scene)
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        self.frame_start = None
+
+    def scan(self, scene):
+        """Counts the drivers Blender would have to hand to Python, going
+        by their expressions and targets, and finds the deepest chains.
+        Both are fixed until the rig changes."""
+        for obj in scene.objects:
+            anim = obj.animation_data
+            if not anim:
+                continue
+            count = sum(1 for d in anim.drivers if needs_python(d.driver))
+            if count:
+                self.python_drivers[obj.name] = count
+
+        graph = GearGraph.from_scene(scene)
+        self.chains = [(depth, rec.name) for depth, rec in zip(graph.depth, graph.records)]
+
+    def add(self, section, seconds, gear=None):
+        entry = self.sections[section]
+        entry[0] += 1
+        entry[1] += seconds
+
+        if gear is not None:
+            entry = self.gears[gear]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def begin_frame(self):
+        self.frame_sections = {name: entry[1] for name, entry in self.sections.items()}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self, frame):
+        if self.frame_start is None:
+            return
+
+        row = {
+            "frame": frame,
+            "seconds": time.perf_counter() - self.frame_start,
+            "python_drivers_estimate": sum(self.python_drivers.values()),
+        }
+        for name, entry in self.sections.items():
+            row[name] = entry[1] - self.frame_sections.get(name, 0.0)
+
+        # Nothing here can see Blender evaluate a driver, so this assumes
+        # each one runs once per frame. Muted drivers, hidden objects and
+        # extra depsgraph passes all throw that off; it's an estimate.
+        for name, count in self.python_drivers.items():
+            self.driver_calls[name] += count
+
+        self.frames.append(row)
+        self.frame_start = None
+
+    def mean_frame(self):
+        if not self.frames:
+            return 0.0
+        return sum(row["seconds"] for row in self.frames) / len(self.frames)
+
+    def slowest_gears(self, count=10):
+        return heapq.nlargest(count, self.gears.items(), key=lambda item: item[1][1])
+
+    def deepest_chains(self, count=10):
+        return heapq.nlargest(count, self.chains)
+
+    def report(self):
+        frames = max(len(self.frames), 1)
+        return {
+            "frames": len(self.frames),
+            "mean_frame_seconds": self.mean_frame(),
+            "sections": [
+                {"name": name, "calls": calls, "seconds": seconds, "seconds_per_frame": seconds / frames}
+                for name, (calls, seconds) in sorted(self.sections.items())
+            ],
+            "slowest_gears": [
+                {"name": name, "calls": calls, "seconds": seconds}
+                for name, (calls, seconds) in self.slowest_gears()
+            ],
+            "python_driver_calls_estimate": dict(self.driver_calls),
+            "deepest_chains": [
+                {"name": name, "depth": depth} for depth, name in self.deepest_chains()
+            ],
+            "per_frame": self.frames,
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+    def write_csv(self, path):
+        """One flat table: kind, name, count, seconds.
+
+        count is calls for sections and gears, estimated invocations for
+        Python drivers, and depth for chains.
+        """
+        report = self.report()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name", "count", "seconds"])
+
+            for row in report["per_frame"]:
+                writer.writerow(["frame", row["frame"], row["python_drivers_estimate"], row["seconds"]])
+            for row in report["sections"]:
+                writer.writerow(["section", row["name"], row["calls"], row["seconds"]])
+            for row in report["slowest_gears"]:
+                writer.writerow(["gear", row["name"], row["calls"], row["seconds"]])
+            for name, count in sorted(report["python_driver_calls_estimate"].items()):
+                writer.writerow(["python_driver_estimate", name, count, ""])
+            for row in report["deepest_chains"]:
+                writer.writerow(["chain", row["name"], row["depth"], ""])
+
+
+profiler = Profiler()
+
+
+def timed(section, per_gear=False):
+    """Adds the wrapped function's time to section while profiling.
+
+    With per_gear, the first argument's id_data is charged as well, which
+    suits property getters.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                gear = args[0].id_data.name if per_gear else None
+                profiler.add(section, time.perf_counter() - start, gear)
+        return wrapper
+    return decorator
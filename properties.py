@@ -18,6 +18,8 @@
 
 # Hell is other people's code.
 
+from contextlib import contextmanager
+
 import bpy
 from bpy.types import PropertyGroup
 from mathutils import Matrix
@@ -34,6 +36,16 @@ from bpy.props import (
     FloatProperty,
 )
 
+from . dependencies import DependencyIndex
+from . profiler import timed
+from . ratios import (
+    calc_spur_ratio,
+    calc_planetary_ratio,
+    calc_worm_ratio,
+    ratio_dict,
+    ring_ratio,
+)
+
 rot_axes = [
     ('X', "X", ""),
     ('Y', "Y", ""),
@@ -63,53 +75,285 @@ planetary_drive_modes = [
 
 ]
 
-def calc_spur_ratio(drive_gear, target_gear, mode):
-    if (drive_gear.teeth == 0) or (target_gear.teeth == 0):
-        return -1.0
-    else:
-        return drive_gear.teeth/target_gear.teeth
+# gear_version is bumped on every edit that changes how a gear is driven,
+# so anything compiled from gear_data can tell when it's gone stale.
+# Edits that only change a ratio bump ratio_version instead.
+gear_version = 0
+ratio_version = 0
+
+
+def tag_gears_changed():
+    global gear_version
+    gear_version += 1
+
+
+def tag_ratios_changed():
+    global ratio_version
+    ratio_version += 1
+
+
+# Ratios are memoized by the values they're worked out from: the input
+# ring's teeth and the output ring's teeth, gear_type, gear_mode and
+# planetary_subtype. An entry can't go stale, so nothing has to throw it
+# out when a ring is edited, and a pointer Blender reuses for a new object
+# can't pick up a dead one's ratio. Rigs reuse a few tooth counts, so the
+# table stays small.
+ratio_cache = {}
+
+
+def ratio_key(drive_gear, gear):
+    return (drive_gear.teeth, gear.teeth, gear.gear_type, gear.gear_mode, gear.planetary_subtype)
+
+
+def cached_ring_ratio(drive_gear, gear):
+    key = ratio_key(drive_gear, gear)
+    ratio = ratio_cache.get(key)
+    if ratio is None:
+        ratio = ratio_cache[key] = ring_ratio(drive_gear, gear)
+    return ratio
+
+
+def clear_ratio_cache():
+    ratio_cache.clear()
+
+
+# Drivers that read a property with a Python getter drop back into the
+# interpreter every frame. These keep plain, stored copies of the ratio
+# and framerate up to date, so the drivers can read those instead.
+
+def float_changed(old, new):
+    """FloatProperties are single precision, so an exact compare against a
+    double would report a change on every sync"""
+    return abs(old - new) > 1e-6 * max(1.0, abs(new))
+
+
+def refresh_ratios(obj):
+    """Copies the live ratio of each ring into its stored ratio"""
+    changed = False
+    for gear in obj.gear_data.gears:
+        ratio = gear.drive_ratio
+        if float_changed(gear.baked_ratio, ratio):
+            gear.baked_ratio = ratio
+            changed = True
+    return changed
+
+
+def refresh_fps(scene):
+    fps = scene.render.fps
+    for obj in scene.objects:
+        if obj.gear_data.baked_fps != fps:
+            obj.gear_data.baked_fps = fps
+
+
+# Reverse index from drive objects to what they drive, kept current by
+# the drive_object update callback.
+dependency_index = DependencyIndex()
+
+# Objects whose ratios changed since the last bake looked, and callbacks
+# that get handed each subtree as it goes dirty.
+dirty_objects = {}
+dirty_listeners = []
+
+# Callbacks that get handed every object an edit could leave with stale
+# drivers or constraints, ratio edits and structural ones alike
+edit_listeners = []
 
-# a = Ring/Sun
-def calc_planetary_ratio(sun, ring, mode):
-    if (sun.teeth == 0) or (ring.teeth == 0):
-        return -1.0
 
-    a = ring.teeth/sun.teeth
+def get_dependency_index():
+    dependency_index.ensure(bpy.data.objects)
+    return dependency_index
 
-    if mode == 'A': # SCR | -a
-        return -a
 
-    elif mode == 'B': # RCS | -1/a
-        return -1/a
+def clear_dependencies():
+    dependency_index.clear()
+    dirty_objects.clear()
 
-    elif mode == 'C': # CSR | a/(1 + a)
-        return a / (1 + a)
 
-    elif mode == 'D': # RSC | (1 + a)/a
-        return (1 + a)/a
+def signed_ratio(obj):
+    """Signed ratio between obj and its drive object; 0.0 for broken links"""
+    data = obj.gear_data
+    drive_obj = data.drive_object
 
-    elif mode == 'E': # SRC | (1 + a)
-        return 1 + a
+    if len(data.gears) == 0 or not drive_obj:
+        return 0.0
 
-    elif mode == 'F': # CRS | 1 * (1 + a)
-        return 1 * (1 + a)
+    if data.drive_gear < 0 or data.drive_gear >= len(drive_obj.gear_data.gears):
+        return 0.0
 
+    if data.driven_gear < 0 or data.driven_gear >= len(data.gears):
+        return 0.0
+
+    ring = data.gears[data.driven_gear]
+    if ring.teeth == 0 or drive_obj.gear_data.gears[data.drive_gear].teeth == 0:
+        return 0.0
+
+    sign = 1.0 if ring.flip else -1.0
+    return sign * ring.drive_ratio
+
+
+def shaft_axis(obj):
+    """The axis obj turns about. All its rings share one shaft, which
+    turns with the output ring; motors turn on their own axis"""
+    data = obj.gear_data
+    if data.driver_type == 'MOTOR':
+        return data.motor.axis
+    if data.driven_gear < 0 or data.driven_gear >= len(data.gears):
+        return 'Z'
+    return data.gears[data.driven_gear].axis
+
+
+def refresh_chain_ratios(objects):
+    """objects has to be parents-first, like DependencyIndex.downstream().
+
+    The first object builds on its drive object's stored chain ratio, which
+    every edit keeps current, so this never walks further up than one link.
+    """
+    keys = {obj.as_pointer() for obj in objects}
+
+    for i, obj in enumerate(objects):
+        data = obj.gear_data
+
+        if data.driver_type == 'MOTOR':
+            chain = 1.0
+        elif not data.drive_object:
+            chain = 0.0
+        elif i == 0 and data.drive_object.as_pointer() in keys:
+            # Driven from its own subtree, so it's in a drive loop
+            chain = 0.0
+        else:
+            drive_data = data.drive_object.gear_data
+            # Motors only store a chain ratio once something refreshes them
+            upstream = 1.0 if drive_data.driver_type == 'MOTOR' else drive_data.chain_ratio
+            chain = upstream * signed_ratio(obj)
+
+        if float_changed(data.chain_ratio, chain):
+            data.chain_ratio = chain
+
+
+def mark_dirty(objects):
+    for obj in objects:
+        dirty_objects[obj.as_pointer()] = obj
+
+    for listener in dirty_listeners:
+        listener(objects)
+
+    gears_edited(objects)
+
+
+def gears_edited(objects):
+    for listener in edit_listeners:
+        listener(objects)
+
+
+def rings_changed(obj, scene=None, structural=True):
+    """Recomputes whatever reads obj's rings, and nothing else.
+
+    That's obj's own ratios, the ratios of the objects it drives directly,
+    and the chain ratios of everything downstream. Structural changes also
+    bump gear_version, so compiled tables get rebuilt from scratch.
+    """
+    if structural:
+        tag_gears_changed()
     else:
-        return -1.0
+        tag_ratios_changed()
+
+    index = get_dependency_index()
+
+    # New gears take the scene's framerate rather than the default
+    if scene is not None and obj.gear_data.baked_fps != scene.render.fps:
+        obj.gear_data.baked_fps = scene.render.fps
+
+    refresh_ratios(obj)
+
+    # Anything driven by this object reads one of its rings
+    for other in index.direct(obj):
+        refresh_ratios(other)
+
+    subtree = [obj] + index.downstream(obj)
+    refresh_chain_ratios(subtree)
+    mark_dirty(subtree)
+
+
+# Bulk edits (imports, mostly) switch the update callbacks off, and call
+# rebuild_gear_state() once at the end instead of paying per assignment.
+updates_suspended = 0
 
 
-def calc_worm_ratio(worm, spur, mode):
-    if (worm.teeth == 0) or (spur.teeth == 0):
-        return -1.0
+@contextmanager
+def suspend_updates():
+    global updates_suspended
+    updates_suspended += 1
+    try:
+        yield
+    finally:
+        updates_suspended -= 1
 
-    return worm.teeth/spur.teeth # worm.teeth being the number of thread starts
 
+def rebuild_gear_state(objects):
+    """Everything the update callbacks would have done for objects, in one go"""
+    tag_gears_changed()
+    clear_ratio_cache()
 
-ratio_dict = {
-    "SPUR": calc_spur_ratio,
-    "PLANETARY": calc_planetary_ratio,
-    "WORM": calc_worm_ratio,
-}
+    dependency_index.clear()
+    index = get_dependency_index()
+
+    objects = list(objects)
+    keys = {obj.as_pointer() for obj in objects}
+
+    # Their own ratios, and those of anything outside the batch they drive
+    for obj in objects:
+        refresh_ratios(obj)
+        for other in index.direct(obj):
+            if other.as_pointer() not in keys:
+                refresh_ratios(other)
+
+    # Chain ratios from the top of each imported subtree down
+    touched = {}
+    for obj in objects:
+        drive_obj = obj.gear_data.drive_object
+        if drive_obj and drive_obj.as_pointer() in keys:
+            continue
+        subtree = [obj] + index.downstream(obj)
+        refresh_chain_ratios(subtree)
+        for other in subtree:
+            touched[other.as_pointer()] = other
+
+    if touched:
+        mark_dirty(list(touched.values()))
+
+
+def update_structure(self, context):
+    if not updates_suspended:
+        tag_gears_changed()
+        # Drive modes and set membership decide what gets planned for
+        # everything downstream, not just this object
+        obj = self.id_data
+        gears_edited([obj] + get_dependency_index().downstream(obj))
+
+
+def update_ratios(self, context):
+    if not updates_suspended:
+        rings_changed(self.id_data, context.scene, structural=False)
+
+
+def update_ring_structure(self, context):
+    if not updates_suspended:
+        rings_changed(self.id_data, context.scene)
+
+
+def update_speed(self, context):
+    # Nothing compiled stores speed except frame caches, which only need
+    # to know something changed
+    if not updates_suspended:
+        tag_ratios_changed()
+
+
+def update_drive_object(self, context):
+    if updates_suspended:
+        return
+    obj = self.id_data
+    get_dependency_index().set_drive(obj, self.drive_object)
+    rings_changed(obj, context.scene)
 
 
 class GearProps(PropertyGroup):
@@ -122,13 +366,15 @@ class GearProps(PropertyGroup):
         name="Teeth",
         default=24,
         min=0,
-        options={'PROPORTIONAL'}
+        options={'PROPORTIONAL'},
+        update=update_ratios
     )
 
     axis: EnumProperty(
         items=rot_axes,
         name="Rotation Axis",
-        default='Z'
+        default='Z',
+        update=update_ring_structure
     )
 
     drive_object: PointerProperty(
@@ -139,60 +385,54 @@ class GearProps(PropertyGroup):
     flip: BoolProperty(
         name="Flip Direction",
         default=False,
+        update=update_ratios
     )
 
     gear_type: EnumProperty(
         items=gear_types,
         name="Gear Type",
         description="Determines how the gear ratio is calculated",
-        default='SPUR'
+        default='SPUR',
+        update=update_ratios
     )
 
     gear_mode: EnumProperty(
         items=planetary_drive_modes,
         name="Planetary Drive Mode",
-        default='A'
+        default='A',
+        update=update_ratios
     )
  
     planetary_subtype: EnumProperty(
         items=planetary_subtypes,
         name="Planetary Subtype",
-        description="What role this gear plays in a planetary assemblage"
-    )
-
-    ratio_err: StringProperty(
-        name="Error Message",
-        default=""
+        description="What role this gear plays in a planetary assemblage",
+        update=update_ratios
     )
 
+    @timed("ratio_getter", per_gear=True)
     def get_ratio(self):
         # backpointer to the object the property is attached to.
         # Not all properties have one of these, for some reason.
         parent = self.id_data
 
-        if (self.gear_type == 'PLANETARY') and (self.planetary_subtype == 'PLANET'):
-            ratio_func = ratio_dict["SPUR"]
-        else:
-            ratio_func = ratio_dict[self.gear_type]
-        
+        # Getters run during draw, so this only returns a value. What went
+        # wrong is worked out by the validation pass in diagnostics.py.
         if hasattr(parent, 'gear_data'):
             if not parent.gear_data.drive_object:
-                self.ratio_err = "No drive object"
                 return 0.0
 
             # property collections don't like it when you try to access
             # their last member via some_prop[-1], so we do a soft fail
             if parent.gear_data.drive_gear == -1:
-                self.ratio_err = "Invalid index. Set the Input Ring"
                 return -1.0
 
             drive_obj = parent.gear_data.drive_object
 
             if len(drive_obj.gear_data.gears) > parent.gear_data.drive_gear:
                 drive_gear = drive_obj.gear_data.gears[parent.gear_data.drive_gear]
-                return ratio_func(drive_gear, self, self.gear_mode)
+                return cached_ring_ratio(drive_gear, self)
             else:
-                self.ratio_err = "Invalid index. Input Ring doesn't exist"
                 return -1.0
 
     drive_ratio: FloatProperty(
@@ -200,6 +440,12 @@ class GearProps(PropertyGroup):
         get=get_ratio
     )
 
+    baked_ratio: FloatProperty(
+        name="Stored Drive Ratio",
+        description="Copy of the drive ratio that drivers can read without running Python",
+        default=0.0
+    )
+
     parent_obj: PointerProperty(
         type=bpy.types.Object,
         name="Parent Object"
@@ -211,14 +457,30 @@ class MotorProps(PropertyGroup):
 
     speed: FloatProperty(
         name="Speed",
+        description=(
+            "Radians per second. Keyframe it for spin-ups and spin-downs; "
+            "re-initialize drivers after keying it for the first time"),
         default=1.0,
         soft_min=-50.0,
-        soft_max=50.0
+        soft_max=50.0,
+        update=update_speed
     )
 
+    # Motors made before the axis was stored get it from their driver
+    # on load; see migrate_motor_axes
     axis: EnumProperty(
         items=rot_axes,
-        name="Axis"
+        name="Axis",
+        description="The local axis the motor spins about",
+        update=update_structure
+    )
+
+    spin: FloatProperty(
+        name="Spin",
+        description=(
+            "The motor's angle on the current frame, integrated from its animated speed. "
+            "Written by the frame handler so drivers can read it"),
+        default=0.0
     )
 
     enabled: BoolProperty(
@@ -240,6 +502,20 @@ class GearSet(PropertyGroup):
         name="Motor Properties"
     )
 
+    # UI state for the ring list
+    active_ring: IntProperty(
+        name="Active Ring",
+        default=0,
+        min=0
+    )
+
+    show_rings: BoolProperty(
+        name="Show Rings",
+        description="Show the full ring list instead of a one-line summary",
+        default=True
+    )
+
+    @timed("fps_getter", per_gear=True)
     def get_fps(self):
         return bpy.context.scene.render.fps
 
@@ -248,6 +524,38 @@ class GearSet(PropertyGroup):
         get=get_fps
     )
 
+    baked_fps: FloatProperty(
+        name="Stored Framerate",
+        description="Copy of the scene framerate that drivers can read without running Python",
+        default=24.0
+    )
+
+    chain_ratio: FloatProperty(
+        name="Chain Ratio",
+        description=(
+            "Product of every signed ratio between this gear and its motor. "
+            "One per object, since all of an object's rings turn together"),
+        default=0.0
+    )
+
+    use_flat_chain: BoolProperty(
+        name="Flatten Chain",
+        description=(
+            "Drive this gear straight from its motor using the combined ratio of the whole chain, "
+            "instead of from the rotation of its drive object. "
+            "Deep gear trains evaluate in parallel, but need a refresh after upstream edits"),
+        default=False,
+        update=update_structure
+    )
+
+    use_baked_ratios: BoolProperty(
+        name="Python-Free Drivers",
+        description=(
+            "Point drivers at stored copies of the ratio and framerate, "
+            "so they stay in Blender's simple expression evaluator"),
+        default=True
+    )
+
     # DRIVE info
 
     drive_mode_items = [
@@ -260,7 +568,12 @@ class GearSet(PropertyGroup):
         ('CONSTRAINT', "Constraint-based",
             ("In this mode, the gear is driven by a constraint. "
              "This makes it easy to setup gears that rotate on weird axes "
-             "but it can be harder to hand-tweak, since the final transform isn't visible")) 
+             "but it can be harder to hand-tweak, since the final transform isn't visible")),
+
+        ('HANDLER', "Handler-based",
+            ("In this mode, the gear is rotated by a single frame change handler "
+             "that updates every handler-driven gear in the scene at once. "
+             "It scales best on big assemblies, but only runs while Blender is playing or scrubbing"))
     ]
 
     drive_mode: EnumProperty(
@@ -268,26 +581,39 @@ class GearSet(PropertyGroup):
         name="Drive Mode",
         description="Controls whether the gear's movement is powered by drivers or constraints",
         options=set(),
-        default='DRIVER'
+        default='DRIVER',
+        update=update_structure
     )
 
     drive_object: PointerProperty(
         type=bpy.types.Object,
         name="Drive Object",
+        update=update_drive_object
+    )
+
+    carrier: PointerProperty(
+        type=bpy.types.Object,
+        name="Planetary Carrier",
+        description=(
+            "The carrier of the planetary set this sun, ring or planet belongs to. "
+            "A set's members are solved together, so it can take two inputs, like a differential"),
+        update=update_structure
     )
 
     drive_gear: IntProperty(
         name="Input Ring",
         description="The index of the gear ring on the _Drive Object_ that rotates this object",
         default=-1,
-        min=-1
+        min=-1,
+        update=update_ratios
     )
 
     driven_gear: IntProperty(
         name="Output Ring",
         description="The index of the gear ring on _This Object_ that engages with the drive object",
         default=-1,
-        min=-1
+        min=-1,
+        update=update_ring_structure
     )
 
     driver_type_items = [
@@ -299,9 +625,36 @@ class GearSet(PropertyGroup):
         items=driver_type_items,
         name="Driver Type",
         description="Sets whether the gear's rotation comes from another object, or a motor",
-        default='OBJ'
+        default='OBJ',
+        update=update_ring_structure
     )
 
+class GearSceneSettings(PropertyGroup):
+
+    frame_cache: StringProperty(
+        name="Frame Cache",
+        description="Precomputed angles for every gear on every frame, written by Build Frame Cache",
+        subtype='FILE_PATH',
+        default="//gear_frames.npy"
+    )
+
+    use_frame_cache: BoolProperty(
+        name="Use Frame Cache",
+        description=(
+            "Read handler-driven gears' rotations from the frame cache instead of working them out. "
+            "A cache that no longer matches the gears is ignored"),
+        default=False
+    )
+
+    use_auto_sync: BoolProperty(
+        name="Auto Sync",
+        description=(
+            "Re-sync drivers and constraints on edited gears once you stop editing, "
+            "instead of waiting for Initialize Gear Drivers"),
+        default=True
+    )
+
+
 # NOT IMPLEMENTED
 # Turns out you can't stick a property group on a driver
 class DriverProps(PropertyGroup):
@@ -0,0 +1,81 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# The ratio math lives here so it doesn't drag bpy along with it.
+# Anything with a .teeth attribute works as a gear.
+
+
+def calc_spur_ratio(drive_gear, target_gear, mode):
+    if (drive_gear.teeth == 0) or (target_gear.teeth == 0):
+        return -1.0
+    else:
+        return drive_gear.teeth/target_gear.teeth
+
+# a = Ring/Sun
+def calc_planetary_ratio(sun, ring, mode):
+    if (sun.teeth == 0) or (ring.teeth == 0):
+        return -1.0
+
+    a = ring.teeth/sun.teeth
+
+    if mode == 'A': # SCR | -a
+        return -a
+
+    elif mode == 'B': # RCS | -1/a
+        return -1/a
+
+    elif mode == 'C': # CSR | a/(1 + a)
+        return a / (1 + a)
+
+    elif mode == 'D': # RSC | (1 + a)/a
+        return (1 + a)/a
+
+    elif mode == 'E': # SRC | (1 + a)
+        return 1 + a
+
+    elif mode == 'F': # CRS | 1 * (1 + a)
+        return 1 * (1 + a)
+
+    else:
+        return -1.0
+
+
+def calc_worm_ratio(worm, spur, mode):
+    if (worm.teeth == 0) or (spur.teeth == 0):
+        return -1.0
+
+    return worm.teeth/spur.teeth # worm.teeth being the number of thread starts
+
+
+ratio_dict = {
+    "SPUR": calc_spur_ratio,
+    "PLANETARY": calc_planetary_ratio,
+    "WORM": calc_worm_ratio,
+}
+
+
+def ring_ratio(drive_gear, gear):
+    # Planets mesh like spur gears, whatever the rest of the assemblage is doing
+    if (gear.gear_type == 'PLANETARY') and (gear.planetary_subtype == 'PLANET'):
+        ratio_func = ratio_dict["SPUR"]
+    else:
+        ratio_func = ratio_dict[gear.gear_type]
+
+    return ratio_func(drive_gear, gear, gear.gear_mode)
@@ -0,0 +1,81 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Spins about a local axis, for every rotation mode Blender has, worked out
+# for a whole batch of gears at once. Doesn't touch bpy.
+#
+# A gear's rotation only ever holds its spin. Which way the gear faces goes
+# in its delta rotation, which Blender applies outside the regular one, so
+# the spin stays about the gear's own axis without an empty to parent to.
+
+import numpy as np
+
+EULER = 'EULER'
+QUATERNION = 'QUATERNION'
+AXIS_ANGLE = 'AXIS_ANGLE'
+
+# Where each kind of rotation lives on an Object, and how many floats it takes
+rotation_paths = {
+    EULER: ("rotation_euler", 3),
+    QUATERNION: ("rotation_quaternion", 4),
+    AXIS_ANGLE: ("rotation_axis_angle", 4),
+}
+
+
+def rotation_kind(mode):
+    """Collapses the six Euler orders into one kind"""
+    if mode in (QUATERNION, AXIS_ANGLE):
+        return mode
+    return EULER
+
+
+def spin_values(kind, axes, angles):
+    """Every channel of a rotation by angles about local axes.
+
+    axes holds 0, 1 or 2 per gear, and angles is shaped (gears,) or
+    (gears, frames). The result gets one more dimension on the end, as wide
+    as the kind's property.
+    """
+    angles = np.asarray(angles, dtype=np.float64)
+    axes = np.asarray(axes, dtype=np.int64).reshape((-1,) + (1,) * (angles.ndim - 1))
+    axes = np.broadcast_to(axes, angles.shape)[..., None]
+
+    out = np.zeros(angles.shape + (rotation_paths[kind][1],), dtype=np.float64)
+
+    if kind == QUATERNION:
+        out[..., 0] = np.cos(angles / 2.0)
+        np.put_along_axis(out, axes + 1, np.sin(angles / 2.0)[..., None], axis=-1)
+    elif kind == AXIS_ANGLE:
+        out[..., 0] = angles
+        np.put_along_axis(out, axes + 1, 1.0, axis=-1)
+    else:
+        np.put_along_axis(out, axes, angles[..., None], axis=-1)
+
+    return out
+
+
+def spin_channels(kind, axis):
+    """Indices into the rotation property that actually change with the
+    angle, for a single axis. The rest are constant."""
+    if kind == QUATERNION:
+        return (0, axis + 1)
+    if kind == AXIS_ANGLE:
+        return (0,)
+    return (axis,)
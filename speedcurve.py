@@ -0,0 +1,210 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# A motor's angle is the integral of its speed over time. For a constant
+# speed that's (frame/FPS) * speed, which is what the drivers do; once the
+# speed is keyframed, it isn't. The speed F-Curve gets sampled once into a
+# running sum, so the angle on any frame is an index and a lerp, and the
+# table is only rebuilt when the curve itself changes.
+#
+# Like graph.py this doesn't import bpy; it only reads what it's handed.
+
+import math
+
+import numpy as np
+
+SPEED_PATH = "gear_data.motor.speed"
+
+# Samples per frame. The sum is trapezoidal, so this only matters for
+# curves that bend a lot within a frame.
+SAMPLES_PER_FRAME = 4
+
+# Bumped whenever any speed table is built or dropped, for caches that
+# store angles and need to know the curves moved under them
+curve_version = 0
+
+# Bumped by the depsgraph handler whenever an Action is edited. Until it
+# moves, a table's curve can't have changed, so nothing gets re-hashed.
+curve_edits = 0
+
+
+def tag_curves_edited():
+    global curve_edits
+    curve_edits += 1
+
+
+def has_modifiers(fcurve):
+    return any(not modifier.mute for modifier in fcurve.modifiers)
+
+
+def speed_fcurve(obj, allow_modifiers=False):
+    """The F-Curve animating obj's motor speed, or None.
+
+    Modifiers (Cycles, Noise and so on) reshape the curve past its keys,
+    where the table can't follow, so curves with any are left out unless
+    asked for.
+    """
+    anim = obj.animation_data
+    if anim is None or anim.action is None:
+        return None
+
+    fcurve = anim.action.fcurves.find(SPEED_PATH)
+    if fcurve is None or fcurve.mute or len(fcurve.keyframe_points) == 0:
+        return None
+    if not allow_modifiers and has_modifiers(fcurve):
+        return None
+    return fcurve
+
+
+def curve_key(fcurve):
+    """Changes whenever anything that shapes the curve does"""
+    points = fcurve.keyframe_points
+    count = len(points)
+
+    coords = np.empty(count * 6, dtype=np.float32)
+    points.foreach_get("co", coords[:count * 2])
+    points.foreach_get("handle_left", coords[count * 2:count * 4])
+    points.foreach_get("handle_right", coords[count * 4:])
+
+    return (
+        coords.tobytes(),
+        tuple(point.interpolation for point in points),
+        getattr(fcurve, "extrapolation", 'CONSTANT'),
+        len(fcurve.modifiers),
+    )
+
+
+class SpeedTable:
+    """Running integral of a speed curve, in speed * frames.
+
+    Frame 0 is where the integral starts, same as the constant-speed
+    driver. Before the first sample and after the last, the curve carries
+    on as its extrapolation says: flat for constant, a straight line for
+    linear. Either way the integral out there is exact.
+    """
+
+    def __init__(self, fcurve, key=None):
+        self.key = key if key is not None else curve_key(fcurve)
+        self.fcurve = fcurve.as_pointer()
+        self.checked = curve_edits
+
+        points = fcurve.keyframe_points
+        first = math.floor(min(0.0, points[0].co[0]))
+        last = math.ceil(max(0.0, points[len(points) - 1].co[0]))
+
+        self.start = float(first)
+        self.step = 1.0 / SAMPLES_PER_FRAME
+        count = int((last - first) * SAMPLES_PER_FRAME) + 1
+        frames = self.start + np.arange(count, dtype=np.float64) * self.step
+
+        self.speeds = np.array([fcurve.evaluate(f) for f in frames], dtype=np.float64)
+
+        # Both ends are past the keys, so a frame further out gives the
+        # extrapolated slope, which is 0.0 for constant extrapolation
+        end = self.start + self.step * (count - 1)
+        self.head_slope = self.speeds[0] - fcurve.evaluate(self.start - 1.0)
+        self.tail_slope = fcurve.evaluate(end + 1.0) - self.speeds[-1]
+
+        self.sums = np.zeros(count, dtype=np.float64)
+        np.cumsum((self.speeds[1:] + self.speeds[:-1]) * (0.5 * self.step), out=self.sums[1:])
+
+        # Shifted so the integral is zero on frame 0
+        self.sums -= self.sums[int(-self.start * SAMPLES_PER_FRAME)]
+
+    @property
+    def end(self):
+        return self.start + self.step * (len(self.sums) - 1)
+
+    def spin(self, frame, fps):
+        """The motor's angle on frame"""
+        pos = (frame - self.start) * SAMPLES_PER_FRAME
+        last = len(self.sums) - 1
+
+        if pos <= 0.0:
+            total = self.sums[0] + self.outside(self.speeds[0], self.head_slope, frame - self.start)
+        elif pos >= last:
+            total = self.sums[last] + self.outside(self.speeds[last], self.tail_slope, frame - self.end)
+        else:
+            i = int(pos)
+            t = pos - i
+            total = self.sums[i] + (self.sums[i + 1] - self.sums[i]) * t
+
+        return float(total) / fps
+
+    def spins(self, frames, fps):
+        """spin() over an array of frames"""
+        frames = np.asarray(frames, dtype=np.float64)
+        grid = self.start + np.arange(len(self.sums), dtype=np.float64) * self.step
+        total = np.interp(frames, grid, self.sums)
+
+        before = frames < self.start
+        total[before] = self.sums[0] + self.outside(self.speeds[0], self.head_slope, frames[before] - self.start)
+        after = frames > self.end
+        total[after] = self.sums[-1] + self.outside(self.speeds[-1], self.tail_slope, frames[after] - self.end)
+        return total / fps
+
+    @staticmethod
+    def outside(speed, slope, frames):
+        """Integral from an end of the table out to frames past it"""
+        return speed * frames + 0.5 * slope * frames * frames
+
+
+# Tables by object pointer, each with the curve key it was built from
+speed_tables = {}
+
+
+def get_speed_table(obj):
+    """obj's speed table if its speed is animated, otherwise None"""
+    global curve_version
+
+    key = obj.as_pointer()
+    fcurve = speed_fcurve(obj)
+    table = speed_tables.get(key)
+
+    if fcurve is None:
+        if table is not None:
+            del speed_tables[key]
+            curve_version += 1
+        return None
+
+    # Same curve and no Action edits since it was last looked at
+    if table is not None and table.checked == curve_edits and table.fcurve == fcurve.as_pointer():
+        return table
+
+    shape = curve_key(fcurve)
+    if table is None or table.key != shape:
+        table = speed_tables[key] = SpeedTable(fcurve, shape)
+        curve_version += 1
+    else:
+        table.fcurve = fcurve.as_pointer()
+        table.checked = curve_edits
+    return table
+
+
+def motor_spin(obj, frame, fps):
+    """Angle of a motor on frame, animated speed or not"""
+    table = get_speed_table(obj)
+    if table is None:
+        return (frame / fps) * obj.gear_data.motor.speed
+    return table.spin(frame, fps)
+
+
+def clear_speed_tables():
+    speed_tables.clear()
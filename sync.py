@@ -0,0 +1,123 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Works out what each gear's drive_mode says it should have (a driver, a
+# constraint, or neither) and reconciles that with what's on the object.
+# Syncing an assembly that hasn't changed reads everything and writes
+# nothing.
+
+from . profiler import timed
+from . graph import DRIVE_LOOP
+from . diagnostics import get_diagnostics
+from . drivers import (
+    plan_drivers,
+    apply_plan,
+    remove_rotation_drivers,
+)
+from . constraints import (
+    plan_constraint,
+    apply_constraint_plan,
+    remove_gear_constraints,
+)
+
+
+SOLVED_CONSTRAINT = "Planetary sets and closed loops need drivers or the handler"
+
+
+class SyncResult:
+    __slots__ = ("total", "changed", "skipped")
+
+    def __init__(self):
+        self.total = 0
+        self.changed = 0
+        self.skipped = []
+
+
+def wants_constraint(obj):
+    data = obj.gear_data
+    return data.drive_mode == 'CONSTRAINT' and data.driver_type != 'MOTOR'
+
+
+@timed("sync")
+def sync_objects(objects, scene=None, constraints_only=False):
+    """Syncs drivers and constraints on objects to their gear_data.
+
+    With constraints_only, every non-motor gear gets a constraint no
+    matter its drive mode, and drivers are left alone.
+    """
+    result = SyncResult()
+
+    gears = [
+        obj for obj in objects
+        if hasattr(obj, "gear_data") and len(obj.gear_data.gears)
+    ]
+
+    constrained = []
+    driven = []
+    for obj in gears:
+        if constraints_only or wants_constraint(obj):
+            if obj.gear_data.driver_type != 'MOTOR':
+                constrained.append(obj)
+        elif not constraints_only:
+            driven.append(obj)
+
+    loops = set()
+    solved = set()
+    if scene is not None:
+        diagnostics = get_diagnostics(scene)
+        loops = set(diagnostics.loops)
+        solved = diagnostics.solved
+
+    for obj in constrained:
+        result.total += 1
+        if obj.name in loops:
+            result.skipped.append((obj, DRIVE_LOOP))
+            continue
+        if obj.name in solved:
+            result.skipped.append((obj, SOLVED_CONSTRAINT))
+            continue
+
+        plan, err = plan_constraint(obj)
+        if plan is None:
+            result.skipped.append((obj, err))
+            continue
+
+        changed = apply_constraint_plan(plan)
+        # A driver on the same channel would fight the constraint
+        if not constraints_only:
+            changed |= remove_rotation_drivers(obj)
+        result.changed += changed
+
+    plans, skipped, released = plan_drivers(driven, scene)
+    result.total += len(plans) + len(skipped) + len(released)
+    result.skipped.extend(skipped)
+
+    for plan in plans:
+        changed = apply_plan(plan)
+        changed |= remove_gear_constraints(plan.obj)
+        result.changed += changed
+
+    # Drivers run after the frame handler and would stomp on it
+    for obj in released:
+        changed = remove_rotation_drivers(obj)
+        changed |= remove_gear_constraints(obj)
+        result.changed += changed
+
+    return result
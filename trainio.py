@@ -0,0 +1,207 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Moves GearTables in and out of a scene. Imports run with the update
+# callbacks switched off and recompute ratios once at the end; otherwise
+# every assignment would walk the dependency index again.
+
+import bpy
+import numpy as np
+
+from . graph import snapshot_objects
+from . traintable import GearTable
+from . rotations import rotation_kind, rotation_paths
+from . properties import (
+    GearSet,
+    rot_axes,
+    gear_types,
+    planetary_drive_modes,
+    planetary_subtypes,
+    suspend_updates,
+    rebuild_gear_state,
+)
+
+rotation_modes = ('QUATERNION', 'XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX', 'AXIS_ANGLE')
+
+# What every enum column is allowed to hold. Blender raises TypeError on
+# anything else, and that would leave an import half done.
+enum_values = {
+    "objects.driver_type": [item[0] for item in GearSet.driver_type_items],
+    "objects.drive_mode": [item[0] for item in GearSet.drive_mode_items],
+    "objects.motor_axis": [item[0] for item in rot_axes],
+    "objects.rotation_mode": rotation_modes,
+    "rings.axis": [item[0] for item in rot_axes],
+    "rings.gear_type": [item[0] for item in gear_types],
+    "rings.gear_mode": [item[0] for item in planetary_drive_modes],
+    "rings.planetary_subtype": [item[0] for item in planetary_subtypes],
+}
+
+
+def check_enums(table):
+    """Raises ValueError if an enum column holds something Blender won't take"""
+    for key, vocab in table.vocab.items():
+        allowed = enum_values.get(key)
+        if allowed is None:
+            continue
+        unknown = sorted(set(vocab) - set(allowed))
+        if unknown:
+            raise ValueError("%s can't be %s" % (key, ", ".join(map(repr, unknown))))
+
+
+def read_rotation(obj):
+    """obj's rotation as the four channels a GearTable stores"""
+    path, size = rotation_paths[rotation_kind(obj.rotation_mode)]
+    row = np.zeros(4)
+    row[:size] = getattr(obj, path)
+    return row
+
+
+def write_rotation(obj, mode, row):
+    obj.rotation_mode = mode
+    path, size = rotation_paths[rotation_kind(mode)]
+    setattr(obj, path, row[:size])
+
+
+def export_train(objects):
+    """GearTable for every object in objects that has rings"""
+    objects = list(objects)
+    records = snapshot_objects(objects)
+    by_name = {obj.name: obj for obj in objects}
+
+    location = np.empty((len(records), 3))
+    rotation = np.empty((len(records), 4))
+    rotation_mode = []
+    for i, rec in enumerate(records):
+        obj = by_name[rec.name]
+        location[i] = obj.location
+        rotation[i] = read_rotation(obj)
+        rotation_mode.append(obj.rotation_mode)
+
+    return GearTable.from_records(records, location, rotation, rotation_mode)
+
+
+def save_train(path, objects):
+    table = export_train(objects)
+    table.save(path)
+    return table
+
+
+def fill_rings(obj, rows, start, count, ring_names, ring_enums):
+    gears = obj.gear_data.gears
+    gears.clear()
+    for _ in range(count):
+        gears.add()
+
+    if count == 0:
+        return
+
+    stop = start + count
+    gears.foreach_set("teeth", rows["teeth"][start:stop])
+    gears.foreach_set("flip", rows["flip"][start:stop])
+
+    # Strings and enums have no foreach path
+    for k, gear in enumerate(gears):
+        gear.name = ring_names[start + k]
+        gear.parent_obj = obj
+        for attr, values in ring_enums.items():
+            setattr(gear, attr, values[start + k])
+
+
+def import_train(table, collection):
+    """Builds table into collection, and returns the objects in table order.
+
+    Gear objects that already exist by name are updated in place (rings
+    are replaced); the rest are created as empties and linked to
+    collection. An object with the name but no rings isn't a gear, so it's
+    left alone and the new gear gets a unique name.
+    """
+    table.validate()
+    check_enums(table)
+
+    names = table.objects["name"].tolist()
+    starts = table.ring_start.tolist()
+    counts = table.objects["ring_count"].tolist()
+
+    ring_names = table.rings["name"].tolist()
+    ring_enums = {
+        attr: table.column("rings", attr)
+        for attr in ("axis", "gear_type", "gear_mode", "planetary_subtype")
+    }
+
+    driver_type = table.column("objects", "driver_type")
+    drive_mode = table.column("objects", "drive_mode")
+    motor_axis = table.column("objects", "motor_axis")
+    rotation_mode = table.column("objects", "rotation_mode")
+    drive_object = table.objects["drive_object"].tolist()
+    carrier = table.objects["carrier"].tolist()
+    drive_gear = table.objects["drive_gear"].tolist()
+    driven_gear = table.objects["driven_gear"].tolist()
+    speed = table.objects["speed"].tolist()
+
+    # One pass up front; looking each name up is a scan per object
+    existing = {obj.name: obj for obj in bpy.data.objects}
+    objects = []
+    created = []
+
+    with suspend_updates():
+        for i, name in enumerate(names):
+            obj = existing.get(name)
+            if obj is None or obj.library or len(obj.gear_data.gears) == 0:
+                obj = bpy.data.objects.new(name, None)
+                created.append(obj)
+            objects.append(obj)
+
+            fill_rings(obj, table.rings, starts[i], counts[i], ring_names, ring_enums)
+
+            data = obj.gear_data
+            data.driver_type = driver_type[i]
+            data.drive_mode = drive_mode[i]
+            data.drive_gear = drive_gear[i]
+            data.driven_gear = driven_gear[i]
+            data.motor.speed = speed[i]
+            data.motor.axis = motor_axis[i]
+            data.active_ring = 0
+
+            obj.location = table.location[i]
+            write_rotation(obj, rotation_mode[i], table.rotation[i])
+
+        # Names may have been uniquified on creation, so links go through
+        # the table's own objects first
+        by_name = dict(zip(names, objects))
+
+        def find(name):
+            if not name:
+                return None
+            return by_name.get(name) or existing.get(name)
+
+        for obj, target, carrier_name in zip(objects, drive_object, carrier):
+            obj.gear_data.drive_object = find(target)
+            obj.gear_data.carrier = find(carrier_name)
+
+        # Linked last, so nothing sees a half-filled object
+        for obj in created:
+            collection.objects.link(obj)
+
+    rebuild_gear_state(objects)
+    return objects
+
+
+def load_train(path, collection):
+    return import_train(GearTable.load(path), collection)
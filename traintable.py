@@ -0,0 +1,330 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Hell is other people's code.
+
+# Whole gear trains as columns: one array per attribute, one row per object
+# or ring. Enums are stored as small integer codes plus the vocabulary they
+# index into, so files stay small and describe themselves. This module
+# doesn't need bpy, so other tools can write trains for GearEngine to load.
+
+import json
+
+import numpy as np
+
+from . graph import GearRecord, RingRecord
+
+FORMAT = "gearengine-train"
+
+# Version 2 stores each object's rotation mode, and four rotation channels
+# so quaternions and axis-angles fit; version 1 files were Euler only
+VERSION = 2
+
+object_columns = {
+    "name": str,
+    "driver_type": "enum",
+    "drive_mode": "enum",
+    "drive_object": str,  # Name, "" for none
+    "drive_gear": np.int32,
+    "driven_gear": np.int32,
+    "speed": np.float64,
+    "motor_axis": "enum",
+    "ring_count": np.int32,
+    "carrier": str,       # Name, "" for none
+    "rotation_mode": "enum",
+}
+
+# Columns older files don't have, and what to fill them with. Enums get
+# code 0 into a vocabulary of just the value.
+optional_columns = {
+    "carrier": "",
+    "rotation_mode": 'XYZ',
+}
+
+ring_columns = {
+    "name": str,
+    "teeth": np.int32,
+    "axis": "enum",
+    "flip": np.bool_,
+    "gear_type": "enum",
+    "gear_mode": "enum",
+    "planetary_subtype": "enum",
+}
+
+
+def encode(values):
+    vocab = sorted(set(values))
+    lookup = {value: i for i, value in enumerate(vocab)}
+    return np.array([lookup[value] for value in values], dtype=np.int8), vocab
+
+
+def decode(codes, vocab):
+    return [vocab[code] for code in codes.tolist()]
+
+
+class GearTable:
+    """Columns for a set of GearRecords, plus a transform per object.
+
+    rotation has four channels per object, read the way its rotation_mode
+    says: XYZ angles and a zero for Euler modes, WXYZ for quaternions,
+    angle then XYZ for axis-angle.
+    """
+
+    def __init__(self, objects, rings, vocab, location=None, rotation=None):
+        self.objects = objects  # column name -> array
+        self.rings = rings
+        self.vocab = vocab      # "table.column" -> list of strings
+
+        for name, default in optional_columns.items():
+            key = "objects." + name
+            if object_columns[name] == "enum" and key not in vocab:
+                self.vocab = vocab = dict(vocab)
+                vocab[key] = [default]
+
+        count = len(objects["name"])
+        self.location = np.zeros((count, 3)) if location is None else np.asarray(location, dtype=np.float64)
+        self.rotation = np.zeros((count, 4)) if rotation is None else np.asarray(rotation, dtype=np.float64)
+
+        # Euler-only rotations from version 1 files
+        if self.rotation.ndim == 2 and self.rotation.shape[1] == 3:
+            self.rotation = np.hstack([self.rotation, np.zeros((len(self.rotation), 1))])
+
+    def __len__(self):
+        return len(self.objects["name"])
+
+    @property
+    def ring_count(self):
+        return len(self.rings["name"])
+
+    @property
+    def ring_start(self):
+        counts = self.objects["ring_count"]
+        starts = np.zeros(len(counts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=starts[1:])
+        return starts
+
+    @classmethod
+    def from_records(cls, records, location=None, rotation=None, rotation_mode=None):
+        rings = [ring for rec in records for ring in rec.rings]
+        if rotation_mode is None:
+            rotation_mode = ['XYZ'] * len(records)
+
+        values = {
+            "name": [rec.name for rec in records],
+            "driver_type": [rec.driver_type for rec in records],
+            "drive_mode": [rec.drive_mode for rec in records],
+            "drive_object": [rec.drive_object or "" for rec in records],
+            "drive_gear": [rec.drive_gear for rec in records],
+            "driven_gear": [rec.driven_gear for rec in records],
+            "speed": [rec.speed for rec in records],
+            "motor_axis": [rec.motor_axis for rec in records],
+            "ring_count": [len(rec.rings) for rec in records],
+            "carrier": [rec.carrier or "" for rec in records],
+            "rotation_mode": list(rotation_mode),
+        }
+        ring_values = {
+            column: [getattr(ring, column) for ring in rings]
+            for column in ring_columns
+        }
+
+        vocab = {}
+        objects = pack(values, object_columns, "objects", vocab)
+        ring_arrays = pack(ring_values, ring_columns, "rings", vocab)
+        return cls(objects, ring_arrays, vocab, location, rotation)
+
+    def column(self, table, name):
+        """A column with enums decoded back to strings"""
+        arrays = self.objects if table == "objects" else self.rings
+        kind = (object_columns if table == "objects" else ring_columns)[name]
+        if kind == "enum":
+            return decode(arrays[name], self.vocab[table + "." + name])
+        return arrays[name]
+
+    def records(self):
+        names = self.objects["name"].tolist()
+        starts = self.ring_start.tolist()
+        counts = self.objects["ring_count"].tolist()
+
+        ring_data = [
+            self.column("rings", name)
+            for name in ("name", "teeth", "axis", "flip", "gear_type", "gear_mode", "planetary_subtype")
+        ]
+        ring_rows = [RingRecord(*row) for row in zip(*[
+            col.tolist() if isinstance(col, np.ndarray) else col for col in ring_data
+        ])]
+
+        driver_type = self.column("objects", "driver_type")
+        drive_mode = self.column("objects", "drive_mode")
+        motor_axis = self.column("objects", "motor_axis")
+        drive_object = self.objects["drive_object"].tolist()
+        drive_gear = self.objects["drive_gear"].tolist()
+        driven_gear = self.objects["driven_gear"].tolist()
+        speed = self.objects["speed"].tolist()
+        carrier = self.objects["carrier"].tolist()
+
+        return [
+            GearRecord(
+                names[i],
+                rings=ring_rows[starts[i]:starts[i] + counts[i]],
+                drive_object=drive_object[i] or None,
+                drive_gear=drive_gear[i],
+                driven_gear=driven_gear[i],
+                driver_type=driver_type[i],
+                drive_mode=drive_mode[i],
+                speed=speed[i],
+                motor_axis=motor_axis[i],
+                carrier=carrier[i] or None,
+            )
+            for i in range(len(names))
+        ]
+
+    def validate(self):
+        """Raises ValueError if the columns don't line up"""
+        count = len(self)
+        for name in object_columns:
+            if len(self.objects[name]) != count:
+                raise ValueError("objects.%s has %d rows, expected %d" % (name, len(self.objects[name]), count))
+
+        rings = int(self.objects["ring_count"].sum())
+        for name in ring_columns:
+            if len(self.rings[name]) != rings:
+                raise ValueError("rings.%s has %d rows, expected %d" % (name, len(self.rings[name]), rings))
+
+        for key, vocab in self.vocab.items():
+            table, name = key.split(".")
+            codes = (self.objects if table == "objects" else self.rings)[name]
+            if len(codes) and (codes.min() < 0 or codes.max() >= len(vocab)):
+                raise ValueError("%s has codes outside its vocabulary" % key)
+
+        if self.location.shape != (count, 3):
+            raise ValueError("location needs one row of three per object")
+        if self.rotation.shape != (count, 4):
+            raise ValueError("rotation needs one row of four per object")
+
+    # Files
+
+    def save_json(self, path):
+        data = {
+            "format": FORMAT,
+            "version": VERSION,
+            "objects": {name: array.tolist() for name, array in self.objects.items()},
+            "rings": {name: array.tolist() for name, array in self.rings.items()},
+            "vocab": self.vocab,
+            "location": self.location.tolist(),
+            "rotation": self.rotation.tolist(),
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def save_npz(self, path):
+        arrays = {"format": np.array([FORMAT]), "version": np.array([VERSION])}
+        for name, array in self.objects.items():
+            arrays["objects__" + name] = array
+        for name, array in self.rings.items():
+            arrays["rings__" + name] = array
+        for key, vocab in self.vocab.items():
+            arrays["vocab__" + key] = np.array(vocab, dtype=str)
+        arrays["location"] = self.location
+        arrays["rotation"] = self.rotation
+        np.savez_compressed(path, **arrays)
+
+    def save(self, path):
+        if path.lower().endswith(".npz"):
+            self.save_npz(path)
+        else:
+            self.save_json(path)
+
+    @classmethod
+    def load_json(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+
+        check_header(data.get("format"), data.get("version"))
+        objects = unpack(data["objects"], object_columns)
+        rings = unpack(data["rings"], ring_columns)
+        return cls(objects, rings, data["vocab"], data.get("location"), data.get("rotation"))
+
+    @classmethod
+    def load_npz(cls, path):
+        # Strings are stored as fixed-width unicode, so no pickles needed
+        with np.load(path, allow_pickle=False) as data:
+            check_header(str(data["format"][0]), int(data["version"][0]))
+
+            objects = {}
+            rings = {}
+            vocab = {}
+            for key in data.files:
+                if key.startswith("objects__"):
+                    objects[key[9:]] = data[key]
+                elif key.startswith("rings__"):
+                    rings[key[7:]] = data[key]
+                elif key.startswith("vocab__"):
+                    vocab[key[7:]] = data[key].tolist()
+
+            return cls(
+                unpack(objects, object_columns),
+                unpack(rings, ring_columns),
+                vocab,
+                data["location"],
+                data["rotation"]
+            )
+
+    @classmethod
+    def load(cls, path):
+        if path.lower().endswith(".npz"):
+            table = cls.load_npz(path)
+        else:
+            table = cls.load_json(path)
+        table.validate()
+        return table
+
+
+def check_header(fmt, version):
+    if fmt != FORMAT:
+        raise ValueError("Not a GearEngine train file")
+    if version > VERSION:
+        raise ValueError("Train file is version %d, newer than this add-on reads" % version)
+
+
+def pack(values, columns, table, vocab):
+    arrays = {}
+    for name, kind in columns.items():
+        if kind == "enum":
+            arrays[name], vocab[table + "." + name] = encode(values[name])
+        elif kind is str:
+            arrays[name] = np.array(values[name], dtype=str)
+        else:
+            arrays[name] = np.array(values[name], dtype=kind)
+    return arrays
+
+
+def unpack(values, columns):
+    arrays = {}
+    for name, kind in columns.items():
+        if name not in values and name in optional_columns:
+            fill = 0 if kind == "enum" else optional_columns[name]
+            values = dict(values)
+            values[name] = [fill] * len(values["name"])
+
+        if kind == "enum":
+            arrays[name] = np.asarray(values[name], dtype=np.int8)
+        elif kind is str:
+            arrays[name] = np.asarray(values[name], dtype=str)
+        else:
+            arrays[name] = np.asarray(values[name], dtype=kind)
+    return arrays